@@ -0,0 +1,30 @@
+import argparse
+
+from app import app
+from models import User
+from modules.sermon_import import import_manuscripts
+
+def import_sermons(username, paths):
+    """Import sermon manuscripts from files, directories and ZIP archives for a user"""
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            print(f"No user named {username}")
+            return
+
+        print(f"Importing sermons for {username}...")
+        summary = import_manuscripts(
+            user.id, paths,
+            on_progress=lambda done, total: print(f"  {done}/{total} files processed")
+        )
+        for filename, message in summary['errors']:
+            print(f"  Skipped {filename}: {message}")
+        print(f"Imported {summary['imported']} sermons "
+              f"({summary['skipped']} already imported, {summary['failed']} failed)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import sermon manuscripts (re-run to resume)")
+    parser.add_argument("username")
+    parser.add_argument("paths", nargs="+", help="Markdown/TXT/DOCX files, directories or ZIP archives")
+    args = parser.parse_args()
+    import_sermons(args.username, args.paths)
@@ -0,0 +1,12 @@
+from app import app
+from modules.apologetics_resources import migrate_resource_lists
+
+def migrate_response_resources():
+    """Move apologetics response resource lists from the legacy JSON column into the association table"""
+    with app.app_context():
+        print("Migrating apologetics response resources...")
+        converted, inserted = migrate_resource_lists()
+        print(f"Converted {converted} responses into {inserted} resource links successfully!")
+
+if __name__ == "__main__":
+    migrate_response_resources()
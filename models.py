@@ -2,6 +2,7 @@ from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from modules.extensions import db, login_manager
+from modules.field_encryption import encrypted_property
 
 
 class User(UserMixin, db.Model):
@@ -55,6 +56,14 @@ class Belief(db.Model):
         return f'<Belief {self.topic}>'
 
 
+class DataVersion(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
+
+
 class SermonSeries(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -86,26 +95,186 @@ class Sermon(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     series_id = db.Column(db.Integer, db.ForeignKey('sermon_series.id'), nullable=True)
+    revision = db.Column(db.Integer, default=1)  # bumped on every save
+
+    # Text statistics, recomputed whenever content or passage changes (modules/sermon_stats.py)
+    word_count = db.Column(db.Integer)
+    sentence_count = db.Column(db.Integer)
+    syllable_count = db.Column(db.Integer)
+    readability = db.Column(db.Float)  # Flesch reading ease
+    preaching_minutes = db.Column(db.Integer)
+
+    outline_points = db.relationship('SermonOutlinePoint', backref='sermon', lazy='dynamic',
+                                     cascade='all, delete-orphan')
+    revisions = db.relationship('SermonRevision', backref='sermon', lazy='dynamic',
+                                cascade='all, delete-orphan')
+    signature = db.relationship('SermonSignature', backref='sermon', uselist=False,
+                                cascade='all, delete-orphan')
+    lsh_buckets = db.relationship('SermonLSHBucket', backref='sermon', lazy='dynamic',
+                                  cascade='all, delete-orphan')
+    import_record = db.relationship('SermonImport', backref='sermon', uselist=False,
+                                    cascade='all, delete-orphan')
+    book_counts = db.relationship('SermonBookCount', backref='sermon',
+                                  cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_sermon_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_sermon_updated_at', 'updated_at'),
+    )
 
     def __repr__(self):
         return f'<Sermon {self.title}>'
 
 
+class SermonRevision(db.Model):
+    """One saved revision: a full snapshot or a compressed delta from the previous revision"""
+    id = db.Column(db.Integer, primary_key=True)
+    sermon_id = db.Column(db.Integer, db.ForeignKey('sermon.id'), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON
+    size = db.Column(db.Integer, nullable=False)  # stored bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('sermon_id', 'revision', name='uq_sermon_revision'),
+    )
+
+    def __repr__(self):
+        return f'<SermonRevision {self.sermon_id}@{self.revision}>'
+
+
+class SermonOutlinePoint(db.Model):
+    """Queryable copy of one outline section heading or point"""
+    id = db.Column(db.Integer, primary_key=True)
+    sermon_id = db.Column(db.Integer, db.ForeignKey('sermon.id'), nullable=False, index=True)
+    section_index = db.Column(db.Integer, nullable=False)
+    point_index = db.Column(db.Integer)  # NULL for the section heading itself
+    title = db.Column(db.String(300), nullable=False)
+    title_key = db.Column(db.String(300), nullable=False, index=True)  # lowercased title for lookups
+
+    def __repr__(self):
+        return f'<SermonOutlinePoint {self.title}>'
+
+
+class SermonSignature(db.Model):
+    """MinHash signature of a sermon's content, for near-duplicate detection"""
+    sermon_id = db.Column(db.Integer, db.ForeignKey('sermon.id'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)  # packed uint32 minimum hashes
+    shingle_count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<SermonSignature {self.sermon_id}>'
+
+
+class SermonLSHBucket(db.Model):
+    """One LSH band of a sermon signature; sermons sharing a bucket are duplicate candidates"""
+    id = db.Column(db.Integer, primary_key=True)
+    sermon_id = db.Column(db.Integer, db.ForeignKey('sermon.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    band = db.Column(db.Integer, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)  # hash of the band's rows
+
+    __table_args__ = (
+        db.Index('ix_sermon_lsh_lookup', 'user_id', 'band', 'bucket'),
+    )
+
+    def __repr__(self):
+        return f'<SermonLSHBucket {self.sermon_id} band {self.band}>'
+
+
+class SermonBookCount(db.Model):
+    """How often a sermon's passage and manuscript cite one book of the Bible"""
+    id = db.Column(db.Integer, primary_key=True)
+    sermon_id = db.Column(db.Integer, db.ForeignKey('sermon.id'), nullable=False, index=True)
+    book = db.Column(db.SmallInteger, nullable=False)  # canonical 1-66 ordinal
+    reference_count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<SermonBookCount {self.sermon_id} book {self.book}>'
+
+
+class SermonImport(db.Model):
+    """A manuscript file already imported for a user, so re-running an import skips it"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    source_key = db.Column(db.String(64), nullable=False)  # sha256 of the file contents
+    filename = db.Column(db.String(300))
+    sermon_id = db.Column(db.Integer, db.ForeignKey('sermon.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'source_key', name='uq_sermon_import_source'),
+    )
+
+    def __repr__(self):
+        return f'<SermonImport {self.filename}>'
+
+
+class PreachingCoverage(db.Model):
+    """Per-user record of which Bible verses their sermons have covered"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    counts = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed uint16 sermons per verse
+    bitmap = db.Column(db.LargeBinary, nullable=False)  # one bit per verse, canonical order
+    verses_covered = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PreachingCoverage user {self.user_id}: {self.verses_covered} verses>'
+
+
 class CounselingSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text)
-    topic = db.Column(db.String(100))
-    notes = db.Column(db.Text)
-    scripture_references = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Encrypted at rest and deferred, so listing sessions never loads or decrypts them
+    description_encrypted = db.deferred(db.Column('description', db.Text), group='encrypted')
+    # Fields counted by the caseload rollups keep their previous value when
+    # changed, even on an expired instance, so the old counts can be removed
+    topic = db.column_property(db.Column(db.String(100)), active_history=True)
+    notes_encrypted = db.deferred(db.Column('notes', db.Text), group='encrypted')
+    scripture_references = db.column_property(db.Column(db.Text), active_history=True)
+    created_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False),
+                                 active_history=True)
+
+    __table_args__ = (
+        db.Index('ix_counseling_session_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_counseling_session_user_topic', 'user_id', 'topic', 'created_at', 'id'),
+    )
+
+    description = encrypted_property('description_encrypted')
+    notes = encrypted_property('notes_encrypted')
 
     def __repr__(self):
         return f'<CounselingSession {self.title}>'
 
 
+class CounselingTopicMonth(db.Model):
+    """Rollup: a counselor's sessions per topic per calendar month"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    topic = db.Column(db.String(100), primary_key=True)  # '' when the session has no topic
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CounselingTopicMonth {self.month} {self.topic}: {self.session_count}>'
+
+
+class CounselingScriptureUse(db.Model):
+    """Rollup: how many of a counselor's sessions cite a scripture passage"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    reference = db.Column(db.String(100), primary_key=True)  # normalized, e.g. "Philippians 4:6-7"
+    use_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_counseling_scripture_use_top', 'user_id', 'use_count'),
+    )
+
+    def __repr__(self):
+        return f'<CounselingScriptureUse {self.reference}: {self.use_count}>'
+
+
 class Resource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -123,20 +292,67 @@ class Resource(db.Model):
         return f'<Resource {self.title}>'
 
 
+class ComparisonResult(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content_key = db.Column(db.String(64), unique=True, nullable=False)  # sha256 of ids, topics and data version
+    denominations = db.Column(db.String(200))
+    topics = db.Column(db.Text)
+    data_version = db.Column(db.Integer, nullable=False)
+    results = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    comparisons = db.relationship('DoctrineComparison', backref='result', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<ComparisonResult {self.content_key[:12]}>'
+
+
 class DoctrineComparison(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     denominations = db.Column(db.String(200))
     topics = db.Column(db.String(200))
-    results = db.Column(db.Text)
+    results = db.Column(db.Text)  # legacy per-user payload, superseded by result_id
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    result_id = db.Column(db.Integer, db.ForeignKey('comparison_result.id'), nullable=True)
 
     def __repr__(self):
         return f'<DoctrineComparison {self.title}>'
 
 
+class BackgroundJob(db.Model):
+    """Work run outside the request cycle; clients poll it by id"""
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running', 'done', 'failed'
+    dedupe_key = db.Column(db.String(64), index=True)  # identical pending work shares one job
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.kind} {self.status}>'
+
+
+class OutlineCache(db.Model):
+    """Generated outline keyed by backend and normalized (scripture, theme)"""
+    cache_key = db.Column(db.String(64), primary_key=True)
+    backend = db.Column(db.String(50), nullable=False)
+    scripture = db.Column(db.String(200))
+    theme = db.Column(db.String(100))
+    outline = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<OutlineCache {self.scripture} / {self.theme}>'
+
+
 class ApologeticsCategory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -160,21 +376,53 @@ class ApologeticsObjection(db.Model):
         return f'<ApologeticsObjection {self.title}>'
 
 
+# Resources cited by apologetics responses; the primary key serves lookups by
+# response and the second index the reverse lookup by resource
+apologetics_response_resource = db.Table(
+    'apologetics_response_resource',
+    db.Column('response_id', db.Integer, db.ForeignKey('apologetics_response.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('resource_id', db.Integer, db.ForeignKey('resource.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_apologetics_response_resource_resource', 'resource_id', 'response_id')
+)
+
+
 class ApologeticsResponse(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     response_text = db.Column(db.Text, nullable=False)
     scripture_references = db.Column(db.Text)
-    additional_resources = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     objection_id = db.Column(db.Integer, db.ForeignKey('apologetics_objection.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    resources = db.relationship('Resource', secondary=apologetics_response_resource, collection_class=set,
+                                backref=db.backref('citing_responses', lazy='dynamic'))
 
     def __repr__(self):
         return f'<ApologeticsResponse {self.title}>'
 
 
+class ScriptureReference(db.Model):
+    """One normalized verse range cited by a belief, counseling session or response"""
+    id = db.Column(db.Integer, primary_key=True)
+    source_type = db.Column(db.String(30), nullable=False)  # 'belief', 'counseling_session', 'apologetics_response'
+    source_id = db.Column(db.Integer, nullable=False)
+    book = db.Column(db.SmallInteger, nullable=False)  # canonical 1-66 ordinal
+    chapter = db.Column(db.SmallInteger, nullable=False)
+    verse_start = db.Column(db.SmallInteger, nullable=False)
+    verse_end = db.Column(db.SmallInteger, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_scripture_reference_passage', 'book', 'chapter', 'verse_start', 'verse_end'),
+        db.Index('ix_scripture_reference_source', 'source_type', 'source_id'),
+    )
+
+    def __repr__(self):
+        return f'<ScriptureReference {self.source_type}:{self.source_id} {self.book} {self.chapter}:{self.verse_start}-{self.verse_end}>'
+
+
 class TheologicalAuthor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
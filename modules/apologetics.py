@@ -1,12 +1,13 @@
-import json
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 
 from app import db
 from models import (
     ApologeticsCategory, ApologeticsObjection, ApologeticsResponse,
     TheologicalAuthor, TheologicalWork, TheologicalQuote, Resource
 )
+from modules.apologetics_resources import resources_for_responses, set_response_resources
 
 # Create blueprint
 apologetics_bp = Blueprint('apologetics', __name__)
@@ -42,20 +43,11 @@ def objections_list():
 def view_objection(id):
     """View a specific objection and its responses"""
     objection = ApologeticsObjection.query.get_or_404(id)
-    responses = ApologeticsResponse.query.filter_by(objection_id=id).all()
+    responses = ApologeticsResponse.query.filter_by(objection_id=id) \
+        .options(joinedload(ApologeticsResponse.author)).all()
     
     # Get related resources
-    related_resources = []
-    for response in responses:
-        if response.additional_resources:
-            try:
-                resource_ids = json.loads(response.additional_resources)
-                for res_id in resource_ids:
-                    resource = Resource.query.get(res_id)
-                    if resource and resource not in related_resources:
-                        related_resources.append(resource)
-            except:
-                pass
+    related_resources = resources_for_responses([response.id for response in responses])
     
     return render_template('apologetics/view_objection.html', 
                           objection=objection, 
@@ -84,10 +76,10 @@ def new_response(objection_id):
             title=title,
             response_text=response_text,
             scripture_references=scripture_references,
-            additional_resources=json.dumps(resource_ids) if resource_ids else None,
             objection_id=objection_id,
             user_id=current_user.id
         )
+        set_response_resources(response, resource_ids)
         
         try:
             db.session.add(response)
@@ -124,8 +116,7 @@ def edit_response(id):
         response.response_text = request.form.get('response_text')
         response.scripture_references = request.form.get('scripture_references')
         
-        resource_ids = request.form.getlist('resources')
-        response.additional_resources = json.dumps(resource_ids) if resource_ids else None
+        set_response_resources(response, request.form.getlist('resources'))
         
         try:
             db.session.commit()
@@ -136,12 +127,7 @@ def edit_response(id):
             flash(f'Error updating response: {str(e)}', 'danger')
     
     # Get selected resources
-    selected_resources = []
-    if response.additional_resources:
-        try:
-            selected_resources = json.loads(response.additional_resources)
-        except:
-            selected_resources = []
+    selected_resources = [str(resource.id) for resource in response.resources]
     
     # Get resources for the dropdown
     amillennial_resources = Resource.query.filter_by(is_amillennial=True).all()
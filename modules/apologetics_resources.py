@@ -0,0 +1,128 @@
+"""
+Resources cited by apologetics responses
+
+Citations live in the apologetics_response_resource association table, so
+they can be joined and looked up from either side ("which responses cite
+this resource"). Edits apply only the difference between the old and new
+selection. Responses saved before the table existed kept their citations as
+a JSON id list in apologetics_response.additional_resources;
+migrate_resource_lists() converts those in bulk.
+"""
+import json
+
+from sqlalchemy import bindparam, inspect, select, text
+
+from models import ApologeticsResponse, Resource, apologetics_response_resource
+from modules.extensions import db
+
+LEGACY_COLUMN = 'additional_resources'
+
+MIGRATE_BATCH_SIZE = 500
+
+
+def parse_resource_ids(values):
+    """Integer resource ids from form values or a legacy JSON list, ignoring malformed entries"""
+    ids = set()
+    for value in values or []:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def set_response_resources(response, resource_ids):
+    """
+    Make a response cite exactly the given resources
+
+    Only resources being added are loaded and only changed links are written;
+    ids of resources that do not exist are ignored.
+
+    Args:
+        response (ApologeticsResponse): Response to update
+        resource_ids (iterable): Selected resource ids (ints or strings)
+    """
+    selected = parse_resource_ids(resource_ids)
+    current = {resource.id: resource for resource in response.resources}
+
+    for resource_id in current.keys() - selected:
+        response.resources.discard(current[resource_id])
+
+    added = selected - current.keys()
+    if added:
+        response.resources.update(Resource.query.filter(Resource.id.in_(added)))
+
+
+def resources_for_responses(response_ids):
+    """Distinct resources cited by any of the given responses, ordered by title"""
+    if not response_ids:
+        return []
+    cited = select(apologetics_response_resource.c.resource_id).where(
+        apologetics_response_resource.c.response_id.in_(response_ids)
+    )
+    return Resource.query.filter(Resource.id.in_(cited)).order_by(Resource.title, Resource.id).all()
+
+
+def migrate_resource_lists(batch_size=MIGRATE_BATCH_SIZE):
+    """
+    Convert legacy JSON resource lists into association rows
+
+    Responses are read in id order in batches. Links to resources that no
+    longer exist, and links already present, are skipped, and each converted
+    list is cleared, so the migration can be rerun safely.
+
+    Args:
+        batch_size (int): Responses per batch
+
+    Returns:
+        tuple: (responses converted, links inserted)
+    """
+    table = ApologeticsResponse.__table__.name
+    columns = {column['name'] for column in inspect(db.engine).get_columns(table)}
+    if LEGACY_COLUMN not in columns:
+        return 0, 0
+
+    link = apologetics_response_resource
+    existing_resources = set(db.session.execute(select(Resource.id)).scalars())
+    converted = inserted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            text(f'SELECT id, {LEGACY_COLUMN} FROM {table} '
+                 f'WHERE id > :last_id AND {LEGACY_COLUMN} IS NOT NULL ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': batch_size}
+        ).all()
+        if not rows:
+            return converted, inserted
+
+        response_ids = [row.id for row in rows]
+        present = set(db.session.execute(
+            select(link.c.response_id, link.c.resource_id).where(link.c.response_id.in_(response_ids))
+        ).tuples())
+
+        links = set()
+        for response_id, stored in rows:
+            try:
+                resource_ids = parse_resource_ids(json.loads(stored))
+            except (TypeError, ValueError):
+                resource_ids = set()
+            links.update(
+                (response_id, resource_id) for resource_id in resource_ids & existing_resources
+                if (response_id, resource_id) not in present
+            )
+
+        if links:
+            db.session.execute(link.insert(), [
+                {'response_id': response_id, 'resource_id': resource_id}
+                for response_id, resource_id in sorted(links)
+            ])
+        db.session.execute(
+            text(f'UPDATE {table} SET {LEGACY_COLUMN} = NULL WHERE id IN :ids').bindparams(
+                bindparam('ids', expanding=True)),
+            {'ids': response_ids}
+        )
+        db.session.commit()
+
+        converted += len(rows)
+        inserted += len(links)
+        last_id = rows[-1].id
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.exc import IntegrityError
+
+from models import Belief, ComparisonResult
+from modules.extensions import db
+
+# Placeholder used when a denomination has no recorded position on a topic
+MISSING_BELIEF = {
+    'summary': 'No information available',
+    'scripture_references': ''
+}
+
+# Parsed payloads are immutable once stored, so a bounded LRU is always safe
+MAX_CACHED_RESULTS = 256
+
+_parsed_results = OrderedDict()
+_parsed_lock = threading.Lock()
+
+
+def load_belief_matrix(denomination_ids, topics):
+    """
+    Load every belief for the requested denominations and topics in one query
+
+    Args:
+        denomination_ids (list): Denomination ids to include
+        topics (list): Topic names to include
+
+    Returns:
+        dict: (denomination_id, topic) -> Belief
+    """
+    denomination_ids = [int(denom_id) for denom_id in denomination_ids]
+    topics = list(topics)
+    if not denomination_ids or not topics:
+        return {}
+
+    beliefs = Belief.query.filter(
+        Belief.denomination_id.in_(denomination_ids),
+        Belief.topic.in_(topics)
+    ).all()
+
+    matrix = {}
+    for belief in beliefs:
+        # Keep the first belief per cell, matching the old .first() lookups
+        matrix.setdefault((belief.denomination_id, belief.topic), belief)
+    return matrix
+
+
+def build_comparison(denominations, topics, matrix=None):
+    """
+    Build the comparison results shared by the doctrine comparison views
+
+    Args:
+        denominations (list): Denomination objects, in display order
+        topics (list): Topic names, in display order
+        matrix (dict, optional): Preloaded (denomination_id, topic) -> belief
+            lookup; loaded with a single query when omitted
+
+    Returns:
+        dict: topic -> denomination name -> {'summary', 'scripture_references'}
+    """
+    if matrix is None:
+        matrix = load_belief_matrix([denom.id for denom in denominations], topics)
+
+    results = {}
+    for topic in topics:
+        results[topic] = {}
+        for denom in denominations:
+            belief = matrix.get((denom.id, topic))
+            if belief:
+                results[topic][denom.name] = {
+                    'summary': belief.summary,
+                    'scripture_references': belief.scripture_references
+                }
+            else:
+                results[topic][denom.name] = dict(MISSING_BELIEF)
+    return results
+
+
+def comparison_key(denomination_ids, topics, version):
+    """
+    Content address for a comparison: identical selections on the same
+    belief-data version share one key regardless of selection order
+    """
+    payload = json.dumps(
+        [sorted(int(denom_id) for denom_id in denomination_ids), sorted(topics), version],
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _remember(content_key, result_id, results):
+    with _parsed_lock:
+        _parsed_results[content_key] = (result_id, results)
+        _parsed_results.move_to_end(content_key)
+        while len(_parsed_results) > MAX_CACHED_RESULTS:
+            _parsed_results.popitem(last=False)
+
+
+def _recall(content_key):
+    with _parsed_lock:
+        entry = _parsed_results.get(content_key)
+        if entry is not None:
+            _parsed_results.move_to_end(content_key)
+        return entry
+
+
+def get_comparison_result(denominations, topics, reference):
+    """
+    Return the shared stored result for a comparison, computing it only when
+    no payload exists yet for the current belief-data version
+
+    Args:
+        denominations (list): Denomination records, in display order
+        topics (list): Topic names
+        reference (ReferenceSnapshot): Current reference data snapshot
+
+    Returns:
+        tuple: (result_id, results dict)
+    """
+    denomination_ids = [denom.id for denom in denominations]
+    content_key = comparison_key(denomination_ids, topics, reference.version)
+
+    entry = _recall(content_key)
+    if entry is not None:
+        return entry
+
+    result = ComparisonResult.query.filter_by(content_key=content_key).first()
+    if result is not None:
+        results = json.loads(result.results)
+        _remember(content_key, result.id, results)
+    else:
+        results = build_comparison(denominations, topics, reference.beliefs)
+        result = ComparisonResult(
+            content_key=content_key,
+            denominations=','.join(str(denom_id) for denom_id in sorted(denomination_ids)),
+            topics=json.dumps(sorted(topics)),
+            data_version=reference.version,
+            results=json.dumps(results)
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(result)
+        except IntegrityError:
+            # Another worker stored the same comparison first
+            result = ComparisonResult.query.filter_by(content_key=content_key).one()
+
+    # New rows are cached on their next lookup, once the caller has committed
+    return result.id, results
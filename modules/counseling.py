@@ -1,13 +1,42 @@
 import json
+from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
+from sqlalchemy.orm import load_only, undefer_group
 
 from app import db
-from models import CounselingSession
+from models import BackgroundJob, CounselingSession
+from modules.counseling_analytics import caseload_summary
+from modules.counseling_encryption import start_reencryption
+from modules.counseling_topics import (
+    COUNSELING_TOPIC_NAMES, COUNSELING_TOPICS, DEFAULT_ADVICE, DEFAULT_SCRIPTURES, match_topics
+)
+from modules.jobs import job_status
+from modules.pagination import keyset_page
 
 # Create blueprint
 counseling_bp = Blueprint('counseling', __name__)
 
+SESSIONS_PER_PAGE = 25
+
+# Columns needed to list sessions; notes/description/scripture_references stay unloaded
+SESSION_SUMMARY_COLUMNS = (
+    CounselingSession.id, CounselingSession.title, CounselingSession.topic,
+    CounselingSession.created_at, CounselingSession.updated_at
+)
+
+
+def parse_date_arg(name):
+    """A YYYY-MM-DD query string argument as a datetime, or None if missing or invalid"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        flash(f'Ignoring invalid date "{value}"; use YYYY-MM-DD.', 'warning')
+        return None
+
 
 @counseling_bp.route('/')
 def index():
@@ -51,29 +80,51 @@ def new_session():
             flash(f'Error creating counseling session: {str(e)}', 'danger')
             return redirect(url_for('counseling.new_session'))
     
-    # Common counseling topics
-    topics = [
-        'Marriage', 'Family', 'Grief', 'Addiction', 'Anxiety', 
-        'Depression', 'Faith Crisis', 'Relationships', 'Career', 
-        'Financial Stewardship', 'Forgiveness', 'Guilt'
-    ]
-    
-    return render_template('counseling/session.html', topics=topics)
+    return render_template('counseling/session.html', topics=COUNSELING_TOPIC_NAMES)
 
 
 @counseling_bp.route('/my_sessions')
 @login_required
 def my_sessions():
-    """View all counseling sessions created by the current user"""
-    sessions = CounselingSession.query.filter_by(user_id=current_user.id).order_by(CounselingSession.created_at.desc()).all()
-    return render_template('counseling/my_sessions.html', sessions=sessions)
+    """View the current user's counseling sessions, newest first, one page at a time"""
+    topic = request.args.get('topic')
+    start = parse_date_arg('start')
+    end = parse_date_arg('end')
+    
+    query = CounselingSession.query.filter_by(user_id=current_user.id) \
+        .options(load_only(*SESSION_SUMMARY_COLUMNS))
+    if topic:
+        query = query.filter(CounselingSession.topic == topic)
+    if start:
+        query = query.filter(CounselingSession.created_at >= start)
+    if end:
+        # The end date is inclusive
+        query = query.filter(CounselingSession.created_at < end + timedelta(days=1))
+    
+    sessions, next_cursor = keyset_page(
+        query, CounselingSession.created_at, CounselingSession.id,
+        cursor=request.args.get('cursor'),
+        per_page=SESSIONS_PER_PAGE
+    )
+    return render_template(
+        'counseling/my_sessions.html',
+        sessions=sessions,
+        next_cursor=next_cursor,
+        topics=COUNSELING_TOPIC_NAMES,
+        filters={
+            'topic': topic or '',
+            'start': start.strftime('%Y-%m-%d') if start else '',
+            'end': end.strftime('%Y-%m-%d') if end else ''
+        }
+    )
 
 
 @counseling_bp.route('/session/<int:id>')
 @login_required
 def view_session(id):
     """View a specific counseling session"""
-    session = CounselingSession.query.get_or_404(id)
+    # Load the encrypted fields with the row; they are decrypted when the template reads them
+    session = CounselingSession.query.options(undefer_group('encrypted')).get_or_404(id)
     
     # Check if the user is the owner of the session
     if session.user_id != current_user.id:
@@ -97,7 +148,7 @@ def view_session(id):
 @login_required
 def edit_session(id):
     """Edit an existing counseling session"""
-    session = CounselingSession.query.get_or_404(id)
+    session = CounselingSession.query.options(undefer_group('encrypted')).get_or_404(id)
     
     # Check if the user is the owner of the session
     if session.user_id != current_user.id:
@@ -119,13 +170,6 @@ def edit_session(id):
             db.session.rollback()
             flash(f'Error updating counseling session: {str(e)}', 'danger')
     
-    # Common counseling topics
-    topics = [
-        'Marriage', 'Family', 'Grief', 'Addiction', 'Anxiety', 
-        'Depression', 'Faith Crisis', 'Relationships', 'Career', 
-        'Financial Stewardship', 'Forgiveness', 'Guilt'
-    ]
-    
     # Parse scripture references if stored as JSON
     try:
         scripture_refs = json.loads(session.scripture_references) if session.scripture_references else []
@@ -135,7 +179,7 @@ def edit_session(id):
     return render_template(
         'counseling/edit_session.html',
         session=session,
-        topics=topics,
+        topics=COUNSELING_TOPIC_NAMES,
         scripture_refs=scripture_refs
     )
 
@@ -162,6 +206,59 @@ def delete_session(id):
     return redirect(url_for('counseling.my_sessions'))
 
 
+@counseling_bp.route('/dashboard')
+@login_required
+def dashboard():
+    """Caseload analytics for the current counselor"""
+    return render_template('counseling/dashboard.html', summary=caseload_summary(current_user.id))
+
+
+@counseling_bp.route('/api/caseload')
+@login_required
+def caseload():
+    """API endpoint for the current counselor's caseload analytics"""
+    summary = caseload_summary(current_user.id)
+    return jsonify({
+        'success': True,
+        'months': [month.strftime('%Y-%m') for month in summary['months']],
+        'topics': summary['topics'],
+        'monthly_totals': summary['monthly_totals'],
+        'top_scriptures': [
+            {'reference': reference, 'sessions': sessions}
+            for reference, sessions in summary['top_scriptures']
+        ]
+    })
+
+
+@counseling_bp.route('/api/reencrypt', methods=['POST'])
+@login_required
+def reencrypt():
+    """API endpoint to start re-encrypting session notes onto the current key (admins only)"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Administrator access required'}), 403
+    
+    job = start_reencryption(user_id=current_user.id)
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': url_for('counseling.reencrypt_status', job_id=job.id)
+    }), 202
+
+
+@counseling_bp.route('/api/reencrypt/<job_id>')
+@login_required
+def reencrypt_status(job_id):
+    """API endpoint to poll a re-encryption job (admins only)"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Administrator access required'}), 403
+    
+    job = BackgroundJob.query.filter_by(id=job_id, kind='counseling_reencrypt').first()
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify(dict(job_status(job), success=True))
+
+
 @counseling_bp.route('/api/suggest_scriptures', methods=['POST'])
 @login_required
 def suggest_scriptures():
@@ -172,28 +269,17 @@ def suggest_scriptures():
     if not topic:
         return jsonify({'success': False, 'message': 'Topic is required'})
     
-    # Scripture reference suggestions for common counseling topics
-    scripture_suggestions = {
-        'Marriage': ['Ephesians 5:22-33', 'Genesis 2:24', '1 Corinthians 7:1-16', 'Proverbs 5:18-19'],
-        'Family': ['Deuteronomy 6:6-9', 'Ephesians 6:1-4', 'Proverbs 22:6', 'Psalm 127:3-5'],
-        'Grief': ['Psalm 34:18', 'Matthew 5:4', 'John 11:35', '2 Corinthians 1:3-4', 'Revelation 21:4'],
-        'Addiction': ['1 Corinthians 10:13', 'James 4:7', 'Romans 6:16-18', 'Galatians 5:1'],
-        'Anxiety': ['Philippians 4:6-7', 'Matthew 6:25-34', '1 Peter 5:7', 'Isaiah 41:10'],
-        'Depression': ['Psalm 42:11', 'Isaiah 40:31', 'Jeremiah 29:11', 'Romans 8:38-39'],
-        'Faith Crisis': ['Hebrews 11:1-6', 'Mark 9:24', '2 Corinthians 5:7', 'Romans 10:17'],
-        'Relationships': ['John 13:34-35', '1 Corinthians 13:4-7', 'Romans 12:18', 'Ephesians 4:2-3'],
-        'Career': ['Colossians 3:23-24', 'Proverbs 16:3', 'Jeremiah 29:11', 'Philippians 4:13'],
-        'Financial Stewardship': ['Malachi 3:10', 'Proverbs 3:9-10', 'Luke 16:10-12', 'Matthew 6:24'],
-        'Forgiveness': ['Matthew 6:14-15', 'Ephesians 4:31-32', 'Colossians 3:13', 'Luke 23:34'],
-        'Guilt': ['Romans 8:1', 'Psalm 103:12', '1 John 1:9', 'Isaiah 43:25']
-    }
-    
-    # Get scripture suggestions for the topic, or provide a default if not found
-    suggestions = scripture_suggestions.get(topic, ['John 3:16', 'Romans 8:28', 'Philippians 4:13'])
+    # Free-text topics are matched against known topics and their synonyms
+    matches = match_topics(topic)
+    suggestions = COUNSELING_TOPICS[matches[0][0]]['scriptures'] if matches else DEFAULT_SCRIPTURES
     
     return jsonify({
         'success': True,
-        'scriptures': suggestions
+        'scriptures': suggestions,
+        'matches': [
+            {'topic': name, 'confidence': confidence, 'scriptures': COUNSELING_TOPICS[name]['scriptures']}
+            for name, confidence in matches
+        ]
     })
 
 
@@ -209,25 +295,16 @@ def counseling_advice():
         return jsonify({'success': False, 'message': 'Topic is required'})
     
     # In a real application, this would call an AI model or service
-    # For now, we'll return generic advice based on the topic
-    advice_map = {
-        'Marriage': 'Focus on communication, mutual respect, and spending quality time together.',
-        'Family': 'Establish clear boundaries and expectations, and prioritize regular family time.',
-        'Grief': 'Acknowledge the pain, allow time for healing, and seek support from community.',
-        'Addiction': 'Recognize the problem, seek professional help, and develop healthy alternatives.',
-        'Anxiety': 'Practice mindfulness, focus on what can be controlled, and establish routines.',
-        'Depression': 'Seek professional help, maintain social connections, and engage in physical activity.',
-        'Faith Crisis': 'Ask questions openly, study scripture, and connect with mature believers.',
-        'Relationships': 'Practice active listening, express needs clearly, and resolve conflicts quickly.',
-        'Career': 'Align work with values, maintain work-life balance, and seek continuous growth.',
-        'Financial Stewardship': 'Create a budget, avoid debt, give generously, and save consistently.',
-        'Forgiveness': 'Acknowledge hurt, choose to forgive, and focus on moving forward.',
-        'Guilt': 'Distinguish between conviction and condemnation, practice self-forgiveness, and make amends when possible.'
-    }
-    
-    advice = advice_map.get(topic, 'Seek wisdom from scripture and prayer. Consider professional counseling if needed.')
+    # For now, we'll return generic advice for the closest known topic,
+    # falling back to the situation description if the topic is unrecognized
+    matches = match_topics(topic) or match_topics(situation)
+    advice = COUNSELING_TOPICS[matches[0][0]]['advice'] if matches else DEFAULT_ADVICE
     
     return jsonify({
         'success': True,
-        'advice': advice
+        'advice': advice,
+        'matches': [
+            {'topic': name, 'confidence': confidence, 'advice': COUNSELING_TOPICS[name]['advice']}
+            for name, confidence in matches
+        ]
     })
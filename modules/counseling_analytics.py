@@ -0,0 +1,261 @@
+"""
+Counseling caseload analytics
+
+Two rollup tables are kept current as sessions are created, edited and
+deleted: CounselingTopicMonth (sessions per topic per month) and
+CounselingScriptureUse (sessions citing each passage). A save applies only
+the difference between a session's old and new topic, month and references,
+so the dashboard reads a fixed window of rollup rows instead of scanning
+every session a counselor has ever recorded.
+"""
+import json
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import CounselingScriptureUse, CounselingSession, CounselingTopicMonth
+from modules.extensions import db
+from modules.scripture import format_range, parse_references
+
+DASHBOARD_MONTHS = 12
+TOP_SCRIPTURES = 10
+
+# Months compared on each side of a topic's trend
+TREND_MONTHS = 3
+
+REBUILD_BATCH_SIZE = 500
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+_UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+_topic_table = CounselingTopicMonth.__table__
+_scripture_table = CounselingScriptureUse.__table__
+
+
+def month_start(value):
+    """First day of the month containing a date or datetime"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    """The first-of-month date count months after (or before) month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def session_references(text):
+    """Normalized passages cited by a session's scripture_references (JSON list or free text)"""
+    if not text:
+        return set()
+    try:
+        items = json.loads(text)
+        text = '; '.join(str(item) for item in items) if isinstance(items, list) else text
+    except ValueError:
+        pass
+    return {format_range(scripture_range)[:100] for scripture_range in parse_references(text)}
+
+
+def _contribution(user_id, created_at, topic, scripture_references):
+    """Rollup counts one session adds: ({(user, month, topic): 1}, {(user, reference): 1})"""
+    month = month_start(created_at)
+    topics = Counter({(user_id, month, (topic or '')[:100]): 1})
+    scriptures = Counter({(user_id, reference): 1 for reference in session_references(scripture_references)})
+    return topics, scriptures
+
+
+def _increment(connection, table, key_columns, count_column, key, delta):
+    """Add a positive delta to a rollup row, creating it if needed, in one statement"""
+    values = {**dict(zip(key_columns, key)), count_column: delta}
+    upsert = _UPSERTS.get(connection.dialect.name)
+    if upsert is None:
+        # No upsert to lean on: lock the row, then insert or update it
+        condition = [table.c[column] == value for column, value in zip(key_columns, key)]
+        current = connection.execute(select(table.c[count_column]).where(*condition).with_for_update()).scalar()
+        if current is None:
+            connection.execute(insert(table).values(values))
+        else:
+            connection.execute(update(table).where(*condition).values(**{count_column: current + delta}))
+        return
+    # Two first sessions saved at once would otherwise both insert the same key
+    statement = upsert(table).values(values)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c[column] for column in key_columns],
+        set_={count_column: table.c[count_column] + statement.excluded[count_column]}
+    ))
+
+
+def _apply(connection, table, key_columns, count_column, deltas):
+    """Add signed deltas to rollup rows, inserting new rows and deleting rows that reach zero"""
+    for key, delta in deltas.items():
+        if delta > 0:
+            _increment(connection, table, key_columns, count_column, key, delta)
+        elif delta < 0:
+            condition = [table.c[column] == value for column, value in zip(key_columns, key)]
+            connection.execute(
+                update(table).where(*condition).values(**{count_column: table.c[count_column] + delta})
+            )
+            connection.execute(delete(table).where(*condition, table.c[count_column] <= 0))
+
+
+def apply_session_change(connection, removed=None, added=None):
+    """
+    Adjust the rollups for one session
+
+    Args:
+        connection: Connection in the saving transaction
+        removed (tuple, optional): (user_id, created_at, topic, scripture_references)
+            the session counted as before the change
+        added (tuple, optional): The same fields after the change
+    """
+    topic_deltas, scripture_deltas = Counter(), Counter()
+    if removed:
+        topics, scriptures = _contribution(*removed)
+        topic_deltas.subtract(topics)
+        scripture_deltas.subtract(scriptures)
+    if added:
+        topics, scriptures = _contribution(*added)
+        topic_deltas.update(topics)
+        scripture_deltas.update(scriptures)
+
+    _apply(connection, _topic_table, ('user_id', 'month', 'topic'), 'session_count', topic_deltas)
+    _apply(connection, _scripture_table, ('user_id', 'reference'), 'use_count', scripture_deltas)
+
+
+_TRACKED = ('user_id', 'created_at', 'topic', 'scripture_references')
+
+
+def _values(obj, previous=False):
+    # The tracked columns use active_history, so a changed attribute always
+    # knows its committed value; an empty "deleted" means it was None
+    attrs = inspect(obj).attrs
+    values = []
+    for name in _TRACKED:
+        history = attrs[name].history
+        if previous and history.has_changes():
+            values.append(history.deleted[0] if history.deleted else None)
+        else:
+            values.append(getattr(obj, name))
+    return tuple(values)
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_rollups(session, flush_context, instances):
+    # Runs before the flush so deleted sessions still have their fields loaded
+    connection = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, CounselingSession):
+            continue
+        if obj in session.new:
+            # Stamp now so the rollup month matches the stored row exactly
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            removed, added = None, _values(obj)
+        elif obj in session.deleted:
+            removed, added = _values(obj, previous=True), None
+        elif any(inspect(obj).attrs[name].history.has_changes() for name in _TRACKED):
+            removed, added = _values(obj, previous=True), _values(obj)
+        else:
+            continue
+        connection = connection or session.connection()
+        apply_session_change(connection, removed, added)
+
+
+def rebuild_rollups():
+    """
+    Recompute both rollup tables from every counseling session
+
+    Returns:
+        int: Number of sessions counted
+    """
+    topic_counts, scripture_counts = Counter(), Counter()
+    count = 0
+    rows = db.session.execute(
+        select(
+            CounselingSession.user_id, CounselingSession.created_at,
+            CounselingSession.topic, CounselingSession.scripture_references
+        ).execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    for row in rows:
+        topics, scriptures = _contribution(*row)
+        topic_counts.update(topics)
+        scripture_counts.update(scriptures)
+        count += 1
+
+    connection = db.session.connection()
+    connection.execute(delete(_topic_table))
+    connection.execute(delete(_scripture_table))
+    if topic_counts:
+        connection.execute(insert(_topic_table), [
+            {'user_id': user_id, 'month': month, 'topic': topic, 'session_count': total}
+            for (user_id, month, topic), total in topic_counts.items()
+        ])
+    if scripture_counts:
+        connection.execute(insert(_scripture_table), [
+            {'user_id': user_id, 'reference': reference, 'use_count': total}
+            for (user_id, reference), total in scripture_counts.items()
+        ])
+    db.session.commit()
+    return count
+
+
+def caseload_summary(user_id, months=DASHBOARD_MONTHS, today=None):
+    """
+    Dashboard data for a counselor, read only from the rollup tables
+
+    Args:
+        user_id (int): Counselor
+        months (int): Number of calendar months shown, ending with the current one
+        today (date, optional): Reference date, defaults to today
+
+    Returns:
+        dict: 'months' (first-of-month dates, oldest first), 'topics' (list of
+            dicts with 'topic', 'counts' per month, 'total' and 'trend', the
+            change between the last TREND_MONTHS months and the TREND_MONTHS
+            before them), 'monthly_totals' and 'top_scriptures'
+            ((reference, sessions) pairs)
+    """
+    last = month_start(today or date.today())
+    window = [add_months(last, offset) for offset in range(1 - months, 1)]
+    position = {month: index for index, month in enumerate(window)}
+
+    rows = db.session.execute(
+        select(CounselingTopicMonth.month, CounselingTopicMonth.topic, CounselingTopicMonth.session_count)
+        .where(
+            CounselingTopicMonth.user_id == user_id,
+            CounselingTopicMonth.month >= window[0],
+            CounselingTopicMonth.month <= last
+        )
+    ).all()
+
+    grid = {}
+    for month, topic, session_count in rows:
+        grid.setdefault(topic, [0] * months)[position[month]] = session_count
+
+    topics = []
+    for topic, counts in grid.items():
+        recent = sum(counts[-TREND_MONTHS:])
+        earlier = sum(counts[-2 * TREND_MONTHS:-TREND_MONTHS])
+        topics.append({
+            'topic': topic or 'No topic',
+            'counts': counts,
+            'total': sum(counts),
+            'trend': recent - earlier
+        })
+    topics.sort(key=lambda entry: (-entry['total'], entry['topic']))
+
+    top_scriptures = db.session.execute(
+        select(CounselingScriptureUse.reference, CounselingScriptureUse.use_count)
+        .where(CounselingScriptureUse.user_id == user_id)
+        .order_by(CounselingScriptureUse.use_count.desc(), CounselingScriptureUse.reference)
+        .limit(TOP_SCRIPTURES)
+    ).all()
+
+    return {
+        'months': window,
+        'topics': topics,
+        'monthly_totals': [sum(entry['counts'][index] for entry in topics) for index in range(months)],
+        'top_scriptures': [tuple(row) for row in top_scriptures]
+    }
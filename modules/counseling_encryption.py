@@ -0,0 +1,53 @@
+"""
+Counseling note encryption maintenance
+
+Re-encrypts counseling session notes and descriptions onto the current key
+(and encrypts rows written before encryption was enabled) in committed
+batches, either as a BackgroundJob or from reencrypt_counseling_notes.py.
+Reads keep working throughout because older keys stay configured until the
+job finishes.
+"""
+from sqlalchemy import func, or_, select
+
+from models import CounselingSession
+from modules.extensions import db
+from modules.field_encryption import get_cipher, reencrypt_fields
+from modules.jobs import submit_job, update_progress
+
+ENCRYPTED_COLUMNS = ('description', 'notes')
+
+_table = CounselingSession.__table__
+
+
+def stale_session_count():
+    """Sessions with a note or description not yet on the current key"""
+    prefix = get_cipher().current_prefix()
+    return db.session.execute(
+        select(func.count()).select_from(_table).where(or_(*[
+            (_table.c[column].isnot(None)) & ~_table.c[column].startswith(prefix, autoescape=True)
+            for column in ENCRYPTED_COLUMNS
+        ]))
+    ).scalar()
+
+
+def reencrypt_sessions(on_progress=None):
+    """
+    Move every session's encrypted fields onto the current key
+
+    Returns:
+        int: Number of sessions updated
+    """
+    return reencrypt_fields(db.session, _table, ENCRYPTED_COLUMNS, on_progress=on_progress)
+
+
+def reencrypt_job(job_id):
+    """Background job: re-encrypt all sessions, reporting progress"""
+    total = stale_session_count()
+    update_progress(job_id, 0, total)
+    updated = reencrypt_sessions(on_progress=lambda done: update_progress(job_id, done, total))
+    return {'updated': updated}
+
+
+def start_reencryption(user_id=None):
+    """Start (or join) the background re-encryption job"""
+    return submit_job('counseling_reencrypt', reencrypt_job, user_id=user_id, dedupe_key='counseling_reencrypt')
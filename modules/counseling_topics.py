@@ -0,0 +1,182 @@
+"""
+Counseling topic matching
+
+Suggested scriptures and advice for common counseling topics, with the
+phrases people actually type for them ("marital conflict", "panic attacks").
+The data is indexed once at import into trigram postings, so a free-text
+topic is scored only against the phrases that share a trigram with it.
+
+Scores are in [0, 1]: mostly the IDF-weighted fraction of a phrase's
+trigrams found in the query, with a little weight on overall overlap to
+prefer the closer of two contained phrases. Synonyms score slightly below
+the topic name itself.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+COUNSELING_TOPICS = {
+    'Marriage': {
+        'scriptures': ['Ephesians 5:22-33', 'Genesis 2:24', '1 Corinthians 7:1-16', 'Proverbs 5:18-19'],
+        'advice': 'Focus on communication, mutual respect, and spending quality time together.',
+        'synonyms': ['marital conflict', 'marital', 'married', 'spouse', 'husband', 'wife', 'divorce',
+                     'separation', 'infidelity', 'affair', 'premarital', 'engagement', 'wedding'],
+    },
+    'Family': {
+        'scriptures': ['Deuteronomy 6:6-9', 'Ephesians 6:1-4', 'Proverbs 22:6', 'Psalm 127:3-5'],
+        'advice': 'Establish clear boundaries and expectations, and prioritize regular family time.',
+        'synonyms': ['parenting', 'parents', 'children', 'kids', 'teenager', 'siblings', 'in-laws',
+                     'blended family', 'prodigal child'],
+    },
+    'Grief': {
+        'scriptures': ['Psalm 34:18', 'Matthew 5:4', 'John 11:35', '2 Corinthians 1:3-4', 'Revelation 21:4'],
+        'advice': 'Acknowledge the pain, allow time for healing, and seek support from community.',
+        'synonyms': ['grieving', 'bereavement', 'loss', 'death', 'funeral', 'mourning', 'miscarriage',
+                     'widow', 'widower', 'lost a loved one'],
+    },
+    'Addiction': {
+        'scriptures': ['1 Corinthians 10:13', 'James 4:7', 'Romans 6:16-18', 'Galatians 5:1'],
+        'advice': 'Recognize the problem, seek professional help, and develop healthy alternatives.',
+        'synonyms': ['alcohol', 'alcoholism', 'drinking', 'drugs', 'substance abuse', 'pornography',
+                     'gambling', 'recovery', 'relapse', 'sobriety'],
+    },
+    'Anxiety': {
+        'scriptures': ['Philippians 4:6-7', 'Matthew 6:25-34', '1 Peter 5:7', 'Isaiah 41:10'],
+        'advice': 'Practice mindfulness, focus on what can be controlled, and establish routines.',
+        'synonyms': ['anxiety attacks', 'panic attacks', 'panic', 'anxious', 'worry', 'worried', 'fear',
+                     'afraid', 'stress', 'stressed', 'nervous', 'overwhelmed'],
+    },
+    'Depression': {
+        'scriptures': ['Psalm 42:11', 'Isaiah 40:31', 'Jeremiah 29:11', 'Romans 8:38-39'],
+        'advice': 'Seek professional help, maintain social connections, and engage in physical activity.',
+        'synonyms': ['depressed', 'sadness', 'hopeless', 'hopelessness', 'despair', 'loneliness',
+                     'lonely', 'burnout', 'suicidal thoughts'],
+    },
+    'Faith Crisis': {
+        'scriptures': ['Hebrews 11:1-6', 'Mark 9:24', '2 Corinthians 5:7', 'Romans 10:17'],
+        'advice': 'Ask questions openly, study scripture, and connect with mature believers.',
+        'synonyms': ['doubt', 'doubts', 'doubting', 'losing faith', 'questioning god', 'spiritual dryness',
+                     'deconstruction', 'unbelief'],
+    },
+    'Relationships': {
+        'scriptures': ['John 13:34-35', '1 Corinthians 13:4-7', 'Romans 12:18', 'Ephesians 4:2-3'],
+        'advice': 'Practice active listening, express needs clearly, and resolve conflicts quickly.',
+        'synonyms': ['conflict', 'friendship', 'friends', 'dating', 'boyfriend', 'girlfriend', 'breakup',
+                     'communication', 'coworker conflict'],
+    },
+    'Career': {
+        'scriptures': ['Colossians 3:23-24', 'Proverbs 16:3', 'Jeremiah 29:11', 'Philippians 4:13'],
+        'advice': 'Align work with values, maintain work-life balance, and seek continuous growth.',
+        'synonyms': ['job', 'work', 'unemployment', 'job loss', 'vocation', 'calling', 'retirement',
+                     'work-life balance'],
+    },
+    'Financial Stewardship': {
+        'scriptures': ['Malachi 3:10', 'Proverbs 3:9-10', 'Luke 16:10-12', 'Matthew 6:24'],
+        'advice': 'Create a budget, avoid debt, give generously, and save consistently.',
+        'synonyms': ['finances', 'financial', 'money', 'debt', 'budget', 'budgeting', 'tithing',
+                     'giving', 'bankruptcy', 'generosity'],
+    },
+    'Forgiveness': {
+        'scriptures': ['Matthew 6:14-15', 'Ephesians 4:31-32', 'Colossians 3:13', 'Luke 23:34'],
+        'advice': 'Acknowledge hurt, choose to forgive, and focus on moving forward.',
+        'synonyms': ['forgive', 'forgiving', 'bitterness', 'resentment', 'betrayal', 'reconciliation',
+                     'grudge', 'anger'],
+    },
+    'Guilt': {
+        'scriptures': ['Romans 8:1', 'Psalm 103:12', '1 John 1:9', 'Isaiah 43:25'],
+        'advice': ('Distinguish between conviction and condemnation, practice self-forgiveness, '
+                   'and make amends when possible.'),
+        'synonyms': ['shame', 'guilty', 'regret', 'condemnation', 'confession', 'past sins'],
+    },
+}
+
+COUNSELING_TOPIC_NAMES = list(COUNSELING_TOPICS)
+
+DEFAULT_SCRIPTURES = ['John 3:16', 'Romans 8:28', 'Philippians 4:13']
+DEFAULT_ADVICE = 'Seek wisdom from scripture and prayer. Consider professional counseling if needed.'
+
+SYNONYM_WEIGHT = 0.9
+
+# Matches scoring below this are treated as no match
+MIN_CONFIDENCE = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+
+def trigrams(text):
+    """Set of word trigrams, each word padded as in pg_trgm ("  w", " wo", ..., "rd ")"""
+    grams = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TopicIndex:
+    """Trigram index over topic names and their synonyms"""
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.phrases = []  # (topic, weight, total trigram weight)
+        self.postings = defaultdict(list)
+        phrase_grams = []
+        for topic, entry in topics.items():
+            phrases = [(topic, 1.0)] + [(synonym, SYNONYM_WEIGHT) for synonym in entry.get('synonyms', [])]
+            for phrase, weight in phrases:
+                grams = trigrams(phrase)
+                if grams:
+                    phrase_grams.append((topic, weight, grams))
+
+        # Trigrams shared by many phrases ("ing", "ed ") say little about the topic
+        document_frequency = Counter(gram for _, _, grams in phrase_grams for gram in grams)
+        self.idf = {
+            gram: math.log(1 + len(phrase_grams) / count) for gram, count in document_frequency.items()
+        }
+        self.max_idf = max(self.idf.values(), default=1.0)
+        for phrase_id, (topic, weight, grams) in enumerate(phrase_grams):
+            self.phrases.append((topic, weight, sum(self.idf[gram] for gram in grams)))
+            for gram in grams:
+                self.postings[gram].append(phrase_id)
+
+    def match(self, text, limit=3, min_confidence=MIN_CONFIDENCE):
+        """
+        Topics best matching free text
+
+        Args:
+            text (str): Topic or situation as typed
+            limit (int): Maximum topics returned
+            min_confidence (float): Lowest score returned
+
+        Returns:
+            list: (topic, confidence) tuples, best first
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+
+        shared = defaultdict(float)
+        for gram in grams:
+            for phrase_id in self.postings.get(gram, ()):
+                shared[phrase_id] += self.idf[gram]
+        # Unknown trigrams count as rare for the query's own weight
+        query_weight = sum(self.idf.get(gram, self.max_idf) for gram in grams)
+
+        scores = {}
+        for phrase_id, overlap in shared.items():
+            topic, weight, size = self.phrases[phrase_id]
+            coverage = overlap / size
+            dice = 2 * overlap / (size + query_weight)
+            score = weight * (0.8 * coverage + 0.2 * dice)
+            if score > scores.get(topic, 0):
+                scores[topic] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(topic, round(score, 3)) for topic, score in ranked[:limit] if score >= min_confidence]
+
+
+_index = TopicIndex(COUNSELING_TOPICS)
+
+
+def match_topics(text, limit=3):
+    """Ranked (topic, confidence) matches for free text against the counseling topics"""
+    return _index.match(text, limit=limit)
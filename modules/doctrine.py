@@ -1,9 +1,15 @@
 import json
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 
 from modules.extensions import db  # import db from extensions, NOT from app.py
 from flask import Blueprint
+from models import DoctrineComparison
+from modules.comparison import build_comparison, get_comparison_result
+from modules.exports import EXPORT_FORMATS, streaming_export
+from modules.doctrine_similarity import get_similarity_matrix, to_percent
+from modules.reference_data import get_reference_data
 
 doctrine_bp = Blueprint('doctrine', __name__)
 
@@ -11,7 +17,7 @@ doctrine_bp = Blueprint('doctrine', __name__)
 @doctrine_bp.route('/')
 def index():
     """Doctrine comparison module home page"""
-    denominations = Denomination.query.all()
+    denominations = get_reference_data().denominations
     return render_template('doctrine/index.html', denominations=denominations)
 
 
@@ -19,7 +25,8 @@ def index():
 @login_required
 def compare():
     """Compare doctrines between denominations"""
-    denominations = Denomination.query.all()
+    reference = get_reference_data()
+    denominations = reference.denominations
     
     if request.method == 'POST':
         # Get selected denominations and topics from form
@@ -35,24 +42,10 @@ def compare():
             return redirect(url_for('doctrine.compare'))
         
         # Get the actual denominations
-        selected_denoms = Denomination.query.filter(Denomination.id.in_(denom_ids)).all()
+        selected_denoms = reference.get_denominations(denom_ids)
         
         # Gather beliefs for each denomination on the selected topics
-        comparison_results = {}
-        for topic in topics:
-            comparison_results[topic] = {}
-            for denom in selected_denoms:
-                belief = Belief.query.filter_by(denomination_id=denom.id, topic=topic).first()
-                if belief:
-                    comparison_results[topic][denom.name] = {
-                        'summary': belief.summary,
-                        'scripture_references': belief.scripture_references
-                    }
-                else:
-                    comparison_results[topic][denom.name] = {
-                        'summary': 'No information available',
-                        'scripture_references': ''
-                    }
+        comparison_results = build_comparison(selected_denoms, topics, reference.beliefs)
         
         # Render the comparison results
         return render_template(
@@ -64,8 +57,7 @@ def compare():
         )
     
     # GET request - show the comparison form
-    topics = db.session.query(Belief.topic).distinct().all()
-    topics = [topic[0] for topic in topics]
+    topics = reference.topics
     
     return render_template(
         'doctrine/compare.html',
@@ -82,22 +74,25 @@ def save_comparison():
     description = request.form.get('description')
     denom_ids = request.form.getlist('denominations')
     topics = request.form.getlist('topics')
-    results = request.form.get('results')
     
-    if not title or not denom_ids or not topics or not results:
+    if not title or not denom_ids or not topics:
         return jsonify({'success': False, 'message': 'Missing required fields'})
     
-    # Create new comparison record
-    new_comparison = DoctrineComparison(
-        title=title,
-        description=description,
-        denominations=','.join(denom_ids),
-        topics=','.join(topics),
-        results=results,
-        user_id=current_user.id
-    )
+    reference = get_reference_data()
+    selected_denoms = reference.get_denominations(denom_ids)
     
     try:
+        # Identical comparisons share one stored result
+        result_id, _ = get_comparison_result(selected_denoms, topics, reference)
+        
+        new_comparison = DoctrineComparison(
+            title=title,
+            description=description,
+            denominations=','.join(str(denom.id) for denom in selected_denoms),
+            topics=','.join(topics),
+            result_id=result_id,
+            user_id=current_user.id
+        )
         db.session.add(new_comparison)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Comparison saved successfully'})
@@ -130,10 +125,14 @@ def view_comparison(id):
     topics = comparison.topics.split(',')
     
     # Get the denomination objects
-    denominations = Denomination.query.filter(Denomination.id.in_(denom_ids)).all()
+    reference = get_reference_data()
+    denominations = reference.get_denominations(denom_ids)
     
-    # Parse the results
-    results = json.loads(comparison.results)
+    # Reuse the shared result; it is only recomputed when beliefs have changed
+    result_id, results = get_comparison_result(denominations, topics, reference)
+    if comparison.result_id != result_id:
+        comparison.result_id = result_id
+        db.session.commit()
     
     return render_template(
         'doctrine/view_comparison.html',
@@ -144,11 +143,114 @@ def view_comparison(id):
     )
 
 
+@doctrine_bp.route('/similarity')
+@login_required
+def similarity():
+    """Heatmap of doctrinal similarity between denominations, per topic and overall"""
+    reference = get_reference_data()
+    selected_ids = request.args.getlist('denominations')
+    
+    # The matrix is computed once per belief-data version and only sliced here
+    matrix = get_similarity_matrix(reference)
+    denominations, topics, per_topic, overall = matrix.select(selected_ids)
+    
+    overall_rows = [[to_percent(value) for value in row] for row in overall]
+    topic_rows = {
+        topic: [[to_percent(value) for value in row] for row in per_topic[position]]
+        for position, topic in enumerate(topics)
+    }
+    
+    return render_template(
+        'doctrine/similarity.html',
+        all_denominations=reference.denominations,
+        selected_ids=[denom.id for denom in denominations] if selected_ids else [],
+        denominations=denominations,
+        topics=topics,
+        overall=overall_rows,
+        per_topic=topic_rows
+    )
+
+
+COMPARISON_EXPORT_FIELDS = ['topic', 'denomination', 'summary', 'scripture_references']
+SAVED_COMPARISON_EXPORT_FIELDS = ['comparison_id', 'title'] + COMPARISON_EXPORT_FIELDS
+
+
+def _comparison_rows(reference, denominations, topics):
+    """Yield one export row per (topic, denomination) cell"""
+    for topic in topics:
+        for denom in denominations:
+            belief = reference.beliefs.get((denom.id, topic))
+            yield {
+                'topic': topic,
+                'denomination': denom.name,
+                'summary': belief.summary if belief else 'No information available',
+                'scripture_references': (belief.scripture_references or '') if belief else ''
+            }
+
+
+def _saved_comparison_rows(user_id):
+    """Yield export rows for every saved comparison, fetching them in batches"""
+    comparisons = DoctrineComparison.query.filter_by(user_id=user_id) \
+        .options(joinedload(DoctrineComparison.result)) \
+        .order_by(DoctrineComparison.id) \
+        .yield_per(100)
+    for comparison in comparisons:
+        payload = comparison.result.results if comparison.result else comparison.results
+        try:
+            results = json.loads(payload) if payload else {}
+        except ValueError:
+            results = {}
+        for topic, cells in results.items():
+            for denom_name, cell in cells.items():
+                yield {
+                    'comparison_id': comparison.id,
+                    'title': comparison.title,
+                    'topic': topic,
+                    'denomination': denom_name,
+                    'summary': cell.get('summary', ''),
+                    'scripture_references': cell.get('scripture_references') or ''
+                }
+
+
+@doctrine_bp.route('/export.<fmt>')
+@login_required
+def export_comparison(fmt):
+    """Stream a comparison as CSV, JSON or NDJSON (all denominations/topics by default)"""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    
+    reference = get_reference_data()
+    denom_ids = request.args.getlist('denominations')
+    topics = request.args.getlist('topics') or reference.topics
+    denominations = reference.get_denominations(denom_ids) if denom_ids else reference.denominations
+    
+    return streaming_export(
+        _comparison_rows(reference, denominations, topics),
+        fmt,
+        COMPARISON_EXPORT_FIELDS,
+        'doctrine_comparison'
+    )
+
+
+@doctrine_bp.route('/my_comparisons/export.<fmt>')
+@login_required
+def export_saved_comparisons(fmt):
+    """Stream every saved comparison of the current user as CSV, JSON or NDJSON"""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    
+    return streaming_export(
+        _saved_comparison_rows(current_user.id),
+        fmt,
+        SAVED_COMPARISON_EXPORT_FIELDS,
+        'saved_comparisons'
+    )
+
+
 @doctrine_bp.route('/api/topics/<int:denomination_id>')
 def get_denomination_topics(denomination_id):
     """API endpoint to get topics for a specific denomination"""
-    beliefs = Belief.query.filter_by(denomination_id=denomination_id).all()
-    topics = [belief.topic for belief in beliefs]
+    topics = get_reference_data().topics_by_denomination.get(denomination_id, [])
     return jsonify(topics)
 
 
@@ -156,19 +258,20 @@ def get_denomination_topics(denomination_id):
 @login_required
 def amillennial_comparison():
     """Special comparison view with amillennial theology as the foundation"""
+    reference = get_reference_data()
+    
     # Get the Amillennial denomination
-    amillennial = Denomination.query.filter_by(name="Amillennial").first()
+    amillennial = reference.find_denomination("Amillennial")
     
     if not amillennial:
         flash('Amillennial theological foundation not found.', 'warning')
         return redirect(url_for('doctrine.index'))
     
     # Get all other denominations
-    other_denominations = Denomination.query.filter(Denomination.id != amillennial.id).all()
+    other_denominations = [denom for denom in reference.denominations if denom.id != amillennial.id]
     
     # Get amillennial beliefs/topics
-    amillennial_beliefs = Belief.query.filter_by(denomination_id=amillennial.id).all()
-    topics = [belief.topic for belief in amillennial_beliefs]
+    topics = reference.topics_by_denomination.get(amillennial.id, [])
     
     # If we're submitting the form with selected denominations
     if request.method == 'GET' and request.args.get('compare') == 'true':
@@ -184,44 +287,11 @@ def amillennial_comparison():
             )
         
         # Get the actual denominations
-        selected_denoms = Denomination.query.filter(Denomination.id.in_(selected_denomination_ids)).all()
+        selected_denoms = reference.get_denominations(selected_denomination_ids)
         selected_denoms.insert(0, amillennial)  # Ensure amillennial is first
         
         # Gather comparison results
-        comparison_results = {}
-        for topic in topics:
-            comparison_results[topic] = {}
-            
-            # Get the amillennial belief for this topic
-            amillennial_belief = Belief.query.filter_by(
-                denomination_id=amillennial.id, 
-                topic=topic
-            ).first()
-            
-            if amillennial_belief:
-                comparison_results[topic][amillennial.name] = {
-                    'summary': amillennial_belief.summary,
-                    'scripture_references': amillennial_belief.scripture_references
-                }
-            else:
-                comparison_results[topic][amillennial.name] = {
-                    'summary': 'No information available',
-                    'scripture_references': ''
-                }
-            
-            # Get the beliefs for other denominations
-            for denom in selected_denoms[1:]:  # Skip amillennial since we've already added it
-                belief = Belief.query.filter_by(denomination_id=denom.id, topic=topic).first()
-                if belief:
-                    comparison_results[topic][denom.name] = {
-                        'summary': belief.summary,
-                        'scripture_references': belief.scripture_references
-                    }
-                else:
-                    comparison_results[topic][denom.name] = {
-                        'summary': 'No information available',
-                        'scripture_references': ''
-                    }
+        comparison_results = build_comparison(selected_denoms, topics, reference.beliefs)
         
         # Render the comparison results
         return render_template(
@@ -0,0 +1,161 @@
+"""
+Doctrinal similarity between denominations
+
+Each belief is represented by a TF-IDF vector of its summary text and a
+binary vector of the verses it cites. Per-topic similarity is a weighted mix
+of the two cosine similarities; the overall score is the mean across topics
+both denominations address. The full (topic x denomination x denomination)
+tensor is computed once per reference data version and sliced per request.
+"""
+import math
+import re
+import threading
+
+import numpy as np
+
+from modules.scripture import parse_references, range_indexes
+
+TEXT_WEIGHT = 0.7
+SCRIPTURE_WEIGHT = 0.3
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their them they
+this to was were which who will with not but all also into through than then there these
+those our we his him he she her can may one any each both such only
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z][a-z'-]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in _TOKEN_RE.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+class SimilarityMatrix:
+    """Precomputed doctrinal similarity for every denomination and topic"""
+
+    def __init__(self, version, denominations, topics, per_topic):
+        self.version = version
+        self.denominations = denominations
+        self.topics = topics
+        self.per_topic = per_topic  # (topics, denominations, denominations), NaN where missing
+        self._positions = {denom.id: position for position, denom in enumerate(denominations)}
+
+        with np.errstate(invalid='ignore'):
+            counts = np.sum(~np.isnan(per_topic), axis=0)
+            totals = np.nansum(per_topic, axis=0)
+            self.overall = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+    def select(self, denomination_ids=None):
+        """
+        Slice the matrix down to a set of denominations
+
+        Returns:
+            tuple: (denominations, topics, per-topic array, overall array);
+                topics no selected denomination addresses are dropped
+        """
+        if denomination_ids:
+            wanted = {int(denom_id) for denom_id in denomination_ids if str(denom_id).isdigit()}
+            positions = [self._positions[denom.id] for denom in self.denominations if denom.id in wanted]
+        else:
+            positions = list(range(len(self.denominations)))
+
+        index = np.ix_(positions, positions)
+        per_topic = self.per_topic[:, positions][:, :, positions]
+        topic_mask = ~np.all(np.isnan(per_topic), axis=(1, 2))
+        denominations = [self.denominations[position] for position in positions]
+        topics = [topic for topic, keep in zip(self.topics, topic_mask) if keep]
+        return denominations, topics, per_topic[topic_mask], self.overall[index]
+
+
+def _cosine_tensor(vectors, present):
+    """Pairwise cosine similarity per topic; NaN where either side is missing or empty"""
+    norms = np.linalg.norm(vectors, axis=2)
+    unit = np.divide(vectors, norms[:, :, None], out=np.zeros_like(vectors), where=norms[:, :, None] > 0)
+    sims = np.einsum('tdv,tev->tde', unit, unit)
+    valid = present & (norms > 0)
+    sims[~(valid[:, :, None] & valid[:, None, :])] = np.nan
+    return sims
+
+
+def build_similarity_matrix(reference):
+    """
+    Compute the similarity tensor for every denomination in a reference snapshot
+
+    Args:
+        reference (ReferenceSnapshot): Current denomination/belief snapshot
+
+    Returns:
+        SimilarityMatrix
+    """
+    denominations = reference.denominations
+    topics = reference.topics
+    denom_positions = {denom.id: position for position, denom in enumerate(denominations)}
+    topic_positions = {topic: position for position, topic in enumerate(topics)}
+
+    cells = []
+    for (denom_id, topic), belief in reference.beliefs.items():
+        if denom_id in denom_positions:
+            cells.append((topic_positions[topic], denom_positions[denom_id], belief))
+
+    shape = (len(topics), len(denominations))
+    present = np.zeros(shape, dtype=bool)
+
+    # Vocabularies: summary terms and cited verses
+    documents = [tokenize(belief.summary) for _, _, belief in cells]
+    vocabulary = {term: i for i, term in enumerate(sorted({term for doc in documents for term in doc}))}
+    verse_sets = []
+    for _, _, belief in cells:
+        verses = set()
+        for scripture_range in parse_references(belief.scripture_references):
+            start, stop = range_indexes(scripture_range)
+            verses.update(range(start, stop))
+        verse_sets.append(verses)
+    verse_vocabulary = {verse: i for i, verse in enumerate(sorted(set().union(*verse_sets)))}
+
+    text = np.zeros(shape + (len(vocabulary),))
+    scripture = np.zeros(shape + (len(verse_vocabulary),))
+    for (topic_pos, denom_pos, _), doc, verses in zip(cells, documents, verse_sets):
+        present[topic_pos, denom_pos] = True
+        for term in doc:
+            text[topic_pos, denom_pos, vocabulary[term]] += 1
+        for verse in verses:
+            scripture[topic_pos, denom_pos, verse_vocabulary[verse]] = 1
+
+    # Sublinear term frequency times smoothed inverse document frequency
+    document_frequency = np.count_nonzero(text, axis=(0, 1))
+    idf = np.log((1 + len(cells)) / (1 + document_frequency)) + 1
+    text = np.log1p(text) * idf
+
+    text_sims = _cosine_tensor(text, present)
+    scripture_sims = _cosine_tensor(scripture, present)
+    per_topic = np.where(
+        np.isnan(scripture_sims),
+        text_sims,
+        TEXT_WEIGHT * text_sims + SCRIPTURE_WEIGHT * scripture_sims
+    )
+    return SimilarityMatrix(reference.version, denominations, topics, per_topic)
+
+
+_lock = threading.Lock()
+_matrix = None
+
+
+def get_similarity_matrix(reference):
+    """Return the similarity matrix for the snapshot's version, computing it once"""
+    global _matrix
+    matrix = _matrix
+    if matrix is not None and matrix.version == reference.version:
+        return matrix
+    with _lock:
+        if _matrix is None or _matrix.version != reference.version:
+            _matrix = build_similarity_matrix(reference)
+        return _matrix
+
+
+def to_percent(value):
+    """Format a similarity value for display, or None when undefined"""
+    if value is None or math.isnan(value):
+        return None
+    return int(round(float(value) * 100))
@@ -0,0 +1,69 @@
+import csv
+import json
+
+from flask import Response, stream_with_context
+
+# Supported export format -> response mimetype
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _LineBuffer:
+    """File-like object that hands back whatever csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(records, fieldnames):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(fieldnames)
+    for record in records:
+        yield writer.writerow([record.get(field, '') for field in fieldnames])
+
+
+def _json_lines(records):
+    yield '['
+    first = True
+    for record in records:
+        yield ('' if first else ',') + '\n' + json.dumps(record)
+        first = False
+    yield '\n]\n'
+
+
+def _ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+
+def serialize_records(records, fmt, fieldnames):
+    """
+    Lazily serialize an iterable of dicts, one chunk per record
+
+    Args:
+        records (iterable): Dicts to export; consumed one at a time
+        fmt (str): One of EXPORT_FORMATS
+        fieldnames (list): Column order for CSV output
+
+    Returns:
+        generator: Text chunks
+    """
+    if fmt == 'csv':
+        return _csv_lines(records, fieldnames)
+    if fmt == 'json':
+        return _json_lines(records)
+    if fmt == 'ndjson':
+        return _ndjson_lines(records)
+    raise ValueError(f'Unsupported export format: {fmt}')
+
+
+def streaming_export(records, fmt, fieldnames, filename):
+    """Build a streamed download response for the records"""
+    return Response(
+        stream_with_context(serialize_records(records, fmt, fieldnames)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    )
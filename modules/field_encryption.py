@@ -0,0 +1,191 @@
+"""
+Field-level encryption
+
+Sensitive text columns are stored as "enc:<key id>:<Fernet token>". Model
+attributes built with encrypted_property() encrypt on assignment and decrypt
+only when read, so code that never touches the attribute (and queries that
+leave the column unloaded) never pays for decryption.
+
+Keys come from COUNSELING_ENCRYPTION_KEYS (app config or environment): a
+comma-separated list of Fernet keys, newest first, read once per app. New
+values are always encrypted with the first key; older keys stay usable for
+reading until reencrypt_fields() has moved every row onto the current key.
+Without keys, only a debug or testing app falls back to a key derived from
+its secret key. Values written
+before encryption was enabled are read as plaintext and encrypted by the same
+job.
+"""
+import base64
+import hashlib
+import logging
+import os
+
+from cryptography.fernet import Fernet, InvalidToken
+from flask import current_app
+from sqlalchemy import or_, select, update
+
+ENCRYPTED_PREFIX = 'enc:'
+
+REENCRYPT_BATCH_SIZE = 200
+
+
+class DecryptionError(Exception):
+    """Raised when a stored value cannot be decrypted with any configured key"""
+    pass
+
+
+class EncryptionKeyError(Exception):
+    """Raised when no encryption keys are configured outside development"""
+    pass
+
+
+def key_id(key):
+    """Short, stable identifier for a key, stored alongside each value"""
+    return hashlib.sha256(key.encode() if isinstance(key, str) else key).hexdigest()[:8]
+
+
+class FieldCipher:
+    """Encrypts with the primary key and decrypts with whichever key a value names"""
+
+    def __init__(self, keys):
+        self.fernets = {key_id(key): Fernet(key) for key in keys}
+        self.primary_id = key_id(keys[0])
+        self.primary = self.fernets[self.primary_id]
+
+    def encrypt(self, plaintext):
+        if plaintext is None:
+            return None
+        token = self.primary.encrypt(plaintext.encode('utf-8')).decode('ascii')
+        return f'{ENCRYPTED_PREFIX}{self.primary_id}:{token}'
+
+    def decrypt(self, stored):
+        if stored is None or not stored.startswith(ENCRYPTED_PREFIX):
+            # Written before encryption was enabled
+            return stored
+        stored_key_id, _, token = stored[len(ENCRYPTED_PREFIX):].partition(':')
+        fernet = self.fernets.get(stored_key_id)
+        if fernet is None:
+            raise DecryptionError(f'No encryption key with id {stored_key_id} is configured')
+        try:
+            return fernet.decrypt(token.encode('ascii')).decode('utf-8')
+        except InvalidToken:
+            raise DecryptionError('Stored value failed authentication')
+
+    def current_prefix(self):
+        """Prefix of values already encrypted with the primary key"""
+        return f'{ENCRYPTED_PREFIX}{self.primary_id}:'
+
+
+def _configured_keys(app):
+    keys = app.config.get('COUNSELING_ENCRYPTION_KEYS') or os.environ.get('COUNSELING_ENCRYPTION_KEYS')
+    if keys:
+        return [key.strip() for key in keys.split(',') if key.strip()]
+
+    # Deriving a key from the secret key ties stored data to it; allow that
+    # only for local development and tests
+    if not (app.debug or app.testing):
+        raise EncryptionKeyError('COUNSELING_ENCRYPTION_KEYS must be set to store counseling notes')
+    logging.warning("COUNSELING_ENCRYPTION_KEYS is not set; deriving a development key from the app secret key")
+    secret = app.secret_key or ''
+    return [base64.urlsafe_b64encode(hashlib.sha256(secret.encode('utf-8')).digest()).decode('ascii')]
+
+
+def get_cipher():
+    """The FieldCipher for the current app, built from its keys on first use"""
+    cipher = current_app.extensions.get('field_encryption')
+    if cipher is None:
+        app = current_app._get_current_object()
+        cipher = app.extensions['field_encryption'] = FieldCipher(_configured_keys(app))
+    return cipher
+
+
+def encrypted_property(column_attribute):
+    """
+    Plaintext view of an encrypted column attribute
+
+    Args:
+        column_attribute (str): Name of the mapped attribute holding the stored value
+
+    Returns:
+        property: Decrypts on first read (cached until the stored value changes)
+            and encrypts on assignment
+    """
+    cache_attribute = f'_plaintext{column_attribute}'
+
+    def getter(self):
+        stored = getattr(self, column_attribute)
+        cached = self.__dict__.get(cache_attribute)
+        if cached is not None and cached[0] == stored:
+            return cached[1]
+        value = get_cipher().decrypt(stored)
+        self.__dict__[cache_attribute] = (stored, value)
+        return value
+
+    def setter(self, value):
+        stored = get_cipher().encrypt(value)
+        setattr(self, column_attribute, stored)
+        self.__dict__[cache_attribute] = (stored, value)
+
+    return property(getter, setter)
+
+
+def reencrypt_fields(session, table, columns, on_progress=None, batch_size=REENCRYPT_BATCH_SIZE):
+    """
+    Move every value of some encrypted columns onto the primary key
+
+    Rows are processed in id order in batches, each committed on its own, so
+    the table stays available and an interrupted run can simply be restarted.
+    Plaintext values are encrypted; values on an older key are rotated. An
+    updated_at column keeps its value. Rows changed between being read and
+    rewritten are left alone rather than overwritten.
+
+    Args:
+        session: SQLAlchemy session
+        table: Table holding the columns; must have an integer id primary key
+        columns (list): Column names
+        on_progress (callable, optional): Called as on_progress(rows updated)
+            after each batch
+        batch_size (int): Rows per batch
+
+    Returns:
+        int: Number of rows updated
+    """
+    cipher = get_cipher()
+    prefix = cipher.current_prefix()
+    # Anything not already on the primary key, including legacy plaintext
+    stale = or_(*[
+        (table.c[column].isnot(None)) & ~table.c[column].startswith(prefix, autoescape=True)
+        for column in columns
+    ])
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(table.c.id, *[table.c[column] for column in columns])
+            .where(table.c.id > last_id, stale)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+
+        for row in rows:
+            values = {}
+            unchanged = [table.c.id == row.id]
+            for column in columns:
+                stored = row._mapping[table.c[column]]
+                if stored is not None and not stored.startswith(prefix):
+                    values[column] = cipher.encrypt(cipher.decrypt(stored))
+                    unchanged.append(table.c[column] == stored)
+            if 'updated_at' in table.c:
+                # Re-encrypting is not an edit; keep the column's onupdate from firing
+                values['updated_at'] = table.c.updated_at
+            # A row saved since it was read already holds the new value on the primary key
+            result = session.execute(update(table).where(*unchanged).values(**values))
+            updated += result.rowcount
+        session.commit()
+
+        last_id = rows[-1].id
+        if on_progress:
+            on_progress(updated)
@@ -0,0 +1,353 @@
+"""
+Illustration library search
+
+Sermon illustrations, resources and theological quotes are indexed in a
+per-worker, in-memory BM25 inverted index that is built once and then kept
+current incrementally:
+
+- Sermons are caught up by updated_at watermark, re-reading only rows saved
+  since the last check. Deleted sermons are dropped on commit in the worker
+  that deleted them, and lazily elsewhere when a search result no longer
+  exists.
+- Resources and quotes are small curated tables. They are reloaded when the
+  'illustration_library' DataVersion counter changes.
+
+Sermon illustrations are only suggested back to the sermon's own author.
+"""
+import heapq
+import json
+import math
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import Resource, Sermon, TheologicalAuthor, TheologicalQuote
+from modules.doctrine_similarity import tokenize
+from modules.extensions import db
+from modules.reference_data import bump_data_version, read_data_version
+
+LIBRARY_VERSION = 'illustration_library'
+
+DEFAULT_CHECK_INTERVAL = 5
+
+# Re-read sermons saved this long before the watermark, so rows committed late
+# or stamped by a worker with a slightly different clock are not missed
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+# Resource content beyond this many characters is not indexed
+MAX_INDEXED_CHARS = 5000
+MAX_DESCRIPTION_CHARS = 300
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring; documents can be added and removed"""
+
+    def __init__(self):
+        self.postings = {}  # term -> {doc key: term frequency}
+        self.terms = {}  # doc key -> distinct terms, so removal touches only its postings
+        self.lengths = {}  # doc key -> token count
+        self.payloads = {}  # doc key -> stored document
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, key, tokens, payload):
+        """Index a document, replacing any previous version with the same key"""
+        self.remove(key)
+        if not tokens:
+            return
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[key] = count
+        self.terms[key] = tuple(counts)
+        self.lengths[key] = len(tokens)
+        self.payloads[key] = payload
+        self.total_length += len(tokens)
+
+    def remove(self, key):
+        """Drop a document from the index if present"""
+        length = self.lengths.pop(key, None)
+        if length is None:
+            return
+        self.total_length -= length
+        self.payloads.pop(key, None)
+        for term in self.terms.pop(key):
+            docs = self.postings[term]
+            del docs[key]
+            if not docs:
+                del self.postings[term]
+
+    def search(self, tokens, limit, accept=None):
+        """
+        Rank documents for a query
+
+        Args:
+            tokens (list): Query tokens
+            limit (int): Maximum number of results
+            accept (callable, optional): Predicate on a payload; rejected
+                documents are skipped
+
+        Returns:
+            list: (score, key, payload) tuples, best first
+        """
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = self.total_length / count
+
+        scores = {}
+        for term in set(tokens):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for key, frequency in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[key] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        candidates = (
+            (score, key, self.payloads[key]) for key, score in scores.items()
+            if accept is None or accept(self.payloads[key])
+        )
+        return heapq.nlargest(limit, candidates, key=lambda item: (item[0], item[1]))
+
+
+class IllustrationLibrary:
+    """BM25 index over sermon illustrations, resources and quotes"""
+
+    def __init__(self):
+        self.index = BM25Index()
+        self.sermon_docs = {}  # sermon id -> doc keys
+        self.library_docs = set()
+        self.library_version = None
+        self.watermark = None
+        self.checked_at = 0.0
+
+    def index_sermon(self, sermon_id, user_id, theme, illustrations):
+        """(Re)index the illustrations of one sermon"""
+        self.remove_sermon(sermon_id)
+        try:
+            items = json.loads(illustrations) if illustrations else []
+        except ValueError:
+            return
+        if not isinstance(items, list):
+            return
+
+        keys = []
+        for position, item in enumerate(items):
+            if isinstance(item, str):
+                item = {'title': item, 'description': ''}
+            if not isinstance(item, dict):
+                continue
+            title = str(item.get('title') or '')
+            description = str(item.get('description') or '')
+            key = ('sermon', sermon_id, position)
+            self.index.add(key, tokenize(f'{title} {description} {theme or ""}'), {
+                'title': title,
+                'description': description,
+                'source': 'sermon',
+                'sermon_id': sermon_id,
+                'user_id': user_id
+            })
+            keys.append(key)
+        if keys:
+            self.sermon_docs[sermon_id] = keys
+
+    def remove_sermon(self, sermon_id):
+        for key in self.sermon_docs.pop(sermon_id, []):
+            self.index.remove(key)
+
+    def catch_up_sermons(self):
+        """Index sermons saved since the watermark"""
+        query = select(Sermon.id, Sermon.user_id, Sermon.theme, Sermon.illustrations, Sermon.updated_at)
+        if self.watermark is not None:
+            query = query.where(Sermon.updated_at >= self.watermark - WATERMARK_OVERLAP)
+        latest = self.watermark
+        for row in db.session.execute(query):
+            self.index_sermon(row.id, row.user_id, row.theme, row.illustrations)
+            if row.updated_at and (latest is None or row.updated_at > latest):
+                latest = row.updated_at
+        self.watermark = latest
+
+    def reload_library(self, version):
+        """Re-index all resources and quotes"""
+        for key in self.library_docs:
+            self.index.remove(key)
+        self.library_docs = set()
+
+        resources = db.session.execute(select(
+            Resource.id, Resource.title, Resource.topic, Resource.tags,
+            Resource.description, Resource.content
+        ))
+        for row in resources:
+            text = ' '.join(filter(None, [row.title, row.topic, row.tags, row.description]))
+            text = f'{text} {(row.content or "")[:MAX_INDEXED_CHARS]}'
+            key = ('resource', row.id)
+            self.index.add(key, tokenize(text), {
+                'title': row.title,
+                'description': (row.description or row.content or '')[:MAX_DESCRIPTION_CHARS],
+                'source': 'resource'
+            })
+            self.library_docs.add(key)
+
+        quotes = db.session.execute(
+            select(
+                TheologicalQuote.id, TheologicalQuote.quote_text, TheologicalQuote.source,
+                TheologicalQuote.topic, TheologicalQuote.context, TheologicalAuthor.name
+            ).join(TheologicalAuthor, TheologicalQuote.author_id == TheologicalAuthor.id)
+        )
+        for row in quotes:
+            text = ' '.join(filter(None, [row.quote_text, row.topic, row.context, row.source]))
+            key = ('quote', row.id)
+            title = f'{row.name}, {row.source}' if row.source else row.name
+            self.index.add(key, tokenize(text), {
+                'title': title,
+                'description': row.quote_text,
+                'source': 'quote'
+            })
+            self.library_docs.add(key)
+        self.library_version = version
+
+
+_lock = threading.Lock()
+_library = None
+
+
+def _current_library():
+    """Return this worker's library, building it or catching it up when due"""
+    global _library
+    interval = current_app.config.get('ILLUSTRATION_INDEX_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+    with _lock:
+        library = _library
+        if library is None:
+            library = IllustrationLibrary()
+        elif time.monotonic() - library.checked_at < interval:
+            return library
+
+        version = read_data_version(LIBRARY_VERSION)
+        if version != library.library_version:
+            library.reload_library(version)
+        library.catch_up_sermons()
+        library.checked_at = time.monotonic()
+        _library = library
+        return library
+
+
+def _existing_sermons(sermon_ids, user_id):
+    if not sermon_ids:
+        return set()
+    return set(db.session.execute(
+        select(Sermon.id).where(Sermon.id.in_(sermon_ids), Sermon.user_id == user_id)
+    ).scalars())
+
+
+def search_illustrations(theme, user_id, limit=5):
+    """
+    Top illustrations for a theme
+
+    Args:
+        theme (str): Theme or free-text query
+        user_id (int): Requesting user; only their own sermons are searched
+        limit (int): Maximum number of suggestions
+
+    Returns:
+        list: {'title', 'description', 'source'} dicts, best first
+    """
+    tokens = tokenize(theme)
+    if not tokens:
+        return []
+
+    library = _current_library()
+    with _lock:
+        ranked = library.index.search(
+            tokens,
+            limit * 3,
+            accept=lambda payload: payload['source'] != 'sermon' or payload['user_id'] == user_id
+        )
+
+    # Sermons deleted by another worker are still indexed here; drop them now
+    sermon_ids = {payload['sermon_id'] for _, _, payload in ranked if payload['source'] == 'sermon'}
+    existing = _existing_sermons(sermon_ids, user_id)
+    if sermon_ids - existing:
+        with _lock:
+            for sermon_id in sermon_ids - existing:
+                library.remove_sermon(sermon_id)
+
+    suggestions = []
+    seen = set()
+    for _, _, payload in ranked:
+        if payload['source'] == 'sermon' and payload['sermon_id'] not in existing:
+            continue
+        dedupe_key = (payload['title'].strip().lower(), payload['description'].strip().lower())
+        if dedupe_key in seen:
+            continue
+        seen.add(dedupe_key)
+        suggestions.append({
+            'title': payload['title'],
+            'description': payload['description'],
+            'source': payload['source']
+        })
+        if len(suggestions) == limit:
+            break
+    return suggestions
+
+
+def _mark_due():
+    """Make the next search in this worker catch up immediately"""
+    with _lock:
+        if _library is not None:
+            _library.checked_at = 0.0
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_changes(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, (Resource, TheologicalQuote, TheologicalAuthor)) for obj in changed):
+        bump_data_version(session.connection(), LIBRARY_VERSION)
+        session.info['illustration_index_due'] = True
+    if any(isinstance(obj, Sermon) for obj in changed):
+        session.info['illustration_index_due'] = True
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Sermon)]
+    if deleted:
+        session.info.setdefault('illustration_deleted_sermons', set()).update(deleted)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    if mapper.class_ in (Resource, TheologicalQuote, TheologicalAuthor):
+        bump_data_version(orm_execute_state.session.connection(), LIBRARY_VERSION)
+        orm_execute_state.session.info['illustration_index_due'] = True
+    elif mapper.class_ is Sermon:
+        orm_execute_state.session.info['illustration_index_due'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_on_commit(session):
+    deleted = session.info.pop('illustration_deleted_sermons', None)
+    if session.info.pop('illustration_index_due', False) or deleted:
+        if deleted:
+            with _lock:
+                if _library is not None:
+                    for sermon_id in deleted:
+                        _library.remove_sermon(sermon_id)
+        _mark_due()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('illustration_index_due', None)
+    session.info.pop('illustration_deleted_sermons', None)
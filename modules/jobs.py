@@ -0,0 +1,106 @@
+"""
+Background jobs
+
+Slow work runs on a small per-process thread pool so the request that started
+it can return immediately. Job state lives in the BackgroundJob table, so a
+client can poll any worker for the result.
+"""
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import BackgroundJob
+from modules.extensions import db
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+# A pending or running job not updated for this long is assumed to have died
+# with its worker (restart, crash) and is no longer reused by submit_job
+JOB_STALE_AFTER = timedelta(minutes=int(os.environ.get('JOB_STALE_MINUTES', 15)))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+
+
+def _run(app, job_id, func, args):
+    with app.app_context():
+        job = db.session.get(BackgroundJob, job_id)
+        job.status = 'running'
+        db.session.commit()
+        try:
+            result = func(job_id, *args)
+            job = db.session.get(BackgroundJob, job_id)
+            job.status = 'done'
+            job.result = json.dumps(result)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.exception(f"Background job {job_id} failed")
+            job = db.session.get(BackgroundJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def submit_job(kind, func, *args, user_id=None, dedupe_key=None):
+    """
+    Record a job and start it in the background
+
+    Args:
+        kind (str): Job type, e.g. 'outline'
+        func (callable): Called as func(job_id, *args) inside an app context;
+            its JSON-serializable return value becomes the job result
+        user_id (int, optional): Owner of the job
+        dedupe_key (str, optional): If a pending or running job with this key
+            was updated within JOB_STALE_AFTER, it is returned instead of
+            starting a new one; older ones are marked failed
+
+    Returns:
+        BackgroundJob
+    """
+    if dedupe_key:
+        active = BackgroundJob.query.filter(
+            BackgroundJob.dedupe_key == dedupe_key,
+            BackgroundJob.status.in_(['pending', 'running'])
+        ).order_by(BackgroundJob.updated_at.desc()).all()
+        cutoff = datetime.utcnow() - JOB_STALE_AFTER
+        for job in active:
+            if job.updated_at and job.updated_at >= cutoff:
+                return job
+            job.status = 'failed'
+            job.error = 'Job stopped responding'
+
+    job = BackgroundJob(id=uuid.uuid4().hex, kind=kind, user_id=user_id, dedupe_key=dedupe_key)
+    db.session.add(job)
+    db.session.commit()
+
+    _executor.submit(_run, current_app._get_current_object(), job.id, func, args)
+    return job
+
+
+def update_progress(job_id, progress, total=None):
+    """Record progress for a running job (commits the current session)"""
+    job = db.session.get(BackgroundJob, job_id)
+    job.progress = progress
+    if total is not None:
+        job.total = total
+    db.session.commit()
+
+
+def job_status(job):
+    """JSON-friendly view of a job"""
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error
+    }
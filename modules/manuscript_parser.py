@@ -0,0 +1,223 @@
+"""
+Sermon manuscript parsing
+
+Pure functions that turn an existing manuscript file (Markdown, plain text or
+DOCX) into the fields of a new sermon. Title, passage and date come from
+Markdown front matter or DOCX document properties when present, then a
+leading "# Heading", then the file name, e.g.
+"2023-05-14 - Romans 8.28-39 - More Than Conquerors.md".
+Nothing here touches the database or Flask, so parsing can run in a separate
+process.
+"""
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+from xml.etree import ElementTree
+
+from modules.scripture import parse_references
+
+MANUSCRIPT_EXTENSIONS = ('.md', '.markdown', '.txt', '.docx')
+
+# Column sizes on Sermon
+MAX_TITLE_LENGTH = 200
+MAX_PASSAGE_LENGTH = 200
+MAX_THEME_LENGTH = 100
+
+# Front matter / document property names -> sermon field
+METADATA_KEYS = {
+    'title': 'title',
+    'scripture': 'scripture_passage',
+    'scripture_passage': 'scripture_passage',
+    'passage': 'scripture_passage',
+    'text': 'scripture_passage',
+    'date': 'sermon_date',
+    'sermon_date': 'sermon_date',
+    'preached': 'sermon_date',
+    'theme': 'theme',
+    'topic': 'theme',
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%B %d, %Y', '%b %d, %Y', '%d %B %Y')
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_DC = '{http://purl.org/dc/elements/1.1/}'
+
+_DATE_IN_NAME_RE = re.compile(r'(\d{4})[-_.](\d{1,2})[-_.](\d{1,2})')
+_NAME_SEPARATOR_RE = re.compile(r'\s+-\s+|_-_|__|\s*\|\s*')
+_HEADING_RE = re.compile(r'^#\s+(.+?)\s*#*\s*$')
+
+
+def _parse_date(value):
+    """ISO date string for a date in one of DATE_FORMATS, or None"""
+    value = (value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _is_reference(text):
+    # A segment is a passage if the whole thing parses as scripture
+    text = text.strip()
+    return bool(text) and bool(re.match(r'^[1-3]?\s*[A-Za-z]', text)) \
+        and bool(re.search(r'\d', text)) and bool(parse_references(text))
+
+
+def _decode(data):
+    """Text of a file, with LF line endings like content saved from the editor"""
+    for encoding in ('utf-8-sig', 'cp1252'):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode('latin-1')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _front_matter(text):
+    """Split "---" delimited key: value front matter from the body"""
+    lines = text.splitlines()
+    if not lines or lines[0].strip() != '---':
+        return {}, text
+    for end, line in enumerate(lines[1:], start=1):
+        if line.strip() in ('---', '...'):
+            break
+    else:
+        return {}, text
+
+    metadata = {}
+    for line in lines[1:end]:
+        key, sep, value = line.partition(':')
+        if sep:
+            metadata[key.strip().lower()] = value.strip().strip('"\'')
+    return metadata, '\n'.join(lines[end + 1:])
+
+
+def _docx_text(data):
+    """Paragraph text and core properties of a DOCX file"""
+    with zipfile.ZipFile(io.BytesIO(data)) as docx:
+        root = ElementTree.fromstring(docx.read('word/document.xml'))
+        metadata = {}
+        if 'docProps/core.xml' in docx.namelist():
+            core = ElementTree.fromstring(docx.read('docProps/core.xml'))
+            for name in ('title', 'subject'):
+                element = core.find(_DC + name)
+                if element is not None and element.text:
+                    metadata[name] = element.text.strip()
+
+    paragraphs = []
+    for paragraph in root.iter(_W + 'p'):
+        parts = []
+        for element in paragraph.iter():
+            if element.tag == _W + 't':
+                parts.append(element.text or '')
+            elif element.tag == _W + 'tab':
+                parts.append('\t')
+            elif element.tag in (_W + 'br', _W + 'cr'):
+                parts.append('\n')
+        paragraphs.append(''.join(parts).strip())
+
+    # Word's "subject" property is the closest thing to a passage
+    if 'subject' in metadata:
+        metadata['scripture'] = metadata.pop('subject')
+    return metadata, '\n\n'.join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def metadata_from_filename(filename):
+    """
+    Title, passage and date encoded in a manuscript's file name
+
+    Args:
+        filename (str): File name, with or without directories
+
+    Returns:
+        dict: Any of 'title', 'scripture_passage' and 'sermon_date'
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    fields = {}
+
+    match = _DATE_IN_NAME_RE.search(stem)
+    if match:
+        sermon_date = _parse_date('-'.join(match.groups()))
+        if sermon_date:
+            fields['sermon_date'] = sermon_date
+            stem = stem[:match.start()] + ' - ' + stem[match.end():]
+
+    title_parts = []
+    for segment in _NAME_SEPARATOR_RE.split(stem):
+        segment = segment.strip(' -_')
+        if not segment:
+            continue
+        # "Romans 8.28-39" is a common file-safe spelling of "Romans 8:28-39"
+        reference = re.sub(r'(\d)\.(\d)', r'\1:\2', segment.replace('_', ' '))
+        if 'scripture_passage' not in fields and _is_reference(reference):
+            fields['scripture_passage'] = reference
+        else:
+            title_parts.append(segment.replace('_', ' '))
+    if title_parts:
+        fields['title'] = ' - '.join(title_parts)
+    return fields
+
+
+def parse_manuscript(filename, data):
+    """
+    Parse a manuscript file into new-sermon fields
+
+    Args:
+        filename (str): Original file name; its extension selects the parser
+        data (bytes): File contents
+
+    Returns:
+        dict: 'title', 'scripture_passage', 'theme', 'sermon_date' (ISO date
+            or None) and 'content'
+
+    Raises:
+        ValueError: If the file type is unsupported or the file is unreadable
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in MANUSCRIPT_EXTENSIONS:
+        raise ValueError(f'Unsupported file type: {extension or "none"}')
+
+    if extension == '.docx':
+        try:
+            metadata, body = _docx_text(data)
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            raise ValueError('Not a readable DOCX file')
+    else:
+        metadata, body = _front_matter(_decode(data))
+
+    # File name < leading Markdown heading < front matter / document properties
+    fields = metadata_from_filename(filename)
+    if extension in ('.md', '.markdown'):
+        lines = body.strip().splitlines()
+        match = _HEADING_RE.match(lines[0]) if lines else None
+        if match:
+            fields['title'] = match.group(1)
+            body = '\n'.join(lines[1:])
+    for key, value in metadata.items():
+        field = METADATA_KEYS.get(key)
+        if field and value:
+            fields[field] = value
+    if 'sermon_date' in fields:
+        fields['sermon_date'] = _parse_date(fields['sermon_date'])
+
+    title = fields.get('title') or os.path.splitext(os.path.basename(filename))[0]
+    # Drop a first paragraph that only repeats the title
+    first, _, rest = body.strip().partition('\n')
+    content = rest.strip() if first.strip().lower() == title.strip().lower() else body.strip()
+    if not content:
+        raise ValueError('File is empty')
+
+    return {
+        'title': title.strip()[:MAX_TITLE_LENGTH],
+        'scripture_passage': (fields.get('scripture_passage') or '').strip()[:MAX_PASSAGE_LENGTH] or None,
+        'theme': (fields.get('theme') or '').strip()[:MAX_THEME_LENGTH] or None,
+        'sermon_date': fields.get('sermon_date'),
+        'content': content,
+    }
@@ -0,0 +1,233 @@
+"""
+Sermon outline generation
+
+Outlines come from a pluggable OutlineBackend selected by the OUTLINE_BACKEND
+config value. Generation runs as a background job. Results are cached in
+OutlineCache under a key built from the backend and a normalized
+(scripture, theme) pair, so repeat requests for a passage skip the backend.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from models import Belief, OutlineCache, Resource, SermonOutlinePoint
+from modules.extensions import db
+from modules.scripture import ScriptureRange, format_range, parse_references
+from modules.scripture_index import find_sources
+from modules.sermon_content import dump, normalize_outline
+
+MAX_CACHED_OUTLINES = 256
+
+_outlines = OrderedDict()
+_outlines_lock = threading.Lock()
+
+
+class OutlineBackend:
+    """Base class for outline generation backends"""
+
+    name = None
+    # Bump when output changes so cached outlines from older logic are not reused
+    version = 1
+
+    def generate(self, scripture, theme):
+        """
+        Generate an outline
+
+        Returns:
+            list: Sections as {'title': str, 'points': [str]} dicts
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+
+class CorpusOutlineBackend(OutlineBackend):
+    """Deterministic outline built from the passage, our sermons and our resources"""
+
+    name = 'corpus'
+    version = 1
+
+    MAIN_POINTS = 3
+    MAX_RESOURCES = 3
+    # A heading must appear in this many sermons before it is suggested, so
+    # wording from any one preacher's sermon is never surfaced
+    MIN_SHARED_SERMONS = 3
+
+    DEFAULT_INTRODUCTION = ['Context of scripture', 'Relevance today', 'Main themes']
+    DEFAULT_CONCLUSION = ['Summary', 'Call to action', 'Final thought']
+
+    def generate(self, scripture, theme):
+        ranges = parse_references(scripture)
+        segments = self._segments(ranges)
+        resources = self._resources(theme)
+
+        introduction = self._common_points('introduction', self.DEFAULT_INTRODUCTION)
+        if ranges:
+            introduction = [f'Setting of {format_range(ranges[0])}'] + introduction[1:]
+        if theme:
+            introduction = introduction + [f'Why {theme} matters today']
+        outline = [{'title': 'Introduction', 'points': introduction}]
+
+        main_points = segments or [None] * self.MAIN_POINTS
+        for index, passage in enumerate(main_points):
+            points = ['Explanation']
+            if passage:
+                points.extend(f'Doctrinal connection: {topic}' for topic in self._belief_topics(passage))
+            else:
+                points.append('Scripture reference')
+            if index < len(resources):
+                points.append(f'Further reading: {resources[index]}')
+            points.append('Application')
+            outline.append({
+                'title': passage or f'Main Point {index + 1}',
+                'points': points
+            })
+
+        outline.append({
+            'title': 'Conclusion',
+            'points': self._common_points('conclusion', self.DEFAULT_CONCLUSION)
+        })
+        return outline
+
+    def _segments(self, ranges):
+        """Split the passage's verses into up to MAIN_POINTS contiguous movements"""
+        verses = [
+            (scripture_range.book, scripture_range.chapter, verse)
+            for scripture_range in ranges
+            for verse in range(scripture_range.verse_start, scripture_range.verse_end + 1)
+        ]
+        count = min(self.MAIN_POINTS, len(verses))
+        segments = []
+        for index in range(count):
+            chunk = verses[index * len(verses) // count:(index + 1) * len(verses) // count]
+            chunk_ranges = []
+            for book, chapter, verse in chunk:
+                last = chunk_ranges[-1] if chunk_ranges else None
+                if last and (last.book, last.chapter) == (book, chapter):
+                    chunk_ranges[-1] = last._replace(verse_end=verse)
+                else:
+                    chunk_ranges.append(ScriptureRange(book, chapter, verse, verse))
+            segments.append('; '.join(format_range(chunk_range) for chunk_range in chunk_ranges))
+        return segments
+
+    def _belief_topics(self, passage):
+        """Distinct belief topics citing a passage, via the scripture index"""
+        belief_ids = find_sources(passage, 'belief').get('belief')
+        if not belief_ids:
+            return []
+        topics = db.session.execute(
+            select(Belief.topic).where(Belief.id.in_(belief_ids)).distinct().order_by(Belief.topic)
+        ).scalars().all()
+        return topics[:2]
+
+    def _resources(self, theme):
+        """Titles of resources matching the theme, oldest first for stable output"""
+        if not theme:
+            return []
+        pattern = f'%{theme}%'
+        return db.session.execute(
+            select(Resource.title).where(or_(
+                Resource.topic.ilike(pattern),
+                Resource.tags.ilike(pattern),
+                Resource.title.ilike(pattern)
+            )).order_by(Resource.id).limit(self.MAX_RESOURCES)
+        ).scalars().all()
+
+    def _common_points(self, section_key, defaults):
+        """Most common points under a section heading across the sermon corpus"""
+        sections = select(SermonOutlinePoint.sermon_id, SermonOutlinePoint.section_index).where(
+            SermonOutlinePoint.point_index.is_(None),
+            SermonOutlinePoint.title_key == section_key
+        ).subquery()
+        shared = func.count(func.distinct(SermonOutlinePoint.sermon_id))
+        rows = db.session.execute(
+            select(SermonOutlinePoint.title_key, func.min(SermonOutlinePoint.title))
+            .join(sections, (SermonOutlinePoint.sermon_id == sections.c.sermon_id) &
+                  (SermonOutlinePoint.section_index == sections.c.section_index))
+            .where(SermonOutlinePoint.point_index.is_not(None))
+            .group_by(SermonOutlinePoint.title_key)
+            .having(shared >= self.MIN_SHARED_SERMONS)
+            .order_by(shared.desc(), SermonOutlinePoint.title_key)
+            .limit(len(defaults))
+        ).all()
+        return [title for _, title in rows] or list(defaults)
+
+
+OUTLINE_BACKENDS = {
+    CorpusOutlineBackend.name: CorpusOutlineBackend
+}
+
+
+def get_backend():
+    """Instantiate the configured outline backend"""
+    name = current_app.config.get('OUTLINE_BACKEND', CorpusOutlineBackend.name)
+    return OUTLINE_BACKENDS[name]()
+
+
+def _normalize_text(text):
+    return ' '.join((text or '').lower().split())
+
+
+def normalize_request(scripture, theme):
+    """Canonical (scripture, theme) so equivalent requests share a cache entry"""
+    ranges = parse_references(scripture)
+    if ranges:
+        scripture = '; '.join(format_range(scripture_range) for scripture_range in ranges).lower()
+    else:
+        scripture = _normalize_text(scripture)
+    return scripture, _normalize_text(theme)
+
+
+def outline_cache_key(backend, scripture, theme):
+    """Cache key for a backend and a request"""
+    scripture, theme = normalize_request(scripture, theme)
+    raw = f'{backend.name}:{backend.version}\x1f{scripture}\x1f{theme}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_cached_outline(cache_key):
+    """Return a cached outline, or None if this request has not been generated yet"""
+    with _outlines_lock:
+        outline = _outlines.get(cache_key)
+        if outline is not None:
+            _outlines.move_to_end(cache_key)
+            return outline
+
+    row = db.session.get(OutlineCache, cache_key)
+    if row is None:
+        return None
+    outline = normalize_outline(row.outline)
+    _remember(cache_key, outline)
+    return outline
+
+
+def _remember(cache_key, outline):
+    with _outlines_lock:
+        _outlines[cache_key] = outline
+        while len(_outlines) > MAX_CACHED_OUTLINES:
+            _outlines.popitem(last=False)
+
+
+def generate_outline_job(job_id, scripture, theme, cache_key):
+    """Background job body: run the backend and cache its outline"""
+    backend = get_backend()
+    outline = normalize_outline(backend.generate(scripture, theme))
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(OutlineCache(
+                cache_key=cache_key,
+                backend=backend.name,
+                scripture=scripture[:200],
+                theme=(theme or '')[:100] or None,
+                outline=dump(outline) or '[]'
+            ))
+        db.session.commit()
+    except IntegrityError:
+        # Another worker cached the same request first
+        db.session.rollback()
+
+    _remember(cache_key, outline)
+    return outline
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) position as an opaque URL-safe cursor; created_at may be None"""
+    return f'{created_at.isoformat() if created_at else ""}_{row_id}'
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        tuple: (created_at, id), or None if the cursor is missing or malformed;
+            created_at is None for a row without a timestamp
+    """
+    if not cursor:
+        return None
+    created_at, separator, row_id = cursor.rpartition('_')
+    if not separator:
+        return None
+    try:
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except ValueError:
+        return None
+
+
+def keyset_page(query, created_column, id_column, cursor=None, per_page=25):
+    """
+    Fetch one newest-first page of a query using (created_at, id) keyset pagination
+
+    Unlike OFFSET paging this costs the same on page 1 and page 100, as long as
+    an index covers the filter columns plus (created_at, id). Rows without a
+    timestamp (written before created_at was set) come last on every backend.
+
+    Args:
+        query: Query already filtered to the rows to list
+        created_column: Timestamp column to order by
+        id_column: Primary key column used as a tiebreaker
+        cursor (str, optional): Cursor from the previous page
+        per_page (int): Page size
+
+    Returns:
+        tuple: (items, next_cursor); next_cursor is None on the last page
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, row_id = position
+        if created_at is None:
+            query = query.filter(created_column.is_(None), id_column < row_id)
+        else:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < row_id),
+                created_column.is_(None)
+            ))
+
+    items = query.order_by(created_column.desc().nulls_last(), id_column.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    return items, next_cursor
@@ -0,0 +1,244 @@
+"""
+Preaching coverage
+
+Each user has one PreachingCoverage row holding, for every verse of the
+Bible in canonical order, how many of their sermons cover it (compressed
+uint16 counts) and a packed bitmap of the verses covered at all (about 3.9 KB).
+
+Saving a sermon only parses its old and new scripture_passage and adjusts
+the counts for those verses. Coverage and overlap questions are answered with
+array operations on the stored bitmap instead of re-parsing every sermon.
+"""
+import zlib
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import PreachingCoverage, Sermon
+from modules.extensions import db
+from modules.scripture import (
+    BOOK_NAMES, CHAPTER_STARTS, CHAPTERS, TOTAL_VERSES, format_range, index_ranges,
+    parse_references, range_indexes
+)
+
+_table = PreachingCoverage.__table__
+
+_CHAPTER_STARTS = np.array(CHAPTER_STARTS)
+
+
+def passage_bits(text):
+    """Boolean array over all verses, True where a passage reference covers the verse"""
+    bits = np.zeros(TOTAL_VERSES, dtype=bool)
+    for scripture_range in parse_references(text):
+        start, stop = range_indexes(scripture_range)
+        bits[start:stop] = True
+    return bits
+
+
+def bits_to_ranges(bits):
+    """Contiguous covered verses as ScriptureRanges, split per chapter"""
+    padded = np.concatenate(([False], bits, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    ranges = []
+    for start, stop in zip(edges[::2], edges[1::2]):
+        ranges.extend(index_ranges(int(start), int(stop)))
+    return ranges
+
+
+def describe(bits):
+    """Display text for the verses set in a bit array, e.g. "Romans 8; John 3:16" """
+    return '; '.join(format_range(scripture_range) for scripture_range in bits_to_ranges(bits))
+
+
+def _pack_counts(counts):
+    return zlib.compress(counts.astype('<u2').tobytes())
+
+
+def _unpack_counts(data):
+    return np.frombuffer(zlib.decompress(data), dtype='<u2').astype(np.int32)
+
+
+def load_bitmap(user_id):
+    """Covered-verse boolean array for a user (all False if they have no coverage yet)"""
+    packed = db.session.execute(
+        select(PreachingCoverage.bitmap).where(PreachingCoverage.user_id == user_id)
+    ).scalar()
+    if packed is None:
+        return np.zeros(TOTAL_VERSES, dtype=bool)
+    return np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=TOTAL_VERSES).astype(bool)
+
+
+def load_counts(user_id):
+    """Per-verse sermon counts for a user"""
+    data = db.session.execute(
+        select(PreachingCoverage.counts).where(PreachingCoverage.user_id == user_id)
+    ).scalar()
+    if data is None:
+        return np.zeros(TOTAL_VERSES, dtype=np.int32)
+    return _unpack_counts(data)
+
+
+def apply_passage_change(connection, user_id, removed=None, added=None):
+    """
+    Adjust a user's coverage for one sermon whose passage changed
+
+    Args:
+        connection: Connection in the saving transaction
+        user_id (int): Sermon owner
+        removed (str, optional): Passage text the sermon no longer covers
+        added (str, optional): Passage text the sermon now covers
+    """
+    delta = passage_bits(added).astype(np.int32) - passage_bits(removed).astype(np.int32)
+    if not delta.any():
+        return
+
+    # Lock the row so concurrent saves by the same user do not lose updates
+    query = select(_table.c.counts).where(_table.c.user_id == user_id)
+    if connection.dialect.name != 'sqlite':
+        query = query.with_for_update()
+    data = connection.execute(query).scalar()
+    counts = _unpack_counts(data) if data is not None else np.zeros(TOTAL_VERSES, dtype=np.int32)
+
+    counts = np.clip(counts + delta, 0, np.iinfo(np.uint16).max)
+    covered = counts > 0
+    values = {
+        'counts': _pack_counts(counts),
+        'bitmap': np.packbits(covered).tobytes(),
+        'verses_covered': int(covered.sum()),
+        'updated_at': datetime.utcnow()
+    }
+    if data is None:
+        connection.execute(insert(_table).values(user_id=user_id, **values))
+    else:
+        connection.execute(update(_table).where(_table.c.user_id == user_id).values(**values))
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_coverage(session, flush_context, instances):
+    # Runs before the flush so deleted sermons still have their passage loaded
+    connection = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Sermon):
+            continue
+        history = inspect(obj).attrs.scripture_passage.history
+        if obj in session.new:
+            removed, added = None, obj.scripture_passage
+        elif obj in session.deleted:
+            removed = history.deleted[0] if history.deleted else obj.scripture_passage
+            added = None
+        elif history.has_changes():
+            removed = history.deleted[0] if history.deleted else None
+            added = obj.scripture_passage
+        else:
+            continue
+        connection = connection or session.connection()
+        apply_passage_change(connection, obj.user_id, removed, added)
+
+
+def rebuild_coverage():
+    """
+    Recompute every user's coverage from their sermons
+
+    Returns:
+        int: Number of users with coverage
+    """
+    connection = db.session.connection()
+    connection.execute(_table.delete())
+
+    by_user = {}
+    for user_id, passage in db.session.execute(
+            select(Sermon.user_id, Sermon.scripture_passage).where(Sermon.scripture_passage.isnot(None))):
+        counts = by_user.setdefault(user_id, np.zeros(TOTAL_VERSES, dtype=np.int32))
+        counts += passage_bits(passage)
+
+    for user_id, counts in by_user.items():
+        covered = counts > 0
+        connection.execute(insert(_table).values(
+            user_id=user_id,
+            counts=_pack_counts(np.minimum(counts, np.iinfo(np.uint16).max)),
+            bitmap=np.packbits(covered).tobytes(),
+            verses_covered=int(covered.sum()),
+            updated_at=datetime.utcnow()
+        ))
+    db.session.commit()
+    return len(by_user)
+
+
+def coverage_summary(user_id):
+    """
+    Per-book coverage for a user
+
+    Returns:
+        list: One dict per book with 'name', 'verses', 'covered', 'percent' and
+            'chapters' (list of (chapter, covered verses, total verses))
+    """
+    bits = load_bitmap(user_id)
+    per_chapter = np.add.reduceat(bits.astype(np.int32), _CHAPTER_STARTS)
+    chapter_sizes = np.diff(np.append(_CHAPTER_STARTS, TOTAL_VERSES))
+
+    books = [
+        {'book': ordinal, 'name': name, 'verses': 0, 'covered': 0, 'chapters': []}
+        for ordinal, name in enumerate(BOOK_NAMES, start=1)
+    ]
+    for (book, chapter), covered, size in zip(CHAPTERS, per_chapter.tolist(), chapter_sizes.tolist()):
+        entry = books[book - 1]
+        entry['verses'] += size
+        entry['covered'] += covered
+        entry['chapters'].append((chapter, covered, size))
+    for entry in books:
+        entry['percent'] = round(100 * entry['covered'] / entry['verses'], 1)
+    return books
+
+
+def passage_overlap(user_id, passage, exclude=None):
+    """
+    Parts of a passage the user has already preached
+
+    Args:
+        user_id (int): Preacher
+        passage (str): Passage being planned
+        exclude (list, optional): Passages to discount from the user's
+            coverage first, e.g. the sermon's own current passage
+
+    Returns:
+        str: Display text of the overlapping verses, or '' if none
+    """
+    if exclude:
+        counts = load_counts(user_id)
+        for text in exclude:
+            counts = counts - passage_bits(text)
+        covered = counts > 0
+    else:
+        covered = load_bitmap(user_id)
+    return describe(passage_bits(passage) & covered)
+
+
+def series_overlaps(user_id, sermons):
+    """
+    Overlap warnings for a planned series
+
+    Args:
+        user_id (int): Series owner
+        sermons (list): The series' sermons in order
+
+    Returns:
+        list: Warning strings, covering verses repeated within the series and
+            verses the user already preached outside it
+    """
+    counts = load_counts(user_id)
+    sermon_bits = [passage_bits(sermon.scripture_passage) for sermon in sermons]
+    # Coverage from sermons outside this series
+    outside = counts - np.sum(sermon_bits, axis=0, dtype=np.int32) if sermon_bits else counts
+
+    warnings = []
+    for index, (sermon, bits) in enumerate(zip(sermons, sermon_bits)):
+        for other, other_bits in zip(sermons[index + 1:], sermon_bits[index + 1:]):
+            shared = bits & other_bits
+            if shared.any():
+                warnings.append(f'"{sermon.title}" and "{other.title}" both cover {describe(shared)}.')
+        preached = bits & (outside > 0)
+        if preached.any():
+            warnings.append(f'"{sermon.title}" covers {describe(preached)}, which you have preached before.')
+    return warnings
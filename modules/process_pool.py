@@ -0,0 +1,38 @@
+"""
+Shared process pool
+
+CPU-bound work that must not hold a web worker's GIL (rendering exports,
+parsing imported manuscripts) runs in one lazily created process pool per
+worker process. Functions submitted here must be importable without the app.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+PROCESS_WORKERS = int(os.environ.get('PROCESS_WORKERS', 2))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The worker's process pool, created on first use"""
+    # Spawned rather than forked: web workers are multi-threaded
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def discard_pool(pool):
+    """Drop a pool whose worker died so the next get_pool() starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import Belief, DataVersion, Denomination
+from modules.extensions import db
+
+# Name of the DataVersion row that tracks denomination/belief changes
+REFERENCE_DATA_VERSION = 'reference_data'
+
+# How long (seconds) a worker trusts its snapshot before re-checking the version
+DEFAULT_CHECK_INTERVAL = 5
+
+DenominationRecord = namedtuple('DenominationRecord', ['id', 'name', 'description'])
+BeliefRecord = namedtuple('BeliefRecord', ['id', 'topic', 'summary', 'scripture_references', 'denomination_id'])
+
+
+class ReferenceSnapshot:
+    """Immutable in-memory copy of the denomination and belief tables"""
+
+    def __init__(self, version, denominations, beliefs):
+        self.version = version
+        self.denominations = denominations
+        self.denominations_by_id = {denom.id: denom for denom in denominations}
+
+        self.beliefs = {}
+        self.topics = []
+        self.topics_by_denomination = {}
+        for belief in beliefs:
+            key = (belief.denomination_id, belief.topic)
+            if key in self.beliefs:
+                continue
+            self.beliefs[key] = belief
+            if belief.topic not in self.topics:
+                self.topics.append(belief.topic)
+            self.topics_by_denomination.setdefault(belief.denomination_id, []).append(belief.topic)
+
+    def get_denominations(self, denomination_ids):
+        """Return the denominations with the given ids, ordered by id"""
+        wanted = {int(denom_id) for denom_id in denomination_ids if str(denom_id).isdigit()}
+        return [denom for denom in self.denominations if denom.id in wanted]
+
+    def find_denomination(self, name):
+        """Return the first denomination with the given name, or None"""
+        for denom in self.denominations:
+            if denom.name == name:
+                return denom
+        return None
+
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+
+
+def read_data_version(name):
+    """Read a DataVersion counter from the database (0 if it was never bumped)"""
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def current_version():
+    """Read the reference data version counter from the database"""
+    return read_data_version(REFERENCE_DATA_VERSION)
+
+
+def _load_snapshot(version):
+    denominations = [
+        DenominationRecord(row.id, row.name, row.description)
+        for row in db.session.execute(
+            select(Denomination.id, Denomination.name, Denomination.description).order_by(Denomination.id)
+        )
+    ]
+    beliefs = [
+        BeliefRecord(row.id, row.topic, row.summary, row.scripture_references, row.denomination_id)
+        for row in db.session.execute(
+            select(
+                Belief.id, Belief.topic, Belief.summary,
+                Belief.scripture_references, Belief.denomination_id
+            ).order_by(Belief.id)
+        )
+    ]
+    return ReferenceSnapshot(version, denominations, beliefs)
+
+
+def get_reference_data():
+    """
+    Return the cached denomination/belief snapshot, reloading it if stale
+
+    The version counter is checked at most once per
+    REFERENCE_DATA_CHECK_INTERVAL seconds, so a warm cache costs no queries.
+    """
+    global _snapshot, _checked_at
+
+    interval = current_app.config.get('REFERENCE_DATA_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _checked_at < interval:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < interval:
+            return _snapshot
+
+        version = current_version()
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _load_snapshot(version)
+        _checked_at = time.monotonic()
+        return _snapshot
+
+
+def invalidate_reference_data():
+    """Drop this worker's snapshot so the next request reloads it"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def bump_data_version(connection, name):
+    """Increment a DataVersion counter, creating it on first use"""
+    result = connection.execute(
+        update(DataVersion.__table__)
+        .where(DataVersion.__table__.c.name == name)
+        .values(version=DataVersion.__table__.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            insert(DataVersion.__table__).values(name=name, version=1)
+        )
+
+
+def bump_reference_version(connection):
+    """Increment the reference data version counter"""
+    bump_data_version(connection, REFERENCE_DATA_VERSION)
+
+
+def _is_reference_object(obj):
+    return isinstance(obj, (Denomination, Belief))
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(_is_reference_object(obj) for obj in changed):
+        bump_reference_version(session.connection())
+        session.info['reference_data_changed'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_on_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (Denomination, Belief):
+        bump_reference_version(orm_execute_state.session.connection())
+        orm_execute_state.session.info['reference_data_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('reference_data_changed', False):
+        invalidate_reference_data()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('reference_data_changed', None)
@@ -2,8 +2,9 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from flask_login import login_required, current_user
 
 from app import db
-from models import Resource
+from models import ApologeticsResponse, Belief, CounselingSession, Resource
 from modules.integrations import import_external_resources
+from modules.scripture_index import find_sources
 
 # Create blueprint
 resources_bp = Blueprint('resources', __name__)
@@ -71,10 +72,14 @@ def view_resource(id):
     # Parse tags if they're stored as comma-separated values
     tags = resource.tags.split(',') if resource.tags else []
     
+    # Apologetics responses that cite this resource
+    citing_responses = resource.citing_responses.order_by(ApologeticsResponse.created_at.desc()).all()
+    
     return render_template(
         'resources/view_resource.html',
         resource=resource,
-        tags=tags
+        tags=tags,
+        citing_responses=citing_responses
     )
 
 
@@ -254,6 +259,52 @@ def recommend_resources():
     })
 
 
+@resources_bp.route('/api/scripture', methods=['GET'])
+def search_scripture():
+    """API endpoint to find beliefs, sessions and responses citing a passage"""
+    passage = request.args.get('ref', '')
+    source_type = request.args.get('type')
+    
+    if not passage:
+        return jsonify({'success': False, 'message': 'Scripture reference is required'})
+    
+    sources = find_sources(passage, source_type)
+    
+    results = {}
+    if sources.get('belief'):
+        beliefs = Belief.query.filter(Belief.id.in_(sources['belief'])).all()
+        results['beliefs'] = [
+            {'id': belief.id, 'topic': belief.topic, 'denomination_id': belief.denomination_id,
+             'scripture_references': belief.scripture_references}
+            for belief in beliefs
+        ]
+    if sources.get('apologetics_response'):
+        responses = ApologeticsResponse.query.filter(
+            ApologeticsResponse.id.in_(sources['apologetics_response'])
+        ).all()
+        results['apologetics_responses'] = [
+            {'id': response.id, 'title': response.title, 'objection_id': response.objection_id,
+             'scripture_references': response.scripture_references}
+            for response in responses
+        ]
+    if sources.get('counseling_session') and current_user.is_authenticated:
+        # Counseling sessions are private to their counselor
+        sessions = CounselingSession.query.filter(
+            CounselingSession.id.in_(sources['counseling_session']),
+            CounselingSession.user_id == current_user.id
+        ).all()
+        results['counseling_sessions'] = [
+            {'id': session.id, 'title': session.title,
+             'url': url_for('counseling.view_session', id=session.id)}
+            for session in sessions
+        ]
+    
+    return jsonify({
+        'success': True,
+        'results': results
+    })
+
+
 @resources_bp.route('/import', methods=['GET', 'POST'])
 @login_required
 def import_resources():
@@ -0,0 +1,454 @@
+"""
+Scripture reference parsing
+
+Turns free-text references such as "James 2:24, Matthew 19:16-17" into
+normalized (book, chapter, verse_start, verse_end) ranges. Books are stored
+as their canonical 1-66 ordinal so ranges can be indexed and compared.
+"""
+import bisect
+import json
+import re
+from collections import namedtuple
+
+ScriptureRange = namedtuple('ScriptureRange', ['book', 'chapter', 'verse_start', 'verse_end'])
+
+# (canonical name, abbreviations, verses per chapter) in canonical order
+BOOKS = [
+    ('Genesis', ('gen', 'ge', 'gn'), (
+        31, 25, 24, 26, 32, 22, 24, 22, 29, 32, 32, 20, 18, 24, 21, 16, 27, 33, 38, 18,
+        34, 24, 20, 67, 34, 35, 46, 22, 35, 43, 55, 32, 20, 31, 29, 43, 36, 30, 23, 23,
+        57, 38, 34, 34, 28, 34, 31, 22, 33, 26
+    )),
+    ('Exodus', ('exod', 'exo', 'ex'), (
+        22, 25, 22, 31, 23, 30, 25, 32, 35, 29, 10, 51, 22, 31, 27, 36, 16, 27, 25, 26,
+        36, 31, 33, 18, 40, 37, 21, 43, 46, 38, 18, 35, 23, 35, 35, 38, 29, 31, 43, 38
+    )),
+    ('Leviticus', ('lev', 'le', 'lv'), (
+        17, 16, 17, 35, 19, 30, 38, 36, 24, 20, 47, 8, 59, 57, 33, 34, 16, 30, 37, 27,
+        24, 33, 44, 23, 55, 46, 34
+    )),
+    ('Numbers', ('num', 'nu', 'nm', 'nb'), (
+        54, 34, 51, 49, 31, 27, 89, 26, 23, 36, 35, 16, 33, 45, 41, 50, 13, 32, 22, 29,
+        35, 41, 30, 25, 18, 65, 23, 31, 40, 16, 54, 42, 56, 29, 34, 13
+    )),
+    ('Deuteronomy', ('deut', 'deu', 'dt'), (
+        46, 37, 29, 49, 33, 25, 26, 20, 29, 22, 32, 32, 18, 29, 23, 22, 20, 22, 21, 20,
+        23, 30, 25, 22, 19, 19, 26, 68, 29, 20, 30, 52, 29, 12
+    )),
+    ('Joshua', ('josh', 'jos'), (
+        18, 24, 17, 24, 15, 27, 26, 35, 27, 43, 23, 24, 33, 15, 63, 10, 18, 28, 51, 9,
+        45, 34, 16, 33
+    )),
+    ('Judges', ('judg', 'jdg'), (
+        36, 23, 31, 24, 31, 40, 25, 35, 57, 18, 40, 15, 25, 20, 20, 31, 13, 31, 30, 48,
+        25
+    )),
+    ('Ruth', ('rth', 'ru'), (
+        22, 23, 18, 22
+    )),
+    ('1 Samuel', ('1sam', '1sa'), (
+        28, 36, 21, 22, 12, 21, 17, 22, 27, 27, 15, 25, 23, 52, 35, 23, 58, 30, 24, 42,
+        15, 23, 29, 22, 44, 25, 12, 25, 11, 31, 13
+    )),
+    ('2 Samuel', ('2sam', '2sa'), (
+        27, 32, 39, 12, 25, 23, 29, 18, 13, 19, 27, 31, 39, 33, 37, 23, 29, 33, 43, 26,
+        22, 51, 39, 25
+    )),
+    ('1 Kings', ('1kgs', '1ki', '1kin'), (
+        53, 46, 28, 34, 18, 38, 51, 66, 28, 29, 43, 33, 34, 31, 34, 34, 24, 46, 21, 43,
+        29, 53
+    )),
+    ('2 Kings', ('2kgs', '2ki', '2kin'), (
+        18, 25, 27, 44, 27, 33, 20, 29, 37, 36, 21, 21, 25, 29, 38, 20, 41, 37, 37, 21,
+        26, 20, 37, 20, 30
+    )),
+    ('1 Chronicles', ('1chr', '1ch', '1chron'), (
+        54, 55, 24, 43, 26, 81, 40, 40, 44, 14, 47, 40, 14, 17, 29, 43, 27, 17, 19, 8,
+        30, 19, 32, 31, 31, 32, 34, 21, 30
+    )),
+    ('2 Chronicles', ('2chr', '2ch', '2chron'), (
+        17, 18, 17, 22, 14, 42, 22, 18, 31, 19, 23, 16, 22, 15, 19, 14, 19, 34, 11, 37,
+        20, 12, 21, 27, 28, 23, 9, 27, 36, 27, 21, 33, 25, 33, 27, 23
+    )),
+    ('Ezra', ('ezr',), (
+        11, 70, 13, 24, 17, 22, 28, 36, 15, 44
+    )),
+    ('Nehemiah', ('neh', 'ne'), (
+        11, 20, 32, 23, 19, 19, 73, 18, 38, 39, 36, 47, 31
+    )),
+    ('Esther', ('esth', 'est', 'es'), (
+        22, 23, 15, 17, 14, 14, 10, 17, 32, 3
+    )),
+    ('Job', ('jb',), (
+        22, 13, 26, 21, 27, 30, 21, 22, 35, 22, 20, 25, 28, 22, 35, 22, 16, 21, 29, 29,
+        34, 30, 17, 25, 6, 14, 23, 28, 25, 31, 40, 22, 33, 37, 16, 33, 24, 41, 30, 24,
+        34, 17
+    )),
+    ('Psalms', ('psalm', 'ps', 'psa', 'pss'), (
+        6, 12, 8, 8, 12, 10, 17, 9, 20, 18, 7, 8, 6, 7, 5, 11, 15, 50, 14, 9, 13, 31, 6,
+        10, 22, 12, 14, 9, 11, 12, 24, 11, 22, 22, 28, 12, 40, 22, 13, 17, 13, 11, 5,
+        26, 17, 11, 9, 14, 20, 23, 19, 9, 6, 7, 23, 13, 11, 11, 17, 12, 8, 12, 11, 10,
+        13, 20, 7, 35, 36, 5, 24, 20, 28, 23, 10, 12, 20, 72, 13, 19, 16, 8, 18, 12, 13,
+        17, 7, 18, 52, 17, 16, 15, 5, 23, 11, 13, 12, 9, 9, 5, 8, 28, 22, 35, 45, 48,
+        43, 13, 31, 7, 10, 10, 9, 8, 18, 19, 2, 29, 176, 7, 8, 9, 4, 8, 5, 6, 5, 6, 8,
+        8, 3, 18, 3, 3, 21, 26, 9, 8, 24, 13, 10, 7, 12, 15, 21, 10, 20, 14, 9, 6
+    )),
+    ('Proverbs', ('prov', 'pro', 'prv', 'pr'), (
+        33, 22, 35, 27, 23, 35, 27, 36, 18, 32, 31, 28, 25, 35, 33, 33, 28, 24, 29, 30,
+        31, 29, 35, 34, 28, 28, 27, 28, 27, 33, 31
+    )),
+    ('Ecclesiastes', ('eccl', 'ecc', 'eccles', 'qoh'), (
+        18, 26, 22, 16, 20, 12, 29, 17, 18, 20, 10, 14
+    )),
+    ('Song of Solomon', ('songofsongs', 'song', 'sos', 'canticles', 'cant'), (
+        17, 17, 11, 16, 16, 13, 13, 14
+    )),
+    ('Isaiah', ('isa', 'is'), (
+        31, 22, 26, 6, 30, 13, 25, 22, 21, 34, 16, 6, 22, 32, 9, 14, 14, 7, 25, 6, 17,
+        25, 18, 23, 12, 21, 13, 29, 24, 33, 9, 20, 24, 17, 10, 22, 38, 22, 8, 31, 29,
+        25, 28, 28, 25, 13, 15, 22, 26, 11, 23, 15, 12, 17, 13, 12, 21, 14, 21, 22, 11,
+        12, 19, 12, 25, 24
+    )),
+    ('Jeremiah', ('jer', 'je'), (
+        19, 37, 25, 31, 31, 30, 34, 22, 26, 25, 23, 17, 27, 22, 21, 21, 27, 23, 15, 18,
+        14, 30, 40, 10, 38, 24, 22, 17, 32, 24, 40, 44, 26, 22, 19, 32, 21, 28, 18, 16,
+        18, 22, 13, 30, 5, 28, 7, 47, 39, 46, 64, 34
+    )),
+    ('Lamentations', ('lam', 'la'), (
+        22, 22, 66, 22, 22
+    )),
+    ('Ezekiel', ('ezek', 'eze', 'ezk'), (
+        28, 10, 27, 17, 17, 14, 27, 18, 11, 22, 25, 28, 23, 23, 8, 63, 24, 32, 14, 49,
+        32, 31, 49, 27, 17, 21, 36, 26, 21, 26, 18, 32, 33, 31, 15, 38, 28, 23, 29, 49,
+        26, 20, 27, 31, 25, 24, 23, 35
+    )),
+    ('Daniel', ('dan', 'da', 'dn'), (
+        21, 49, 30, 37, 31, 28, 28, 27, 27, 21, 45, 13
+    )),
+    ('Hosea', ('hos', 'ho'), (
+        11, 23, 5, 19, 15, 11, 16, 14, 17, 15, 12, 14, 16, 9
+    )),
+    ('Joel', ('jl',), (
+        20, 32, 21
+    )),
+    ('Amos', ('am',), (
+        15, 16, 15, 13, 27, 14, 17, 14, 15
+    )),
+    ('Obadiah', ('obad', 'ob'), (
+        21,
+    )),
+    ('Jonah', ('jon', 'jnh'), (
+        17, 10, 10, 11
+    )),
+    ('Micah', ('mic', 'mc'), (
+        16, 13, 12, 13, 15, 16, 20
+    )),
+    ('Nahum', ('nah', 'na'), (
+        15, 13, 19
+    )),
+    ('Habakkuk', ('hab', 'hb'), (
+        17, 20, 19
+    )),
+    ('Zephaniah', ('zeph', 'zep', 'zp'), (
+        18, 15, 20
+    )),
+    ('Haggai', ('hag', 'hg'), (
+        15, 23
+    )),
+    ('Zechariah', ('zech', 'zec', 'zc'), (
+        21, 13, 10, 14, 11, 15, 14, 23, 17, 12, 17, 14, 9, 21
+    )),
+    ('Malachi', ('mal', 'ml'), (
+        14, 17, 18, 6
+    )),
+    ('Matthew', ('matt', 'mat', 'mt'), (
+        25, 23, 17, 25, 48, 34, 29, 34, 38, 42, 30, 50, 58, 36, 39, 28, 27, 35, 30, 34,
+        46, 46, 39, 51, 46, 75, 66, 20
+    )),
+    ('Mark', ('mrk', 'mk', 'mr'), (
+        45, 28, 35, 41, 43, 56, 37, 38, 50, 52, 33, 44, 37, 72, 47, 20
+    )),
+    ('Luke', ('luk', 'lk'), (
+        80, 52, 38, 44, 39, 49, 50, 56, 62, 42, 54, 59, 35, 35, 32, 31, 37, 43, 48, 47,
+        38, 71, 56, 53
+    )),
+    ('John', ('jhn', 'jn'), (
+        51, 25, 36, 54, 47, 71, 53, 59, 41, 42, 57, 50, 38, 31, 27, 33, 26, 40, 42, 31,
+        25
+    )),
+    ('Acts', ('act', 'ac'), (
+        26, 47, 26, 37, 42, 15, 60, 40, 43, 48, 30, 25, 52, 28, 41, 40, 34, 28, 41, 38,
+        40, 30, 35, 27, 27, 32, 44, 31
+    )),
+    ('Romans', ('rom', 'ro', 'rm'), (
+        32, 29, 31, 25, 21, 23, 25, 39, 33, 21, 36, 21, 14, 23, 33, 27
+    )),
+    ('1 Corinthians', ('1cor', '1co'), (
+        31, 16, 23, 21, 13, 20, 40, 13, 27, 33, 34, 31, 13, 40, 58, 24
+    )),
+    ('2 Corinthians', ('2cor', '2co'), (
+        24, 17, 18, 18, 21, 18, 16, 24, 15, 18, 33, 21, 14
+    )),
+    ('Galatians', ('gal', 'ga'), (
+        24, 21, 29, 31, 26, 18
+    )),
+    ('Ephesians', ('eph', 'ephes'), (
+        23, 22, 21, 32, 33, 24
+    )),
+    ('Philippians', ('phil', 'php', 'pp'), (
+        30, 30, 21, 23
+    )),
+    ('Colossians', ('col', 'co'), (
+        29, 23, 25, 18
+    )),
+    ('1 Thessalonians', ('1thess', '1thes', '1th'), (
+        10, 20, 13, 18, 28
+    )),
+    ('2 Thessalonians', ('2thess', '2thes', '2th'), (
+        12, 17, 18
+    )),
+    ('1 Timothy', ('1tim', '1ti'), (
+        20, 15, 16, 16, 25, 21
+    )),
+    ('2 Timothy', ('2tim', '2ti'), (
+        18, 26, 17, 22
+    )),
+    ('Titus', ('tit', 'ti'), (
+        16, 15, 15
+    )),
+    ('Philemon', ('philem', 'phm', 'pm'), (
+        25,
+    )),
+    ('Hebrews', ('heb',), (
+        14, 18, 19, 16, 14, 20, 28, 13, 28, 39, 40, 29, 25
+    )),
+    ('James', ('jas', 'jm'), (
+        27, 26, 18, 17, 20
+    )),
+    ('1 Peter', ('1pet', '1pe', '1pt'), (
+        25, 25, 22, 19, 14
+    )),
+    ('2 Peter', ('2pet', '2pe', '2pt'), (
+        21, 22, 18
+    )),
+    ('1 John', ('1jn', '1jhn', '1jo'), (
+        10, 29, 24, 21, 21
+    )),
+    ('2 John', ('2jn', '2jhn', '2jo'), (
+        13,
+    )),
+    ('3 John', ('3jn', '3jhn', '3jo'), (
+        14,
+    )),
+    ('Jude', ('jud', 'jd'), (
+        25,
+    )),
+    ('Revelation', ('rev', 're', 'revelations', 'apocalypse'), (
+        20, 29, 22, 11, 14, 17, 17, 13, 21, 11, 19, 17, 18, 20, 8, 21, 18, 24, 21, 15,
+        27, 21
+    )),
+]
+
+BOOK_NAMES = [name for name, _, _ in BOOKS]
+VERSE_COUNTS = [verses for _, _, verses in BOOKS]
+
+# Offset of the first verse of each (book, chapter) in canonical order
+_CHAPTER_OFFSETS = {}
+_offset = 0
+for _book, _chapters in enumerate(VERSE_COUNTS, start=1):
+    for _chapter, _count in enumerate(_chapters, start=1):
+        _CHAPTER_OFFSETS[(_book, _chapter)] = _offset
+        _offset += _count
+TOTAL_VERSES = _offset
+
+# (book, chapter) for each chapter in canonical order, parallel to CHAPTER_STARTS
+CHAPTERS = list(_CHAPTER_OFFSETS)
+CHAPTER_STARTS = [_CHAPTER_OFFSETS[key] for key in CHAPTERS]
+
+_ROMAN_PREFIXES = {'iii': '3', 'ii': '2', 'i': '1', 'first': '1', 'second': '2', 'third': '3'}
+
+
+def _normalize_book_key(name):
+    key = re.sub(r'[^a-z0-9 ]', '', name.lower()).strip()
+    parts = key.split(' ', 1)
+    if len(parts) == 2 and parts[0] in _ROMAN_PREFIXES:
+        key = _ROMAN_PREFIXES[parts[0]] + parts[1]
+    return key.replace(' ', '')
+
+
+_BOOK_LOOKUP = {}
+for _ordinal, (_name, _aliases, _) in enumerate(BOOKS, start=1):
+    _BOOK_LOOKUP[_normalize_book_key(_name)] = _ordinal
+    for _alias in _aliases:
+        _BOOK_LOOKUP[_alias] = _ordinal
+
+_REFERENCE_RE = re.compile(
+    r'^(?P<book>(?:[1-3]|i{1,3}|first|second|third)?\s*[a-z][a-z .]*?)?\s*'
+    r'(?P<chapter>\d+)'
+    r'(?::(?P<verse>\d+))?'
+    r'(?:\s*[-–—]\s*(?:(?P<end_chapter>\d+):)?(?P<end>\d+))?'
+    r'[a-z]?$',
+    re.IGNORECASE
+)
+
+# A trailing version tag on a reference: "John 3:16 (KJV)"
+_VERSION_TAG_RE = re.compile(r'\s*\([^()]*\)\s*(?=$|[;,\n])')
+
+
+def book_ordinal(name):
+    """Return the 1-66 ordinal for a book name or abbreviation, or None"""
+    return _BOOK_LOOKUP.get(_normalize_book_key(name))
+
+
+def book_name(ordinal):
+    """Return the canonical name for a 1-66 book ordinal"""
+    return BOOK_NAMES[ordinal - 1]
+
+
+def verse_count(book, chapter):
+    """Number of verses in a chapter, or 0 if the chapter does not exist"""
+    chapters = VERSE_COUNTS[book - 1]
+    if 1 <= chapter <= len(chapters):
+        return chapters[chapter - 1]
+    return 0
+
+
+def verse_index(book, chapter, verse):
+    """Position of a verse in canonical order, 0 to TOTAL_VERSES - 1"""
+    return _CHAPTER_OFFSETS[(book, chapter)] + verse - 1
+
+
+def range_indexes(scripture_range):
+    """Half-open [start, stop) verse positions covered by a ScriptureRange"""
+    start = verse_index(scripture_range.book, scripture_range.chapter, scripture_range.verse_start)
+    return start, start + scripture_range.verse_end - scripture_range.verse_start + 1
+
+
+def index_ranges(start, stop):
+    """
+    Inverse of range_indexes: ScriptureRanges covering verse positions [start, stop)
+
+    Returns:
+        list: One ScriptureRange per chapter touched
+    """
+    ranges = []
+    position = bisect.bisect_right(CHAPTER_STARTS, start) - 1
+    while start < stop:
+        book, chapter = CHAPTERS[position]
+        chapter_start = CHAPTER_STARTS[position]
+        chapter_stop = chapter_start + verse_count(book, chapter)
+        end = min(stop, chapter_stop)
+        ranges.append(ScriptureRange(book, chapter, start - chapter_start + 1, end - chapter_start))
+        start = end
+        position += 1
+    return ranges
+
+
+def _split_text(text):
+    """Split stored reference text (comma/semicolon list or JSON list) into fragments"""
+    if not text:
+        return []
+    text = text.strip()
+    if text.startswith('['):
+        try:
+            items = json.loads(text)
+            text = ';'.join(str(item) for item in items)
+        except ValueError:
+            pass
+    text = _VERSION_TAG_RE.sub('', text)
+    return [fragment.strip() for fragment in re.split(r'[;,\n]', text) if fragment.strip()]
+
+
+def _chapter_ranges(book, start_chapter, start_verse, end_chapter, end_verse):
+    """Split a possibly multi-chapter span into one range per chapter"""
+    if start_chapter < 1 or start_verse < 1:
+        # verse_index would map verse 0 onto the previous chapter's last verse
+        return []
+    ranges = []
+    for chapter in range(start_chapter, end_chapter + 1):
+        last = verse_count(book, chapter)
+        if not last:
+            break
+        first_verse = start_verse if chapter == start_chapter else 1
+        last_verse = min(end_verse, last) if chapter == end_chapter else last
+        if first_verse <= last_verse:
+            ranges.append(ScriptureRange(book, chapter, first_verse, last_verse))
+    return ranges
+
+
+def parse_references(text):
+    """
+    Parse free-text scripture references into normalized ranges
+
+    Fragments without a book name continue the previous book ("Romans 9:6-8, 11"
+    reads the 11 as Romans 9:11). A lone number after a single-chapter book is a
+    verse ("Jude 3"), and a trailing version tag ("(KJV)") is ignored.
+    Unrecognized fragments are skipped.
+
+    Args:
+        text (str): Reference text, e.g. "James 2:24, Matthew 19:16-17"
+
+    Returns:
+        list: ScriptureRange tuples, one per chapter touched
+    """
+    ranges = []
+    book = None
+    chapter = None
+    for fragment in _split_text(text):
+        match = _REFERENCE_RE.match(fragment)
+        if not match:
+            continue
+
+        if match.group('book') and match.group('book').strip():
+            ordinal = book_ordinal(match.group('book'))
+            if ordinal is None:
+                book = chapter = None
+                continue
+            book, chapter = ordinal, None
+        elif book is None:
+            continue
+
+        number = int(match.group('chapter'))
+        verse = match.group('verse')
+        end = match.group('end')
+        end_chapter = match.group('end_chapter')
+
+        if verse is None and match.group('book') and len(VERSE_COUNTS[book - 1]) == 1 \
+                and not end_chapter and (number != 1 or end):
+            # Single-chapter books are cited by verse: "Jude 3", "Philemon 8-10"
+            number, verse = 1, str(number)
+
+        if verse is None and not match.group('book') and chapter is not None:
+            # Bare number after a verse reference: another verse in the same chapter
+            start_chapter, start_verse = chapter, number
+            if end_chapter:
+                stop_chapter, stop_verse = int(end_chapter), int(end)
+            else:
+                stop_chapter, stop_verse = chapter, int(end) if end else number
+        elif verse is None:
+            # Whole chapter(s): "Romans 8" or "Romans 8-9"
+            start_chapter, start_verse = number, 1
+            stop_chapter = int(end) if end else number
+            stop_verse = verse_count(book, stop_chapter)
+        else:
+            start_chapter, start_verse = number, int(verse)
+            if end_chapter:
+                stop_chapter, stop_verse = int(end_chapter), int(end)
+            else:
+                stop_chapter, stop_verse = number, int(end) if end else int(verse)
+
+        parsed = _chapter_ranges(book, start_chapter, start_verse, stop_chapter, stop_verse)
+        ranges.extend(parsed)
+        chapter = stop_chapter if verse is not None or chapter is not None else None
+    return ranges
+
+
+def format_range(scripture_range):
+    """Render a ScriptureRange back to display text, e.g. "John 3:16-18" """
+    name = book_name(scripture_range.book)
+    if scripture_range.verse_start == scripture_range.verse_end:
+        return f'{name} {scripture_range.chapter}:{scripture_range.verse_start}'
+    if scripture_range.verse_start == 1 and \
+            scripture_range.verse_end == verse_count(scripture_range.book, scripture_range.chapter):
+        return f'{name} {scripture_range.chapter}'
+    return f'{name} {scripture_range.chapter}:{scripture_range.verse_start}-{scripture_range.verse_end}'
@@ -0,0 +1,137 @@
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from models import ApologeticsResponse, Belief, CounselingSession, ScriptureReference
+from modules.extensions import db
+from modules.scripture import parse_references
+
+# Model class -> (source type stored in the index, attribute holding the reference text)
+INDEXED_SOURCES = {
+    Belief: ('belief', 'scripture_references'),
+    CounselingSession: ('counseling_session', 'scripture_references'),
+    ApologeticsResponse: ('apologetics_response', 'scripture_references'),
+}
+
+REBUILD_BATCH_SIZE = 500
+
+_table = ScriptureReference.__table__
+
+
+def _index_rows(source_type, source_id, text):
+    return [
+        {
+            'source_type': source_type,
+            'source_id': source_id,
+            'book': scripture_range.book,
+            'chapter': scripture_range.chapter,
+            'verse_start': scripture_range.verse_start,
+            'verse_end': scripture_range.verse_end,
+        }
+        for scripture_range in parse_references(text)
+    ]
+
+
+def reindex_source(connection, source_type, source_id, text):
+    """Replace the indexed ranges for one source row"""
+    connection.execute(
+        delete(_table).where(_table.c.source_type == source_type, _table.c.source_id == source_id)
+    )
+    rows = _index_rows(source_type, source_id, text)
+    if rows:
+        connection.execute(insert(_table), rows)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_scripture_index(session, flush_context):
+    connection = None
+    for obj in list(session.new) + list(session.dirty):
+        source = INDEXED_SOURCES.get(type(obj))
+        if source is None:
+            continue
+        source_type, attribute = source
+        if obj not in session.new and not inspect(obj).attrs[attribute].history.has_changes():
+            continue
+        connection = connection or session.connection()
+        reindex_source(connection, source_type, obj.id, getattr(obj, attribute))
+
+    for obj in session.deleted:
+        source = INDEXED_SOURCES.get(type(obj))
+        if source is None:
+            continue
+        connection = connection or session.connection()
+        connection.execute(
+            delete(_table).where(_table.c.source_type == source[0], _table.c.source_id == obj.id)
+        )
+
+
+def rebuild_scripture_index():
+    """
+    Rebuild the whole index from the source tables
+
+    Returns:
+        int: Number of ranges indexed
+    """
+    connection = db.session.connection()
+    connection.execute(delete(_table))
+
+    total = 0
+    for model, (source_type, attribute) in INDEXED_SOURCES.items():
+        column = getattr(model, attribute)
+        rows = []
+        for source_id, text in db.session.execute(select(model.id, column).where(column.isnot(None))):
+            rows.extend(_index_rows(source_type, source_id, text))
+            if len(rows) >= REBUILD_BATCH_SIZE:
+                connection.execute(insert(_table), rows)
+                total += len(rows)
+                rows = []
+        if rows:
+            connection.execute(insert(_table), rows)
+            total += len(rows)
+
+    db.session.commit()
+    return total
+
+
+def find_references(passage, source_type=None):
+    """
+    Find indexed ranges overlapping a passage, e.g. "Romans 8" or "John 3:16"
+
+    Args:
+        passage (str): Reference text to look up
+        source_type (str, optional): Restrict to one source type
+
+    Returns:
+        list: ScriptureReference rows, or [] if the passage does not parse
+    """
+    ranges = parse_references(passage)
+    if not ranges:
+        return []
+
+    overlaps = or_(*[
+        and_(
+            ScriptureReference.book == scripture_range.book,
+            ScriptureReference.chapter == scripture_range.chapter,
+            ScriptureReference.verse_start <= scripture_range.verse_end,
+            ScriptureReference.verse_end >= scripture_range.verse_start
+        )
+        for scripture_range in ranges
+    ])
+    query = ScriptureReference.query.filter(overlaps)
+    if source_type:
+        query = query.filter(ScriptureReference.source_type == source_type)
+    return query.order_by(
+        ScriptureReference.book, ScriptureReference.chapter, ScriptureReference.verse_start
+    ).all()
+
+
+def find_sources(passage, source_type=None):
+    """
+    Find the source rows citing a passage
+
+    Returns:
+        dict: source type -> sorted list of source ids
+    """
+    sources = {}
+    for reference in find_references(passage, source_type):
+        sources.setdefault(reference.source_type, set()).add(reference.source_id)
+    return {key: sorted(ids) for key, ids in sources.items()}
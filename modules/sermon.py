@@ -1,14 +1,81 @@
 import json
+import os
+import shutil
+import tempfile
 from datetime import datetime, date
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort
 from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import load_only
 
 from app import db
-from models import Sermon, SermonSeries
+from models import BackgroundJob, Sermon, SermonSeries
+from modules.illustration_index import search_illustrations
+from modules.jobs import job_status, submit_job
+from modules.manuscript_parser import MANUSCRIPT_EXTENSIONS
+from modules.outline_generation import (
+    generate_outline_job, get_backend, get_cached_outline, outline_cache_key
+)
+from modules.pagination import keyset_page
+from modules.preaching_coverage import (
+    apply_passage_change, coverage_summary, passage_overlap, series_overlaps
+)
+from modules.sermon_autosave import PatchError, apply_patch
+from modules.sermon_history import (
+    diff_documents, list_revisions, rebuild_revision, record_revision, sermon_document
+)
+from modules.sermon_content import (
+    dump, get_structured_content, normalize_illustrations, normalize_newlines, normalize_outline,
+    sermons_with_point, set_structured_content, sync_outline_points
+)
+from modules.sermon_duplicates import find_near_duplicates, index_sermon, stored_signature
+from modules.sermon_import import import_job
+from modules.sermon_export import (
+    EXPORT_COLUMNS, export_query, document_response, render_single, series_titles_for,
+    streaming_zip_export
+)
+from modules.sermon_render import DOCUMENT_FORMATS
+from modules.sermon_search import search_sermons
+from modules.sermon_stats import (
+    replace_stats, series_stats, series_totals, sermon_top_books, user_stats
+)
 
 # Create blueprint
 sermon_bp = Blueprint('sermon', __name__)
 
+SERMONS_PER_PAGE = 25
+ILLUSTRATION_SUGGESTIONS = 5
+MAX_OVERLAP_WARNINGS = 3
+
+# Offered when nothing in the illustration library matches the theme
+GENERIC_ILLUSTRATIONS = [
+    {
+        'title': 'Personal Story',
+        'description': 'Share a personal experience related to the theme'
+    },
+    {
+        'title': 'Historical Example',
+        'description': 'Reference a historical event that illustrates the theme'
+    },
+    {
+        'title': 'Modern Analogy',
+        'description': 'Use a modern situation or technology as an analogy'
+    }
+]
+
+# Columns needed to list sermons; content/outline/illustrations stay unloaded
+SERMON_SUMMARY_COLUMNS = (
+    Sermon.id, Sermon.title, Sermon.scripture_passage, Sermon.theme, Sermon.sermon_date,
+    Sermon.series_id, Sermon.series_position, Sermon.created_at, Sermon.updated_at
+)
+
+
+def flash_near_duplicates(duplicates, limit=3):
+    """Warn about existing sermons whose content closely matches the one just saved"""
+    for sermon_id, title, score in duplicates[:limit]:
+        flash(f'This sermon is about {round(score * 100)}% similar to your sermon "{title}".', 'warning')
+
 
 @sermon_bp.route('/')
 def index():
@@ -24,7 +91,7 @@ def build():
         title = request.form.get('title')
         scripture_passage = request.form.get('scripture_passage')
         theme = request.form.get('theme')
-        content = request.form.get('content')
+        content = normalize_newlines(request.form.get('content'))
         outline = request.form.get('outline')  # This could be JSON
         illustrations = request.form.get('illustrations')  # This could be JSON
         
@@ -33,21 +100,33 @@ def build():
             flash('Title and Scripture Passage are required.', 'danger')
             return redirect(url_for('sermon.build'))
         
+        try:
+            outline = normalize_outline(outline)
+            illustrations = normalize_illustrations(illustrations)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('sermon.build'))
+        
         # Create new sermon
         new_sermon = Sermon(
             title=title,
             scripture_passage=scripture_passage,
             theme=theme,
             content=content,
-            outline=outline,
-            illustrations=illustrations,
             user_id=current_user.id
         )
+        set_structured_content(new_sermon, outline, illustrations)
         
         try:
             db.session.add(new_sermon)
+            db.session.flush()
+            sync_outline_points(new_sermon.id, outline)
+            record_revision(new_sermon.id, new_sermon.revision, sermon_document(new_sermon))
+            signature = index_sermon(new_sermon.id, new_sermon.user_id, new_sermon.content)
+            duplicates = find_near_duplicates(new_sermon.id, new_sermon.user_id, signature)
             db.session.commit()
             flash('Sermon created successfully!', 'success')
+            flash_near_duplicates(duplicates)
             return redirect(url_for('sermon.view_sermon', id=new_sermon.id))
         except Exception as e:
             db.session.rollback()
@@ -60,9 +139,14 @@ def build():
 @sermon_bp.route('/my_sermons')
 @login_required
 def my_sermons():
-    """View all sermons created by the current user"""
-    sermons = Sermon.query.filter_by(user_id=current_user.id).order_by(Sermon.created_at.desc()).all()
-    return render_template('sermon/my_sermons.html', sermons=sermons)
+    """View the current user's sermons, newest first, one page at a time"""
+    query = Sermon.query.filter_by(user_id=current_user.id).options(load_only(*SERMON_SUMMARY_COLUMNS))
+    sermons, next_cursor = keyset_page(
+        query, Sermon.created_at, Sermon.id,
+        cursor=request.args.get('cursor'),
+        per_page=SERMONS_PER_PAGE
+    )
+    return render_template('sermon/my_sermons.html', sermons=sermons, next_cursor=next_cursor)
 
 
 @sermon_bp.route('/sermon/<int:id>')
@@ -76,22 +160,15 @@ def view_sermon(id):
         flash('You do not have permission to view this sermon.', 'danger')
         return redirect(url_for('sermon.my_sermons'))
     
-    # Parse JSON fields if needed
-    try:
-        outline = json.loads(sermon.outline) if sermon.outline else []
-    except:
-        outline = []
-    
-    try:
-        illustrations = json.loads(sermon.illustrations) if sermon.illustrations else []
-    except:
-        illustrations = []
+    # Parsed once per revision and cached
+    outline, illustrations = get_structured_content(sermon)
     
     return render_template(
         'sermon/view_sermon.html',
         sermon=sermon,
         outline=outline,
-        illustrations=illustrations
+        illustrations=illustrations,
+        top_books=sermon_top_books(sermon)
     )
 
 
@@ -107,31 +184,38 @@ def edit_sermon(id):
         return redirect(url_for('sermon.my_sermons'))
     
     if request.method == 'POST':
+        try:
+            outline = normalize_outline(request.form.get('outline'))
+            illustrations = normalize_illustrations(request.form.get('illustrations'))
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('sermon.edit_sermon', id=sermon.id))
+        
+        previous = sermon_document(sermon)
         sermon.title = request.form.get('title')
         sermon.scripture_passage = request.form.get('scripture_passage')
         sermon.theme = request.form.get('theme')
-        sermon.content = request.form.get('content')
-        sermon.outline = request.form.get('outline')
-        sermon.illustrations = request.form.get('illustrations')
+        sermon.content = normalize_newlines(request.form.get('content'))
+        set_structured_content(sermon, outline, illustrations)
         
         try:
+            sync_outline_points(sermon.id, outline)
+            record_revision(sermon.id, sermon.revision, sermon_document(sermon), previous)
+            if sermon.content != previous['content']:
+                signature = index_sermon(sermon.id, sermon.user_id, sermon.content)
+            else:
+                signature = stored_signature(sermon.id)
+            duplicates = find_near_duplicates(sermon.id, sermon.user_id, signature)
             db.session.commit()
             flash('Sermon updated successfully!', 'success')
+            flash_near_duplicates(duplicates)
             return redirect(url_for('sermon.view_sermon', id=sermon.id))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating sermon: {str(e)}', 'danger')
     
-    # Parse JSON fields for editing
-    try:
-        outline = json.loads(sermon.outline) if sermon.outline else []
-    except:
-        outline = []
-    
-    try:
-        illustrations = json.loads(sermon.illustrations) if sermon.illustrations else []
-    except:
-        illustrations = []
+    # Parsed once per revision and cached
+    outline, illustrations = get_structured_content(sermon)
     
     return render_template(
         'sermon/edit_sermon.html',
@@ -141,6 +225,244 @@ def edit_sermon(id):
     )
 
 
+@sermon_bp.route('/sermon/<int:id>/autosave', methods=['PATCH'])
+@login_required
+def autosave_sermon(id):
+    """API endpoint to apply a small patch to a sermon while it is being edited"""
+    sermon = Sermon.query.get_or_404(id)
+    
+    # Check if the user is the owner of the sermon
+    if sermon.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to edit this sermon.'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    current_revision = sermon.revision or 0
+    if data.get('base_revision') != current_revision:
+        return jsonify({
+            'success': False,
+            'message': 'This sermon was changed elsewhere. Reload to continue editing.',
+            'revision': current_revision
+        }), 409
+    
+    try:
+        changes = apply_patch(sermon, get_structured_content(sermon), data.get('patch'))
+    except PatchError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    # Write only the touched columns, guarded by the base revision
+    values = {field: value for field, value in changes.items() if field not in ('outline', 'illustrations')}
+    for field in ('outline', 'illustrations'):
+        if field in changes:
+            values[field] = dump(changes[field])
+    values['revision'] = current_revision + 1
+    values['updated_at'] = datetime.utcnow()
+    
+    try:
+        if 'content' in changes or 'scripture_passage' in changes:
+            # The UPDATE below skips the ORM hook that keeps statistics current
+            values.update(replace_stats(
+                sermon.id,
+                changes.get('scripture_passage', sermon.scripture_passage),
+                changes.get('content', sermon.content)
+            ))
+        updated = Sermon.query.filter(
+            Sermon.id == sermon.id,
+            func.coalesce(Sermon.revision, 0) == current_revision
+        ).update(values, synchronize_session=False)
+        if not updated:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': 'This sermon was changed elsewhere. Reload to continue editing.'
+            }), 409
+        
+        if 'outline' in changes:
+            sync_outline_points(sermon.id, changes['outline'])
+        if 'content' in changes:
+            index_sermon(sermon.id, sermon.user_id, changes['content'])
+        if 'scripture_passage' in changes:
+            apply_passage_change(
+                db.session.connection(), sermon.user_id,
+                sermon.scripture_passage, changes['scripture_passage']
+            )
+        record_revision(
+            sermon.id, current_revision + 1,
+            sermon_document(sermon, values), sermon_document(sermon)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error saving sermon: {str(e)}'}), 500
+    
+    return jsonify({'success': True, 'revision': current_revision + 1})
+
+
+@sermon_bp.route('/api/sermon/<int:id>/revisions')
+@login_required
+def sermon_revisions(id):
+    """API endpoint listing a sermon's saved revisions"""
+    sermon = Sermon.query.options(load_only(Sermon.id, Sermon.user_id, Sermon.revision)).get_or_404(id)
+    
+    if sermon.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to view this sermon.'}), 403
+    
+    return jsonify({
+        'success': True,
+        'current_revision': sermon.revision,
+        'revisions': [
+            {
+                'revision': revision.revision,
+                'is_snapshot': revision.is_snapshot,
+                'size': revision.size,
+                'created_at': revision.created_at.isoformat() if revision.created_at else None
+            }
+            for revision in list_revisions(sermon.id)
+        ]
+    })
+
+
+@sermon_bp.route('/api/sermon/<int:id>/revisions/<int:revision>')
+@login_required
+def sermon_revision(id, revision):
+    """API endpoint returning a sermon as it was at a given revision"""
+    sermon = Sermon.query.options(load_only(Sermon.id, Sermon.user_id)).get_or_404(id)
+    
+    if sermon.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to view this sermon.'}), 403
+    
+    document = rebuild_revision(sermon.id, revision)
+    if document is None:
+        return jsonify({'success': False, 'message': 'Revision not found'}), 404
+    
+    return jsonify({'success': True, 'revision': revision, 'sermon': document})
+
+
+@sermon_bp.route('/api/sermon/<int:id>/diff')
+@login_required
+def sermon_diff(id):
+    """API endpoint diffing two revisions of a sermon (defaults to previous vs current)"""
+    sermon = Sermon.query.options(load_only(Sermon.id, Sermon.user_id, Sermon.revision)).get_or_404(id)
+    
+    if sermon.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to view this sermon.'}), 403
+    
+    to_revision = request.args.get('to', type=int) or sermon.revision or 0
+    from_revision = request.args.get('from', type=int) or to_revision - 1
+    
+    old = rebuild_revision(sermon.id, from_revision)
+    new = rebuild_revision(sermon.id, to_revision)
+    if old is None or new is None:
+        return jsonify({'success': False, 'message': 'Revision not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'from': from_revision,
+        'to': to_revision,
+        'diff': diff_documents(old, new, f'revision {from_revision}', f'revision {to_revision}')
+    })
+
+
+@sermon_bp.route('/sermon/<int:id>/export.<fmt>')
+@login_required
+def export_sermon(id, fmt):
+    """Download one sermon as a Markdown, HTML or DOCX document"""
+    if fmt not in DOCUMENT_FORMATS:
+        abort(404)
+    
+    sermon = Sermon.query.options(load_only(*EXPORT_COLUMNS, Sermon.user_id)).get_or_404(id)
+    if sermon.user_id != current_user.id:
+        flash('You do not have permission to export this sermon.', 'danger')
+        return redirect(url_for('sermon.my_sermons'))
+    
+    series_titles = {}
+    if sermon.series_id:
+        series_titles[sermon.series_id] = sermon.series.title
+    filename, data = render_single(sermon, fmt, series_titles)
+    return document_response(filename, data, fmt)
+
+
+@sermon_bp.route('/series/<int:id>/export.<fmt>')
+@login_required
+def export_series(id, fmt):
+    """Stream every sermon of a series as a ZIP of documents"""
+    if fmt not in DOCUMENT_FORMATS:
+        abort(404)
+    
+    series = SermonSeries.query.get_or_404(id)
+    if series.user_id != current_user.id:
+        flash('You do not have permission to export this sermon series.', 'danger')
+        return redirect(url_for('sermon.series_list'))
+    
+    return streaming_zip_export(
+        export_query(current_user.id, series_id=series.id),
+        fmt,
+        {series.id: series.title},
+        series.title
+    )
+
+
+@sermon_bp.route('/export.<fmt>')
+@login_required
+def export_archive(fmt):
+    """Stream the current user's entire sermon archive as a ZIP of documents"""
+    if fmt not in DOCUMENT_FORMATS:
+        abort(404)
+    
+    return streaming_zip_export(
+        export_query(current_user.id),
+        fmt,
+        series_titles_for(current_user.id),
+        'sermon-archive'
+    )
+
+
+@sermon_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_sermons():
+    """Import existing sermon manuscripts from uploaded files or ZIP archives"""
+    if request.method == 'POST':
+        uploads = [upload for upload in request.files.getlist('manuscripts') if upload.filename]
+        if not uploads:
+            flash('Choose at least one file or ZIP archive to import.', 'danger')
+            return redirect(url_for('sermon.import_sermons'))
+        
+        upload_dir = tempfile.mkdtemp(prefix='sermon-import-')
+        try:
+            for number, upload in enumerate(uploads):
+                filename = secure_filename(upload.filename) or f'upload-{number}'
+                upload.save(os.path.join(upload_dir, filename))
+            job = submit_job('sermon_import', import_job, current_user.id, upload_dir, user_id=current_user.id)
+        except Exception as e:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            flash(f'Error starting import: {str(e)}', 'danger')
+            return redirect(url_for('sermon.import_sermons'))
+        
+        flash('Import started. Files already imported will be skipped.', 'info')
+        return redirect(url_for('sermon.import_sermons', job=job.id))
+    
+    job = None
+    if request.args.get('job'):
+        job = BackgroundJob.query.filter_by(
+            id=request.args['job'], kind='sermon_import', user_id=current_user.id
+        ).first()
+    return render_template(
+        'sermon/import.html',
+        job=job_status(job) if job else None,
+        extensions=MANUSCRIPT_EXTENSIONS
+    )
+
+
+@sermon_bp.route('/api/import_jobs/<job_id>')
+@login_required
+def import_job_status(job_id):
+    """API endpoint to poll a sermon import job"""
+    job = BackgroundJob.query.filter_by(id=job_id, kind='sermon_import', user_id=current_user.id).first()
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    return jsonify(dict(job_status(job), success=True))
+
+
 @sermon_bp.route('/sermon/<int:id>/delete', methods=['POST'])
 @login_required
 def delete_sermon(id):
@@ -163,6 +485,122 @@ def delete_sermon(id):
     return redirect(url_for('sermon.my_sermons'))
 
 
+@sermon_bp.route('/coverage')
+@login_required
+def coverage():
+    """View which books, chapters and verses the current user has preached"""
+    books = coverage_summary(current_user.id)
+    total_verses = sum(book['verses'] for book in books)
+    covered_verses = sum(book['covered'] for book in books)
+    
+    return render_template(
+        'sermon/coverage.html',
+        books=books,
+        total_verses=total_verses,
+        covered_verses=covered_verses
+    )
+
+
+@sermon_bp.route('/api/coverage/check')
+@login_required
+def coverage_check():
+    """API endpoint to report which verses of a passage the current user has already preached"""
+    passage = request.args.get('passage', '').strip()
+    if not passage:
+        return jsonify({'success': False, 'message': 'Passage is required'})
+    
+    # When re-checking an existing sermon, ignore the coverage it contributes itself
+    exclude = None
+    sermon_id = request.args.get('sermon_id', type=int)
+    if sermon_id:
+        sermon = Sermon.query.filter_by(id=sermon_id, user_id=current_user.id) \
+            .options(load_only(Sermon.id, Sermon.scripture_passage)).first()
+        if sermon:
+            exclude = [sermon.scripture_passage]
+    
+    overlap = passage_overlap(current_user.id, passage, exclude=exclude)
+    return jsonify({
+        'success': True,
+        'preached': bool(overlap),
+        'overlap': overlap
+    })
+
+
+@sermon_bp.route('/api/series/<int:id>/overlaps')
+@login_required
+def series_overlap_warnings(id):
+    """API endpoint for overlap warnings within a series and against past sermons"""
+    series = SermonSeries.query.get_or_404(id)
+    if series.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to view this sermon series'}), 403
+    
+    sermons = Sermon.query.filter_by(series_id=series.id) \
+        .options(load_only(Sermon.id, Sermon.title, Sermon.scripture_passage)) \
+        .order_by(Sermon.series_position).all()
+    return jsonify({
+        'success': True,
+        'warnings': series_overlaps(current_user.id, sermons)
+    })
+
+
+@sermon_bp.route('/api/search')
+@login_required
+def search_my_sermons():
+    """API endpoint to full-text search the current user's sermons"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'message': 'Search query is required'})
+    
+    limit = request.args.get('limit', 20, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    results = search_sermons(current_user.id, query, limit=limit, offset=offset)
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'next_offset': offset + len(results) if results else None
+    })
+
+
+@sermon_bp.route('/api/stats')
+@login_required
+def sermon_stats():
+    """API endpoint for the current user's sermon totals, overall and per series"""
+    return jsonify({
+        'success': True,
+        'totals': user_stats(current_user.id),
+        'series': [
+            dict(totals, series_id=series_id)
+            for series_id, totals in series_totals(current_user.id).items()
+        ]
+    })
+
+
+@sermon_bp.route('/api/outline_search')
+@login_required
+def outline_search():
+    """API endpoint to find the current user's sermons with a given outline heading or point"""
+    title = request.args.get('title', '')
+    
+    if not title.strip():
+        return jsonify({'success': False, 'message': 'Title is required'})
+    
+    sermons = sermons_with_point(current_user.id, title).options(load_only(*SERMON_SUMMARY_COLUMNS)).all()
+    
+    return jsonify({
+        'success': True,
+        'results': [
+            {
+                'id': sermon.id,
+                'title': sermon.title,
+                'scripture_passage': sermon.scripture_passage,
+                'url': url_for('sermon.view_sermon', id=sermon.id)
+            }
+            for sermon in sermons
+        ]
+    })
+
+
 @sermon_bp.route('/api/generate_outline', methods=['POST'])
 @login_required
 def generate_outline():
@@ -174,35 +612,44 @@ def generate_outline():
     if not scripture:
         return jsonify({'success': False, 'message': 'Scripture passage is required'})
     
-    # In a real application, this would call an AI model or service
-    # For now, we'll return a sample outline
-    sample_outline = [
-        {
-            'title': 'Introduction',
-            'points': ['Context of scripture', 'Relevance today', 'Main themes']
-        },
-        {
-            'title': 'Main Point 1',
-            'points': ['Explanation', 'Scripture reference', 'Application']
-        },
-        {
-            'title': 'Main Point 2',
-            'points': ['Explanation', 'Scripture reference', 'Application']
-        },
-        {
-            'title': 'Main Point 3',
-            'points': ['Explanation', 'Scripture reference', 'Application']
-        },
-        {
-            'title': 'Conclusion',
-            'points': ['Summary', 'Call to action', 'Final thought']
-        }
-    ]
-    
+    backend = get_backend()
+    cache_key = outline_cache_key(backend, scripture, theme)
+    outline = get_cached_outline(cache_key)
+    if outline is not None:
+        return jsonify({
+            'success': True,
+            'outline': outline
+        })
+    
+    # Not generated yet: run the backend in the background and let the client poll
+    job = submit_job(
+        'outline', generate_outline_job, scripture, theme, cache_key,
+        user_id=current_user.id, dedupe_key=cache_key
+    )
     return jsonify({
         'success': True,
-        'outline': sample_outline
-    })
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': url_for('sermon.outline_job', job_id=job.id)
+    }), 202
+
+
+@sermon_bp.route('/api/outline_jobs/<job_id>')
+@login_required
+def outline_job(job_id):
+    """API endpoint to poll an outline generation job"""
+    job = BackgroundJob.query.filter_by(id=job_id, kind='outline').first()
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    if job.status == 'failed':
+        return jsonify({'success': False, 'status': job.status, 'message': 'Outline generation failed'})
+    
+    status = job_status(job)
+    response = {'success': True, 'job_id': job.id, 'status': job.status}
+    if job.status == 'done':
+        response['outline'] = status['result']
+    return jsonify(response)
 
 
 @sermon_bp.route('/api/suggest_illustrations', methods=['POST'])
@@ -215,26 +662,13 @@ def suggest_illustrations():
     if not theme:
         return jsonify({'success': False, 'message': 'Theme is required'})
     
-    # In a real application, this would call an AI model or service
-    # For now, we'll return sample illustrations
-    sample_illustrations = [
-        {
-            'title': 'Personal Story',
-            'description': 'Share a personal experience related to the theme'
-        },
-        {
-            'title': 'Historical Example',
-            'description': 'Reference a historical event that illustrates the theme'
-        },
-        {
-            'title': 'Modern Analogy',
-            'description': 'Use a modern situation or technology as an analogy'
-        }
-    ]
+    illustrations = search_illustrations(theme, current_user.id, limit=ILLUSTRATION_SUGGESTIONS)
+    if not illustrations:
+        illustrations = GENERIC_ILLUSTRATIONS
     
     return jsonify({
         'success': True,
-        'illustrations': sample_illustrations
+        'illustrations': illustrations
     })
 
 
@@ -244,7 +678,11 @@ def suggest_illustrations():
 def series_list():
     """View all sermon series created by the current user"""
     series = SermonSeries.query.filter_by(user_id=current_user.id).order_by(SermonSeries.created_at.desc()).all()
-    return render_template('sermon/series_list.html', series_list=series)
+    return render_template(
+        'sermon/series_list.html',
+        series_list=series,
+        series_totals=series_totals(current_user.id)
+    )
 
 
 @sermon_bp.route('/series/new', methods=['GET', 'POST'])
@@ -310,8 +748,15 @@ def view_series(id):
     
     # Get all sermons in this series
     sermons = Sermon.query.filter_by(series_id=series.id).order_by(Sermon.series_position).all()
+    overlap_warnings = series_overlaps(current_user.id, sermons)
     
-    return render_template('sermon/view_series.html', series=series, sermons=sermons)
+    return render_template(
+        'sermon/view_series.html',
+        series=series,
+        sermons=sermons,
+        overlap_warnings=overlap_warnings,
+        stats=series_stats(series.id)
+    )
 
 
 @sermon_bp.route('/series/<int:id>/edit', methods=['GET', 'POST'])
@@ -361,6 +806,57 @@ def edit_series(id):
     return render_template('sermon/edit_series.html', series=series)
 
 
+@sermon_bp.route('/series/<int:id>/reorder', methods=['POST'])
+@login_required
+def reorder_series(id):
+    """API endpoint to set the sermons of a series and their order in one update"""
+    series = SermonSeries.query.get_or_404(id)
+    
+    if series.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to modify this sermon series'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    sermon_ids = data.get('sermon_ids')
+    if not isinstance(sermon_ids, list) or not all(isinstance(sermon_id, int) for sermon_id in sermon_ids):
+        return jsonify({'success': False, 'message': 'sermon_ids must be a list of sermon ids'}), 400
+    if len(set(sermon_ids)) != len(sermon_ids):
+        return jsonify({'success': False, 'message': 'sermon_ids must not repeat'}), 400
+    
+    if sermon_ids:
+        owned = db.session.execute(
+            select(func.count(Sermon.id)).where(Sermon.id.in_(sermon_ids), Sermon.user_id == current_user.id)
+        ).scalar()
+        if owned != len(sermon_ids):
+            return jsonify({'success': False, 'message': 'Some sermons were not found'}), 404
+    
+    positions = {sermon_id: position for position, sermon_id in enumerate(sermon_ids, start=1)}
+    values = {
+        Sermon.series_id: case((Sermon.id.in_(sermon_ids), series.id), else_=None),
+        Sermon.series_position: case(positions, value=Sermon.id, else_=None) if positions else None
+    }
+    
+    try:
+        # Sermons listed join the series in order; sermons left out are unlinked
+        updated = Sermon.query.filter(
+            Sermon.user_id == current_user.id,
+            or_(Sermon.id.in_(sermon_ids), Sermon.series_id == series.id)
+        ).update(values, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error reordering sermon series: {str(e)}'}), 500
+    
+    sermons = Sermon.query.filter_by(series_id=series.id) \
+        .options(load_only(Sermon.id, Sermon.title, Sermon.scripture_passage)) \
+        .order_by(Sermon.series_position).all()
+    return jsonify({
+        'success': True,
+        'updated': updated,
+        'count': len(sermon_ids),
+        'warnings': series_overlaps(current_user.id, sermons)
+    })
+
+
 @sermon_bp.route('/series/<int:id>/delete', methods=['POST'])
 @login_required
 def delete_series(id):
@@ -373,11 +869,11 @@ def delete_series(id):
         return redirect(url_for('sermon.series_list'))
     
     try:
-        # First handle the sermons in this series (either delete or unlink)
-        sermons = Sermon.query.filter_by(series_id=series.id).all()
-        for sermon in sermons:
-            sermon.series_id = None
-            sermon.series_position = None
+        # Unlink the series' sermons in one statement rather than loading them
+        Sermon.query.filter_by(series_id=series.id).update(
+            {Sermon.series_id: None, Sermon.series_position: None},
+            synchronize_session=False
+        )
         
         db.session.delete(series)
         db.session.commit()
@@ -426,6 +922,10 @@ def add_sermon_to_series(sermon_id):
         
         db.session.commit()
         flash(f'Sermon added to series "{series.title}" successfully!', 'success')
+        
+        sermons = Sermon.query.filter_by(series_id=series.id).order_by(Sermon.series_position).all()
+        for warning in series_overlaps(current_user.id, sermons)[:MAX_OVERLAP_WARNINGS]:
+            flash(warning, 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'Error adding sermon to series: {str(e)}', 'danger')
@@ -0,0 +1,156 @@
+"""
+Incremental sermon autosave
+
+Clients send a list of JSON-Patch (RFC 6902) style operations against the
+sermon's fields instead of the whole form:
+
+    {"op": "replace", "path": "/title", "value": "New title"}
+    {"op": "add", "path": "/outline/2/points/-", "value": "Application"}
+    {"op": "remove", "path": "/illustrations/0"}
+
+Long manuscript text uses one extension op, a code-point splice, so typing
+costs only the changed characters:
+
+    {"op": "splice", "path": "/content", "offset": 1200, "remove": 3, "value": "grace"}
+
+Offsets count characters of the text with LF line endings, as the browser's
+textarea reports it; content stored with CRLF is normalized before patching.
+"""
+import copy
+
+from modules.sermon_content import normalize_illustrations, normalize_newlines, normalize_outline
+
+TEXT_FIELDS = ('title', 'scripture_passage', 'theme', 'content')
+STRUCTURED_FIELDS = ('outline', 'illustrations')
+
+
+class PatchError(ValueError):
+    """Raised when a patch operation cannot be applied"""
+
+
+def _parse_path(path):
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise PatchError(f'Invalid path: {path!r}')
+    parts = [part.replace('~1', '/').replace('~0', '~') for part in path[1:].split('/')]
+    if parts[0] not in TEXT_FIELDS + STRUCTURED_FIELDS:
+        raise PatchError(f'Unknown field: {parts[0]}')
+    return parts[0], parts[1:]
+
+
+def _list_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit():
+        raise PatchError(f'Invalid list index: {token}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f'List index out of range: {token}')
+    return index
+
+
+def _apply_structured(document, tokens, operation):
+    """Apply add/remove/replace at a JSON Pointer inside a list/dict document"""
+    op = operation.get('op')
+    if not tokens:
+        if op != 'replace':
+            raise PatchError('Only replace is allowed on a whole field')
+        return copy.deepcopy(operation.get('value'))
+
+    parent = document
+    for token in tokens[:-1]:
+        if isinstance(parent, list):
+            parent = parent[_list_index(parent, token)]
+        elif isinstance(parent, dict) and token in parent:
+            parent = parent[token]
+        else:
+            raise PatchError(f'Path not found: {token}')
+
+    last = tokens[-1]
+    if isinstance(parent, list):
+        if op == 'add':
+            parent.insert(_list_index(parent, last, allow_end=True), copy.deepcopy(operation.get('value')))
+        elif op == 'remove':
+            del parent[_list_index(parent, last)]
+        elif op == 'replace':
+            parent[_list_index(parent, last)] = copy.deepcopy(operation.get('value'))
+        else:
+            raise PatchError(f'Unsupported operation: {op}')
+    elif isinstance(parent, dict):
+        if op in ('add', 'replace'):
+            parent[last] = copy.deepcopy(operation.get('value'))
+        elif op == 'remove' and last in parent:
+            del parent[last]
+        else:
+            raise PatchError(f'Unsupported operation: {op}')
+    else:
+        raise PatchError('Path does not point into a list or object')
+    return document
+
+
+def _apply_splice(text, operation):
+    text = text or ''
+    offset = operation.get('offset')
+    remove = operation.get('remove', 0)
+    value = operation.get('value', '')
+    if not isinstance(offset, int) or not isinstance(remove, int) or not isinstance(value, str):
+        raise PatchError('Splice needs integer offset/remove and a text value')
+    if offset < 0 or remove < 0 or offset + remove > len(text):
+        raise PatchError('Splice range is outside the current text')
+    return text[:offset] + value + text[offset + remove:]
+
+
+def apply_patch(sermon, current_structured, operations):
+    """
+    Apply patch operations to a sermon's fields without touching the sermon
+
+    Args:
+        sermon: Sermon whose current field values the patch is based on
+        current_structured (tuple): (outline, illustrations) parsed for this revision
+        operations (list): Patch operations
+
+    Returns:
+        dict: field name -> new value, only for fields the patch touched;
+            outline/illustrations values are validated and normalized
+
+    Raises:
+        PatchError: If an operation is malformed or does not apply
+    """
+    if not isinstance(operations, list) or not operations:
+        raise PatchError('Patch must be a non-empty list of operations')
+
+    structured = dict(zip(STRUCTURED_FIELDS, current_structured))
+    changes = {}
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise PatchError('Each operation must be an object')
+        field, tokens = _parse_path(operation.get('path'))
+
+        if field in TEXT_FIELDS:
+            current = changes.get(field, getattr(sermon, field))
+            if operation.get('op') == 'splice' and not tokens:
+                changes[field] = _apply_splice(normalize_newlines(current), operation)
+            elif operation.get('op') == 'replace' and not tokens:
+                value = operation.get('value')
+                if value is not None and not isinstance(value, str):
+                    raise PatchError(f'{field} must be text')
+                changes[field] = value
+            else:
+                raise PatchError(f'Unsupported operation on {field}')
+            if field == 'content':
+                changes[field] = normalize_newlines(changes[field])
+        else:
+            if field not in changes:
+                changes[field] = copy.deepcopy(structured[field])
+            changes[field] = _apply_structured(changes[field], tokens, operation)
+
+    try:
+        if 'outline' in changes:
+            changes['outline'] = normalize_outline(changes['outline'])
+        if 'illustrations' in changes:
+            changes['illustrations'] = normalize_illustrations(changes['illustrations'])
+    except ValueError as e:
+        raise PatchError(str(e))
+
+    if 'title' in changes and not changes['title']:
+        raise PatchError('Title cannot be empty')
+    return changes
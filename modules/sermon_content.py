@@ -0,0 +1,233 @@
+"""
+Structured sermon outlines and illustrations
+
+Outlines and illustrations are validated and normalized on save and stored as
+canonical JSON. Parsed copies are cached per (sermon id, revision, stored
+text digest), so repeat views skip json.loads. Outline headings and points
+are also mirrored into SermonOutlinePoint rows so sections can be queried.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+from models import Sermon, SermonOutlinePoint
+from modules.extensions import db
+
+MAX_TITLE_LENGTH = 300
+MAX_CACHED_SERMONS = 512
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _load(raw):
+    if raw is None or raw == '':
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise ValueError('must be valid JSON')
+    if not isinstance(raw, list):
+        raise ValueError('must be a list')
+    return raw
+
+
+def normalize_outline(raw):
+    """
+    Validate an outline and return it in canonical form
+
+    Accepts a JSON string or list whose items are either section titles or
+    {'title': str, 'points': [str]} dicts.
+
+    Raises:
+        ValueError: If the outline is malformed
+    """
+    try:
+        items = _load(raw)
+    except ValueError as e:
+        raise ValueError(f'Outline {e}')
+
+    outline = []
+    for item in items:
+        if isinstance(item, str):
+            item = {'title': item, 'points': []}
+        if not isinstance(item, dict) or not isinstance(item.get('title', ''), str):
+            raise ValueError('Each outline section needs a text title')
+        points = item.get('points') or []
+        if not isinstance(points, list) or not all(isinstance(point, str) for point in points):
+            raise ValueError('Outline points must be a list of text items')
+        outline.append({
+            'title': item.get('title', '').strip(),
+            'points': [point.strip() for point in points if point.strip()]
+        })
+    return outline
+
+
+def normalize_illustrations(raw):
+    """
+    Validate illustrations and return them in canonical form
+
+    Accepts a JSON string or list whose items are either titles or
+    {'title': str, 'description': str} dicts.
+
+    Raises:
+        ValueError: If the illustrations are malformed
+    """
+    try:
+        items = _load(raw)
+    except ValueError as e:
+        raise ValueError(f'Illustrations {e}')
+
+    illustrations = []
+    for item in items:
+        if isinstance(item, str):
+            item = {'title': item, 'description': ''}
+        if not isinstance(item, dict):
+            raise ValueError('Each illustration needs a title and description')
+        title = item.get('title') or ''
+        description = item.get('description') or ''
+        if not isinstance(title, str) or not isinstance(description, str):
+            raise ValueError('Illustration title and description must be text')
+        illustrations.append({'title': title.strip(), 'description': description.strip()})
+    return illustrations
+
+
+def normalize_newlines(text):
+    """
+    Manuscript text with LF line endings
+
+    Browsers report textarea values with LF but submit them with CRLF, so
+    content is stored with LF to keep autosave splice offsets, which are
+    computed against the textarea value, pointing at the right characters.
+    """
+    if text is None:
+        return None
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def dump(value):
+    """Canonical JSON text for an outline or illustration list, or None when empty"""
+    return json.dumps(value, separators=(',', ':')) if value else None
+
+
+def set_structured_content(sermon, outline, illustrations):
+    """Store validated outline and illustrations on a sermon and bump its revision"""
+    sermon.outline = dump(outline)
+    sermon.illustrations = dump(illustrations)
+    sermon.revision = (sermon.revision or 0) + 1
+
+
+def _parse_stored(sermon, field, normalizer):
+    try:
+        return normalizer(getattr(sermon, field))
+    except ValueError as e:
+        logging.warning(f"Sermon {sermon.id} has malformed {field}: {e}")
+        return []
+
+
+def _cache_key(sermon):
+    # Ids can be reused after a delete (SQLite) and revisions restart at 1,
+    # so the key includes the stored text itself
+    digest = hashlib.sha1(
+        f'{sermon.outline or ""}\0{sermon.illustrations or ""}'.encode('utf-8')
+    ).hexdigest()
+    return sermon.id, sermon.revision or 0, digest
+
+
+def get_structured_content(sermon):
+    """
+    Return (outline, illustrations) for a sermon, parsing at most once per revision
+
+    The returned lists are shared between requests and must not be mutated.
+    """
+    key = _cache_key(sermon)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    parsed = (
+        _parse_stored(sermon, 'outline', normalize_outline),
+        _parse_stored(sermon, 'illustrations', normalize_illustrations)
+    )
+    with _cache_lock:
+        _cache[key] = parsed
+        while len(_cache) > MAX_CACHED_SERMONS:
+            _cache.popitem(last=False)
+    return parsed
+
+
+def forget_structured_content(sermon_id):
+    """Drop every cached parse of a sermon"""
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == sermon_id]:
+            del _cache[key]
+
+
+@event.listens_for(Session, 'after_flush')
+def _forget_deleted(session, flush_context):
+    for obj in session.deleted:
+        if isinstance(obj, Sermon):
+            forget_structured_content(obj.id)
+
+
+def _point_rows(sermon_id, outline):
+    rows = []
+    for section_index, section in enumerate(outline):
+        entries = [(None, section['title'])] + list(enumerate(section['points']))
+        for point_index, title in entries:
+            if not title:
+                continue
+            title = title[:MAX_TITLE_LENGTH]
+            rows.append({
+                'sermon_id': sermon_id,
+                'section_index': section_index,
+                'point_index': point_index,
+                'title': title,
+                'title_key': title.lower()
+            })
+    return rows
+
+
+def sync_outline_points(sermon_id, outline):
+    """Replace the queryable outline rows for a sermon (call after the sermon has an id)"""
+    table = SermonOutlinePoint.__table__
+    db.session.execute(delete(table).where(table.c.sermon_id == sermon_id))
+    rows = _point_rows(sermon_id, outline)
+    if rows:
+        db.session.execute(insert(table), rows)
+
+
+def sermons_with_point(user_id, title):
+    """Query for a user's sermons with an outline heading or point titled `title` (case-insensitive)"""
+    title_key = title.strip().lower()[:MAX_TITLE_LENGTH]
+    sermon_ids = select(SermonOutlinePoint.sermon_id).where(SermonOutlinePoint.title_key == title_key)
+    return Sermon.query.filter(Sermon.user_id == user_id, Sermon.id.in_(sermon_ids)) \
+        .order_by(Sermon.created_at.desc())
+
+
+def rebuild_outline_points():
+    """
+    Re-validate every stored outline and rebuild the outline rows
+
+    Returns:
+        int: Number of sermons processed
+    """
+    count = 0
+    for sermon_id, outline in db.session.execute(select(Sermon.id, Sermon.outline)).all():
+        try:
+            parsed = normalize_outline(outline)
+        except ValueError as e:
+            logging.warning(f"Skipping sermon {sermon_id}: {e}")
+            continue
+        sync_outline_points(sermon_id, parsed)
+        count += 1
+    db.session.commit()
+    return count
@@ -0,0 +1,161 @@
+"""
+Near-duplicate sermon detection
+
+Each sermon's content is split into overlapping word shingles and reduced to
+a MinHash signature of NUM_PERM minimum hashes. The fraction of equal
+positions in two signatures estimates the Jaccard similarity of their
+shingle sets.
+
+Signatures are split into BANDS bands of ROWS rows and each band is hashed
+into a SermonLSHBucket row. Sermons sharing any bucket are candidates, so a
+save looks up NUM_PERM / ROWS index entries instead of comparing against
+every manuscript the user owns. With 32 bands of 4 rows, pairs at the 70%
+reporting threshold become candidates over 99.9% of the time, while pairs
+under 20% similar share a bucket only about 5% of the time. Candidates are
+then checked against the full signatures.
+"""
+import hashlib
+import re
+
+import numpy as np
+from sqlalchemy import delete, insert, select, tuple_
+
+from models import Sermon, SermonLSHBucket, SermonSignature
+from modules.extensions import db
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity at or above which sermons are reported
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_SEED = 20240501
+
+_rng = np.random.default_rng(_SEED)
+_A = _rng.integers(1, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingle_hashes(text):
+    """32-bit hashes of the distinct word shingles in a text"""
+    words = _WORD_RE.findall((text or '').lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    size = min(SHINGLE_SIZE, len(words))
+    shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+         for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+
+def minhash(hashes):
+    """MinHash signature (NUM_PERM uint32 values) of a set of shingle hashes"""
+    # a < 2**31 and h < 2**32, so a * h + b stays inside uint64
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature):
+    """Bucket id for each LSH band of a signature, as signed 64-bit integers"""
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for band in signature.reshape(BANDS, ROWS)
+    ]
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(signature == other))
+
+
+def index_sermon(sermon_id, user_id, content):
+    """
+    Replace the stored signature and LSH buckets for a sermon
+
+    Call after the sermon has an id, inside the save's transaction.
+
+    Returns:
+        numpy.ndarray: The signature, or None if the content has no words
+    """
+    db.session.execute(delete(SermonSignature.__table__).where(SermonSignature.sermon_id == sermon_id))
+    db.session.execute(delete(SermonLSHBucket.__table__).where(SermonLSHBucket.sermon_id == sermon_id))
+
+    hashes = shingle_hashes(content)
+    if not len(hashes):
+        return None
+
+    signature = minhash(hashes)
+    db.session.execute(insert(SermonSignature.__table__), [{
+        'sermon_id': sermon_id,
+        'signature': signature.astype('<u4').tobytes(),
+        'shingle_count': len(hashes)
+    }])
+    db.session.execute(insert(SermonLSHBucket.__table__), [
+        {'sermon_id': sermon_id, 'user_id': user_id, 'band': band, 'bucket': bucket}
+        for band, bucket in enumerate(band_buckets(signature))
+    ])
+    return signature
+
+
+def stored_signature(sermon_id):
+    """The saved signature for a sermon, or None"""
+    packed = db.session.execute(
+        select(SermonSignature.signature).where(SermonSignature.sermon_id == sermon_id)
+    ).scalar()
+    return np.frombuffer(packed, dtype='<u4') if packed is not None else None
+
+
+def find_near_duplicates(sermon_id, user_id, signature, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    A user's other sermons whose content is similar to a signature
+
+    Returns:
+        list: (sermon id, title, similarity) tuples, most similar first
+    """
+    if signature is None:
+        return []
+
+    keys = list(enumerate(band_buckets(signature)))
+    candidate_ids = select(SermonLSHBucket.sermon_id).where(
+        SermonLSHBucket.user_id == user_id,
+        tuple_(SermonLSHBucket.band, SermonLSHBucket.bucket).in_(keys),
+        SermonLSHBucket.sermon_id != sermon_id
+    ).distinct()
+
+    rows = db.session.execute(
+        select(Sermon.id, Sermon.title, SermonSignature.signature)
+        .join(SermonSignature, SermonSignature.sermon_id == Sermon.id)
+        .where(Sermon.id.in_(candidate_ids))
+    ).all()
+
+    matches = []
+    for candidate_id, title, packed in rows:
+        score = similarity(signature, np.frombuffer(packed, dtype='<u4'))
+        if score >= threshold:
+            matches.append((candidate_id, title, score))
+    matches.sort(key=lambda match: (-match[2], match[0]))
+    return matches
+
+
+def rebuild_signatures():
+    """
+    Recompute signatures and buckets for every sermon
+
+    Returns:
+        int: Number of sermons indexed
+    """
+    count = 0
+    for sermon_id, user_id, content in db.session.execute(
+            select(Sermon.id, Sermon.user_id, Sermon.content)).all():
+        index_sermon(sermon_id, user_id, content)
+        count += 1
+    db.session.commit()
+    return count
@@ -0,0 +1,125 @@
+"""
+Batch sermon export
+
+Sermons are read from the database in small batches, rendered to documents
+in a process pool, and written into a ZIP archive that is streamed to the
+client as each file finishes. Only a bounded window of sermons is in flight
+at any time, so a year of sermons never sits in memory at once.
+"""
+import zipfile
+from collections import deque
+
+from flask import Response, stream_with_context
+from sqlalchemy.orm import load_only
+
+from models import Sermon, SermonSeries
+from modules.process_pool import PROCESS_WORKERS, get_pool
+from modules.sermon_render import DOCUMENT_FORMATS, render_document, slugify
+
+# Sermons rendered ahead of the archive writer, per export
+MAX_IN_FLIGHT = PROCESS_WORKERS * 4
+QUERY_BATCH_SIZE = 50
+
+EXPORT_COLUMNS = (
+    Sermon.id, Sermon.title, Sermon.scripture_passage, Sermon.theme, Sermon.content,
+    Sermon.outline, Sermon.illustrations, Sermon.sermon_date, Sermon.series_id,
+    Sermon.series_position
+)
+
+def sermon_record(sermon, series_titles=None):
+    """Plain dict of the fields a rendered document needs; safe to send to another process"""
+    return {
+        'id': sermon.id,
+        'title': sermon.title,
+        'scripture_passage': sermon.scripture_passage,
+        'theme': sermon.theme,
+        'content': sermon.content,
+        'outline': sermon.outline,
+        'illustrations': sermon.illustrations,
+        'sermon_date': sermon.sermon_date.isoformat() if sermon.sermon_date else None,
+        'series_title': (series_titles or {}).get(sermon.series_id),
+        'series_position': sermon.series_position,
+    }
+
+
+def export_query(user_id, series_id=None):
+    """Query for the sermons to export, with only the columns rendering needs"""
+    query = Sermon.query.filter(Sermon.user_id == user_id).options(load_only(*EXPORT_COLUMNS))
+    if series_id is not None:
+        return query.filter(Sermon.series_id == series_id) \
+            .order_by(Sermon.series_position, Sermon.id)
+    return query.order_by(Sermon.sermon_date, Sermon.created_at, Sermon.id)
+
+
+def render_single(sermon, fmt, series_titles=None):
+    """Render one sermon in the pool, returning (file name, bytes)"""
+    return get_pool().submit(render_document, sermon_record(sermon, series_titles), fmt).result()
+
+
+class _ChunkWriter:
+    """Write-only, unseekable file object; zipfile then streams entries with data descriptors"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _rendered_documents(sermons, fmt, series_titles):
+    """Render sermons in the pool, keeping at most MAX_IN_FLIGHT pending, in input order"""
+    pool = get_pool()
+    pending = deque()
+    for sermon in sermons:
+        pending.append(pool.submit(render_document, sermon_record(sermon, series_titles), fmt))
+        if len(pending) >= MAX_IN_FLIGHT:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _zip_stream(query, fmt, series_titles):
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in _rendered_documents(query.yield_per(QUERY_BATCH_SIZE), fmt, series_titles):
+            archive.writestr(filename, data)
+            chunk = writer.drain()
+            if chunk:
+                yield chunk
+    yield writer.drain()
+
+
+def series_titles_for(user_id):
+    """Series id -> title for a user's series, used to label exported sermons"""
+    return {
+        series.id: series.title
+        for series in SermonSeries.query.filter_by(user_id=user_id)
+        .options(load_only(SermonSeries.id, SermonSeries.title))
+    }
+
+
+def streaming_zip_export(query, fmt, series_titles, filename):
+    """Build a streamed ZIP download of rendered sermons"""
+    return Response(
+        stream_with_context(_zip_stream(query, fmt, series_titles)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{slugify(filename)}-{fmt}.zip"'}
+    )
+
+
+def document_response(filename, data, fmt):
+    """Download response for a single rendered document"""
+    return Response(
+        data,
+        mimetype=DOCUMENT_FORMATS[fmt][1],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,229 @@
+"""
+Sermon revision history
+
+Every save records a SermonRevision. Most rows hold a zlib-compressed delta
+from the previous revision, so storage grows with the size of each edit.
+Every SNAPSHOT_INTERVAL revisions, or when a delta would not be much smaller
+than the document, a full snapshot is stored instead. Rebuilding any revision
+therefore replays at most SNAPSHOT_INTERVAL - 1 deltas.
+"""
+import difflib
+import json
+import zlib
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import load_only
+
+from models import SermonRevision
+from modules.extensions import db
+
+DOCUMENT_FIELDS = ('title', 'scripture_passage', 'theme', 'content', 'outline', 'illustrations')
+
+SNAPSHOT_INTERVAL = 20
+
+# Changed text is diffed line by line first; a changed block of lines is then
+# diffed character by character only if it is at most MAX_MATCHER_SPAN
+# characters (the matcher is roughly quadratic), otherwise stored as a single
+# replacement. Above MAX_MATCHER_LINES lines the whole span is one replacement.
+MAX_MATCHER_SPAN = 2000
+MAX_MATCHER_LINES = 5000
+
+
+def sermon_document(sermon, changes=None):
+    """Versioned fields of a sermon as a dict, optionally overlaid with pending changes"""
+    document = {field: getattr(sermon, field) for field in DOCUMENT_FIELDS}
+    if changes:
+        document.update({field: value for field, value in changes.items() if field in DOCUMENT_FIELDS})
+    return document
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def _text_ops(old, new):
+    """Edits turning old into new as [start, end, replacement] against old"""
+    start = 0
+    limit = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+
+    old_mid, new_mid = old[start:end_old], new[start:end_new]
+    if not old_mid or not new_mid:
+        return [[start, end_old, new_mid]]
+
+    old_lines, new_lines = old_mid.splitlines(keepends=True), new_mid.splitlines(keepends=True)
+    if len(old_lines) + len(new_lines) > MAX_MATCHER_LINES:
+        return [[start, end_old, new_mid]]
+    old_offsets, new_offsets = _line_offsets(old_lines), _line_offsets(new_lines)
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old_start, old_end = old_offsets[i1], old_offsets[i2]
+        new_start, new_end = new_offsets[j1], new_offsets[j2]
+        ops.extend(_span_ops(
+            old_mid[old_start:old_end], new_mid[new_start:new_end], start + old_start
+        ))
+    return ops
+
+
+def _line_offsets(lines):
+    """Character offset of each line start, plus the total length"""
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+def _span_ops(old, new, offset):
+    """Character-level edits for one changed block of lines"""
+    if not old or not new or len(old) + len(new) > MAX_MATCHER_SPAN:
+        return [[offset, offset + len(old), new]]
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [
+        [offset + i1, offset + i2, new[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal'
+    ]
+
+
+def make_delta(previous, document):
+    """Field-level delta between two documents; None values are stored verbatim"""
+    delta = {}
+    for field in DOCUMENT_FIELDS:
+        old, new = previous.get(field), document.get(field)
+        if old == new:
+            continue
+        if old is None or new is None:
+            delta[field] = {'set': new}
+        else:
+            delta[field] = {'ops': _text_ops(old, new)}
+    return delta
+
+
+def apply_delta(document, delta):
+    """Apply a delta from make_delta to a document, returning a new document"""
+    document = dict(document)
+    for field, change in delta.items():
+        if 'set' in change:
+            document[field] = change['set']
+            continue
+        text = document.get(field) or ''
+        pieces = []
+        position = 0
+        for start, end, replacement in change['ops']:
+            pieces.append(text[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(text[position:])
+        document[field] = ''.join(pieces)
+    return document
+
+
+def record_revision(sermon_id, revision, document, previous=None):
+    """
+    Store a revision of a sermon in the current transaction
+
+    Args:
+        sermon_id (int): Sermon id
+        revision (int): Revision number being saved
+        document (dict): Versioned fields after the save
+        previous (dict, optional): Versioned fields before the save; a
+            snapshot is stored when omitted
+    """
+    last_recorded, last_snapshot = db.session.execute(
+        select(
+            func.max(SermonRevision.revision),
+            func.max(case((SermonRevision.is_snapshot, SermonRevision.revision)))
+        ).where(SermonRevision.sermon_id == sermon_id)
+    ).one()
+
+    snapshot = _pack(document)
+    data, is_snapshot = snapshot, True
+    chained = previous is not None and last_recorded == revision - 1 and last_snapshot is not None
+    if chained and revision - last_snapshot < SNAPSHOT_INTERVAL:
+        packed_delta = _pack(make_delta(previous, document))
+        if len(packed_delta) * 2 < len(snapshot):
+            data, is_snapshot = packed_delta, False
+
+    db.session.add(SermonRevision(
+        sermon_id=sermon_id,
+        revision=revision,
+        is_snapshot=is_snapshot,
+        data=data,
+        size=len(data)
+    ))
+
+
+def rebuild_revision(sermon_id, revision):
+    """
+    Reconstruct the versioned fields of a sermon at a given revision
+
+    Returns:
+        dict: Document, or None if the revision was never recorded
+    """
+    snapshot_revision = db.session.execute(
+        select(func.max(SermonRevision.revision)).where(
+            SermonRevision.sermon_id == sermon_id,
+            SermonRevision.is_snapshot.is_(True),
+            SermonRevision.revision <= revision
+        )
+    ).scalar()
+    if snapshot_revision is None:
+        return None
+
+    rows = SermonRevision.query.filter(
+        SermonRevision.sermon_id == sermon_id,
+        SermonRevision.revision >= snapshot_revision,
+        SermonRevision.revision <= revision
+    ).order_by(SermonRevision.revision).all()
+    if not rows or rows[-1].revision != revision:
+        return None
+
+    document = _unpack(rows[0].data)
+    for row in rows[1:]:
+        document = apply_delta(document, _unpack(row.data))
+    return document
+
+
+def list_revisions(sermon_id):
+    """Revision metadata for a sermon, newest first, without loading stored data"""
+    return SermonRevision.query.filter_by(sermon_id=sermon_id) \
+        .options(load_only(
+            SermonRevision.revision, SermonRevision.is_snapshot,
+            SermonRevision.size, SermonRevision.created_at
+        )) \
+        .order_by(SermonRevision.revision.desc()).all()
+
+
+def _diff_lines(text):
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith('\n'):
+        lines[-1] += '\n'
+    return lines
+
+
+def diff_documents(old, new, from_label='', to_label=''):
+    """Unified diff per changed field between two documents"""
+    diffs = {}
+    for field in DOCUMENT_FIELDS:
+        old_text, new_text = old.get(field) or '', new.get(field) or ''
+        if old_text == new_text:
+            continue
+        diffs[field] = ''.join(difflib.unified_diff(
+            _diff_lines(old_text),
+            _diff_lines(new_text),
+            fromfile=from_label,
+            tofile=to_label
+        ))
+    return diffs
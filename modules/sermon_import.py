@@ -0,0 +1,233 @@
+"""
+Bulk sermon import
+
+Manuscript files from directories and ZIP archives are read one at a time,
+parsed in a process pool, and inserted in chunks of IMPORT_CHUNK_SIZE with
+one commit per chunk. Every imported file is recorded in SermonImport by the
+sha256 of its contents, so an interrupted import can simply be run again:
+files already imported are skipped.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import zipfile
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+from sqlalchemy import select
+
+from models import Sermon, SermonImport
+from modules.extensions import db
+from modules.jobs import update_progress
+from modules.manuscript_parser import MANUSCRIPT_EXTENSIONS, parse_manuscript
+from modules.process_pool import PROCESS_WORKERS, discard_pool, get_pool
+from modules.sermon_duplicates import index_sermon
+from modules.sermon_history import record_revision, sermon_document
+
+# Files parsed ahead of the database writer
+MAX_IN_FLIGHT = PROCESS_WORKERS * 4
+IMPORT_CHUNK_SIZE = 50
+
+# Larger files are almost certainly not manuscripts
+MAX_FILE_SIZE = 10 * 1024 * 1024
+
+# Per-file errors kept in the import summary
+MAX_REPORTED_ERRORS = 100
+
+def _submit(filename, data):
+    """Start parsing a file; returns (pool, future)"""
+    pool = get_pool()
+    try:
+        return pool, pool.submit(parse_manuscript, os.path.basename(filename), data)
+    except BrokenProcessPool:
+        discard_pool(pool)
+        pool = get_pool()
+        return pool, pool.submit(parse_manuscript, os.path.basename(filename), data)
+
+
+def _is_manuscript(name):
+    base = os.path.basename(name)
+    return not base.startswith('.') and '__MACOSX' not in name \
+        and os.path.splitext(base)[1].lower() in MANUSCRIPT_EXTENSIONS
+
+
+def collect_sources(paths):
+    """
+    Manuscript files found in a set of files, directories and ZIP archives
+
+    Args:
+        paths (list): File system paths
+
+    Returns:
+        list: (archive path or None, file path or archive member name) tuples,
+            in a stable order
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    full_path = os.path.join(root, name)
+                    if name.lower().endswith('.zip'):
+                        sources.extend(collect_sources([full_path]))
+                    elif _is_manuscript(name):
+                        sources.append((None, full_path))
+        elif zipfile.is_zipfile(path) and not path.lower().endswith('.docx'):
+            with zipfile.ZipFile(path) as archive:
+                sources.extend(
+                    (path, info.filename) for info in archive.infolist()
+                    if not info.is_dir() and _is_manuscript(info.filename)
+                )
+        elif _is_manuscript(path):
+            sources.append((None, path))
+    return sources
+
+
+def _read_sources(sources):
+    """Yield (name, bytes or None) for each source, opening each archive once"""
+    archives = {}
+    try:
+        for archive_path, name in sources:
+            if archive_path is None:
+                size = os.path.getsize(name)
+                if size > MAX_FILE_SIZE:
+                    yield name, None
+                    continue
+                with open(name, 'rb') as f:
+                    yield name, f.read()
+            else:
+                archive = archives.get(archive_path)
+                if archive is None:
+                    archive = archives[archive_path] = zipfile.ZipFile(archive_path)
+                if archive.getinfo(name).file_size > MAX_FILE_SIZE:
+                    yield name, None
+                    continue
+                yield name, archive.read(name)
+    finally:
+        for archive in archives.values():
+            archive.close()
+
+
+def _save_chunk(user_id, chunk):
+    """Insert parsed manuscripts and their import records, then commit"""
+    sermons = []
+    for filename, key, fields in chunk:
+        sermon = Sermon(
+            title=fields['title'],
+            scripture_passage=fields['scripture_passage'],
+            theme=fields['theme'],
+            content=fields['content'],
+            sermon_date=date.fromisoformat(fields['sermon_date']) if fields['sermon_date'] else None,
+            user_id=user_id
+        )
+        sermons.append(sermon)
+    db.session.add_all(sermons)
+    db.session.flush()
+
+    for (filename, key, fields), sermon in zip(chunk, sermons):
+        record_revision(sermon.id, sermon.revision, sermon_document(sermon))
+        index_sermon(sermon.id, user_id, sermon.content)
+        db.session.add(SermonImport(
+            user_id=user_id,
+            source_key=key,
+            filename=os.path.basename(filename)[:300],
+            sermon_id=sermon.id
+        ))
+    db.session.commit()
+
+
+def import_manuscripts(user_id, paths, on_progress=None):
+    """
+    Import every manuscript under a set of paths as sermons for a user
+
+    Args:
+        user_id (int): Owner of the imported sermons
+        paths (list): Files, directories and ZIP archives to import
+        on_progress (callable, optional): Called as on_progress(done, total)
+            after each committed chunk
+
+    Returns:
+        dict: Counts of 'imported', 'skipped' (already imported or repeated)
+            and 'failed' files, plus 'errors' as (file name, message) pairs
+    """
+    sources = collect_sources(paths)
+    total = len(sources)
+    summary = {'imported': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+
+    seen = set(db.session.execute(
+        select(SermonImport.source_key).where(SermonImport.user_id == user_id)
+    ).scalars())
+
+    def fail(filename, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append((os.path.basename(filename), message))
+
+    def collect(pending_item, chunk):
+        filename, key, pool, future = pending_item
+        try:
+            chunk.append((filename, key, future.result()))
+        except ValueError as e:
+            fail(filename, str(e))
+        except BrokenProcessPool:
+            logging.exception(f"Parser process died while importing {filename}")
+            discard_pool(pool)
+            fail(filename, 'The parser stopped unexpectedly')
+        except Exception as e:
+            # One unreadable file must not abort the rest of the import
+            logging.exception(f"Could not parse {filename}")
+            fail(filename, f'Could not read file ({type(e).__name__})')
+
+    def flush(chunk):
+        if chunk:
+            try:
+                _save_chunk(user_id, chunk)
+                summary['imported'] += len(chunk)
+            except Exception as e:
+                # Nothing from the chunk was saved; carry on with the next one
+                db.session.rollback()
+                logging.exception(f"Could not save {len(chunk)} imported sermons")
+                for filename, key, fields in chunk:
+                    fail(filename, f'Could not save sermon ({type(e).__name__})')
+            chunk.clear()
+        if on_progress:
+            on_progress(summary['imported'] + summary['skipped'] + summary['failed'], total)
+
+    pending = deque()
+    chunk = []
+    for filename, data in _read_sources(sources):
+        if data is None:
+            fail(filename, 'File is too large')
+            continue
+        key = hashlib.sha256(data).hexdigest()
+        if key in seen:
+            summary['skipped'] += 1
+            continue
+        seen.add(key)
+
+        pending.append((filename, key, *_submit(filename, data)))
+        if len(pending) >= MAX_IN_FLIGHT:
+            collect(pending.popleft(), chunk)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush(chunk)
+
+    while pending:
+        collect(pending.popleft(), chunk)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush(chunk)
+    flush(chunk)
+    return summary
+
+
+def import_job(job_id, user_id, upload_dir):
+    """Background job: import an uploaded batch of manuscripts, then delete the upload"""
+    try:
+        return import_manuscripts(
+            user_id, [upload_dir],
+            on_progress=lambda done, total: update_progress(job_id, done, total)
+        )
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
@@ -0,0 +1,260 @@
+"""
+Sermon document rendering
+
+Pure functions that turn a plain sermon dict into a Markdown, HTML or DOCX
+file. Nothing here touches the database or Flask, so they can run in a
+separate process.
+"""
+import html
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+
+# Export format -> (file extension, mimetype)
+DOCUMENT_FORMATS = {
+    'md': ('md', 'text/markdown'),
+    'html': ('html', 'text/html'),
+    'docx': ('docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+
+
+def _load_items(raw):
+    """Outline/illustration JSON as a list of dicts; older rows may hold plain strings"""
+    if not raw:
+        return []
+    try:
+        items = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return [item if isinstance(item, dict) else {'title': str(item)} for item in items]
+
+
+def _paragraphs(text):
+    return [paragraph.strip() for paragraph in re.split(r'\n\s*\n', text or '') if paragraph.strip()]
+
+
+def _details(sermon):
+    details = []
+    if sermon.get('scripture_passage'):
+        details.append(('Scripture', sermon['scripture_passage']))
+    if sermon.get('theme'):
+        details.append(('Theme', sermon['theme']))
+    if sermon.get('sermon_date'):
+        details.append(('Date', sermon['sermon_date']))
+    if sermon.get('series_title'):
+        series = sermon['series_title']
+        if sermon.get('series_position'):
+            series = f"{series} (part {sermon['series_position']})"
+        details.append(('Series', series))
+    return details
+
+
+def render_markdown(sermon):
+    lines = [f"# {sermon['title']}", '']
+    for label, value in _details(sermon):
+        lines.append(f'**{label}:** {value}  ')
+    lines.append('')
+
+    outline = _load_items(sermon.get('outline'))
+    if outline:
+        lines += ['## Outline', '']
+        for number, section in enumerate(outline, start=1):
+            lines.append(f"{number}. **{section.get('title', '')}**")
+            for point in section.get('points') or []:
+                lines.append(f'    - {point}')
+        lines.append('')
+
+    if sermon.get('content'):
+        lines += ['## Manuscript', '']
+        for paragraph in _paragraphs(sermon['content']):
+            lines += [paragraph, '']
+
+    illustrations = _load_items(sermon.get('illustrations'))
+    if illustrations:
+        lines += ['## Illustrations', '']
+        for illustration in illustrations:
+            description = illustration.get('description')
+            lines.append(f"- **{illustration.get('title', '')}**" + (f': {description}' if description else ''))
+        lines.append('')
+    return '\n'.join(lines).encode('utf-8')
+
+
+HTML_STYLE = """
+body { font-family: Georgia, 'Times New Roman', serif; max-width: 42em; margin: 2em auto; line-height: 1.5; }
+h1 { margin-bottom: 0.2em; }
+.details { color: #555; margin-bottom: 1.5em; }
+@media print { body { margin: 0; max-width: none; } h2 { page-break-after: avoid; } }
+"""
+
+
+def render_html(sermon):
+    escape = html.escape
+    parts = [
+        '<!DOCTYPE html>',
+        '<html lang="en"><head><meta charset="utf-8">',
+        f"<title>{escape(sermon['title'])}</title>",
+        f'<style>{HTML_STYLE}</style>',
+        '</head><body>',
+        f"<h1>{escape(sermon['title'])}</h1>",
+        '<div class="details">',
+    ]
+    parts += [f'<div><strong>{escape(label)}:</strong> {escape(str(value))}</div>' for label, value in _details(sermon)]
+    parts.append('</div>')
+
+    outline = _load_items(sermon.get('outline'))
+    if outline:
+        parts.append('<h2>Outline</h2><ol>')
+        for section in outline:
+            parts.append(f"<li><strong>{escape(section.get('title', ''))}</strong>")
+            points = section.get('points') or []
+            if points:
+                parts.append('<ul>' + ''.join(f'<li>{escape(point)}</li>' for point in points) + '</ul>')
+            parts.append('</li>')
+        parts.append('</ol>')
+
+    if sermon.get('content'):
+        parts.append('<h2>Manuscript</h2>')
+        parts += [
+            '<p>' + escape(paragraph).replace('\n', '<br>') + '</p>'
+            for paragraph in _paragraphs(sermon['content'])
+        ]
+
+    illustrations = _load_items(sermon.get('illustrations'))
+    if illustrations:
+        parts.append('<h2>Illustrations</h2><ul>')
+        for illustration in illustrations:
+            description = illustration.get('description')
+            parts.append(
+                f"<li><strong>{escape(illustration.get('title', ''))}</strong>"
+                + (f': {escape(description)}' if description else '') + '</li>'
+            )
+        parts.append('</ul>')
+    parts.append('</body></html>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+
+DOCX_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCX_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+DOCX_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/>
+<w:pPr><w:spacing w:after="160"/></w:pPr><w:rPr><w:rFonts w:ascii="Georgia" w:hAnsi="Georgia"/><w:sz w:val="24"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>
+<w:rPr><w:b/><w:sz w:val="48"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>
+<w:pPr><w:keepNext/><w:spacing w:before="240"/></w:pPr><w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/>
+<w:pPr><w:keepNext/></w:pPr><w:rPr><w:b/><w:sz w:val="26"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListParagraph"><w:name w:val="List Paragraph"/><w:basedOn w:val="Normal"/>
+<w:pPr><w:ind w:left="720"/></w:pPr></w:style>
+</w:styles>"""
+
+
+# Control characters are not allowed in XML 1.0
+_INVALID_XML_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _docx_text(text):
+    return xml_escape(_INVALID_XML_RE.sub('', text))
+
+
+def _docx_paragraph(text, style=None, bold_prefix=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    runs = ''
+    if bold_prefix:
+        runs += f'<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{_docx_text(bold_prefix)}</w:t></w:r>'
+    runs += f'<w:r><w:t xml:space="preserve">{_docx_text(text)}</w:t></w:r>'
+    return f'<w:p>{properties}{runs}</w:p>'
+
+
+def render_docx(sermon):
+    body = [_docx_paragraph(sermon['title'], 'Title')]
+    body += [_docx_paragraph(str(value), bold_prefix=f'{label}: ') for label, value in _details(sermon)]
+
+    outline = _load_items(sermon.get('outline'))
+    if outline:
+        body.append(_docx_paragraph('Outline', 'Heading1'))
+        for number, section in enumerate(outline, start=1):
+            body.append(_docx_paragraph(f"{number}. {section.get('title', '')}", 'Heading2'))
+            body += [_docx_paragraph(f'• {point}', 'ListParagraph') for point in section.get('points') or []]
+
+    if sermon.get('content'):
+        body.append(_docx_paragraph('Manuscript', 'Heading1'))
+        body += [_docx_paragraph(paragraph) for paragraph in _paragraphs(sermon['content'])]
+
+    illustrations = _load_items(sermon.get('illustrations'))
+    if illustrations:
+        body.append(_docx_paragraph('Illustrations', 'Heading1'))
+        for illustration in illustrations:
+            description = illustration.get('description') or ''
+            body.append(_docx_paragraph(description, 'ListParagraph', bold_prefix=f"{illustration.get('title', '')}: "))
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        + ''.join(body) +
+        '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+        '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440"/></w:sectPr>'
+        '</w:body></w:document>'
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        docx.writestr('_rels/.rels', DOCX_RELS)
+        docx.writestr('word/_rels/document.xml.rels', DOCX_DOCUMENT_RELS)
+        docx.writestr('word/styles.xml', DOCX_STYLES)
+        docx.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+_RENDERERS = {
+    'md': render_markdown,
+    'html': render_html,
+    'docx': render_docx,
+}
+
+
+def slugify(text, max_length=60):
+    slug = re.sub(r'[^a-z0-9]+', '-', (text or '').lower()).strip('-')
+    return slug[:max_length].rstrip('-') or 'sermon'
+
+
+def document_filename(sermon, fmt):
+    """Stable, unique file name for a rendered sermon"""
+    prefix = f"{sermon['series_position']:02d}-" if sermon.get('series_position') else ''
+    return f"{prefix}{slugify(sermon['title'])}-{sermon['id']}.{DOCUMENT_FORMATS[fmt][0]}"
+
+
+def render_document(sermon, fmt):
+    """
+    Render one sermon
+
+    Args:
+        sermon (dict): Plain sermon fields (see sermon_export.sermon_record)
+        fmt (str): One of DOCUMENT_FORMATS
+
+    Returns:
+        tuple: (file name, file bytes)
+    """
+    return document_filename(sermon, fmt), _RENDERERS[fmt](sermon)
@@ -0,0 +1,250 @@
+"""
+Sermon full-text search
+
+The index is maintained by the database itself, so every write path (forms,
+autosave, bulk updates, deletes) keeps it in sync:
+
+- SQLite: an external-content FTS5 table, sermon_fts, kept current by
+  insert/update/delete triggers on sermon
+- PostgreSQL: a generated tsvector column, sermon.search_vector, with a GIN
+  index
+- Anything else falls back to an ILIKE scan
+
+create_search_index() installs the index on an existing database and is
+also run when the sermon table is first created.
+"""
+import html
+import logging
+import re
+
+from sqlalchemy import DateTime, event, inspect, or_, text
+
+from models import Sermon
+from modules.extensions import db
+
+MAX_RESULTS = 50
+
+# Column weights for ranking: title, scripture_passage, theme, content
+FTS_WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+
+# Snippet highlight markers; replaced with <mark> after escaping
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+SNIPPET_WORDS = 24
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS sermon_fts USING fts5(
+        title, scripture_passage, theme, content,
+        content='sermon', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS sermon_fts_insert AFTER INSERT ON sermon BEGIN
+        INSERT INTO sermon_fts(rowid, title, scripture_passage, theme, content)
+        VALUES (new.id, new.title, new.scripture_passage, new.theme, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sermon_fts_delete AFTER DELETE ON sermon BEGIN
+        INSERT INTO sermon_fts(sermon_fts, rowid, title, scripture_passage, theme, content)
+        VALUES ('delete', old.id, old.title, old.scripture_passage, old.theme, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sermon_fts_update
+    AFTER UPDATE OF title, scripture_passage, theme, content ON sermon BEGIN
+        INSERT INTO sermon_fts(sermon_fts, rowid, title, scripture_passage, theme, content)
+        VALUES ('delete', old.id, old.title, old.scripture_passage, old.theme, old.content);
+        INSERT INTO sermon_fts(rowid, title, scripture_passage, theme, content)
+        VALUES (new.id, new.title, new.scripture_passage, new.theme, new.content);
+    END""",
+]
+
+POSTGRESQL_DDL = [
+    """ALTER TABLE sermon ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(scripture_passage, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(theme, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'D')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_sermon_search_vector ON sermon USING GIN (search_vector)",
+]
+
+# Engine URL -> 'fts5', 'tsvector' or 'like'
+_backends = {}
+
+
+def _has_search_index(connection):
+    dialect = connection.dialect.name
+    inspector = inspect(connection)
+    if dialect == 'sqlite':
+        return inspector.has_table('sermon_fts')
+    if dialect == 'postgresql':
+        return any(column['name'] == 'search_vector' for column in inspector.get_columns('sermon'))
+    return False
+
+
+def create_search_index(connection):
+    """
+    Install the native search index for this database if it is missing
+
+    Args:
+        connection: SQLAlchemy connection inside a transaction
+
+    Returns:
+        bool: True if the index was created
+    """
+    dialect = connection.dialect.name
+    if dialect not in ('sqlite', 'postgresql') or _has_search_index(connection):
+        return False
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        # Index rows that existed before the table was created
+        connection.execute(text("INSERT INTO sermon_fts(sermon_fts) VALUES ('rebuild')"))
+    else:
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+    _backends.pop(str(connection.engine.url), None)
+    return True
+
+
+@event.listens_for(Sermon.__table__, 'after_create')
+def _create_on_table_create(target, connection, **kw):
+    try:
+        with connection.begin_nested():
+            create_search_index(connection)
+    except Exception as e:
+        # e.g. SQLite built without FTS5; searches fall back to ILIKE
+        logging.warning(f"Could not create sermon search index: {str(e)}")
+
+
+def search_backend():
+    """Which search implementation the current database supports"""
+    key = str(db.engine.url)
+    backend = _backends.get(key)
+    if backend is None:
+        with db.engine.connect() as connection:
+            if not _has_search_index(connection):
+                backend = 'like'
+            else:
+                backend = 'fts5' if connection.dialect.name == 'sqlite' else 'tsvector'
+        _backends[key] = backend
+    return backend
+
+
+def _fts5_query(words):
+    # Quote every word so user input can never be read as FTS5 syntax;
+    # the last word also matches as a prefix for search-as-you-type
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    """Escape a snippet and turn the highlight markers into <mark> tags"""
+    return html.escape(snippet or '') \
+        .replace(_HIGHLIGHT_START, '<mark>') \
+        .replace(_HIGHLIGHT_END, '</mark>')
+
+
+def _like_snippet(sermon, words):
+    """Snippet around the first match, for databases without a native index"""
+    for field in ('content', 'theme', 'scripture_passage', 'title'):
+        value = getattr(sermon, field) or ''
+        lowered = value.lower()
+        positions = [lowered.find(word.lower()) for word in words]
+        positions = [position for position in positions if position >= 0]
+        if positions:
+            start = max(min(positions) - 80, 0)
+            excerpt = value[start:start + 200]
+            for word in words:
+                excerpt = re.sub(
+                    re.escape(word),
+                    lambda match: _HIGHLIGHT_START + match.group(0) + _HIGHLIGHT_END,
+                    excerpt, flags=re.IGNORECASE
+                )
+            return ('…' if start else '') + excerpt + ('…' if start + 200 < len(value) else '')
+    return ''
+
+
+def _result(row, snippet, rank):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'scripture_passage': row.scripture_passage,
+        'theme': row.theme,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'snippet': _highlight(snippet),
+        'rank': rank
+    }
+
+
+def search_sermons(user_id, query, limit=20, offset=0):
+    """
+    Full-text search over a user's sermons
+
+    Args:
+        user_id (int): Owner whose sermons are searched
+        query (str): Free-text search
+        limit (int): Page size, capped at MAX_RESULTS
+        offset (int): Results to skip
+
+    Returns:
+        list: Result dicts, best match first; 'snippet' is HTML with <mark>
+            around matched terms
+    """
+    words = _WORD_RE.findall(query or '')
+    if not words:
+        return []
+    limit = max(1, min(limit, MAX_RESULTS))
+    offset = max(offset, 0)
+
+    backend = search_backend()
+    params = {'user_id': user_id, 'limit': limit, 'offset': offset}
+
+    if backend == 'fts5':
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        rows = db.session.execute(text(f"""
+            SELECT s.id, s.title, s.scripture_passage, s.theme, s.created_at,
+                   bm25(sermon_fts, {weights}) AS rank,
+                   snippet(sermon_fts, -1, :start, :end, '…', {SNIPPET_WORDS}) AS snippet
+            FROM sermon_fts JOIN sermon s ON s.id = sermon_fts.rowid
+            WHERE sermon_fts MATCH :match AND s.user_id = :user_id
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """).columns(created_at=DateTime), dict(params, match=_fts5_query(words), start=_HIGHLIGHT_START, end=_HIGHLIGHT_END)).all()
+        # bm25() is lower-is-better; flip it so higher means more relevant
+        return [_result(row, row.snippet, -row.rank) for row in rows]
+
+    if backend == 'tsvector':
+        # Rank and page first so ts_headline only runs on the rows returned
+        rows = db.session.execute(text(f"""
+            WITH query AS (SELECT websearch_to_tsquery('english', :query) AS q),
+            ranked AS (
+                SELECT s.id, s.title, s.scripture_passage, s.theme, s.created_at, s.content,
+                       ts_rank_cd(s.search_vector, query.q) AS rank
+                FROM sermon s, query
+                WHERE s.user_id = :user_id AND s.search_vector @@ query.q
+                ORDER BY rank DESC, s.id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT ranked.*, ts_headline(
+                'english', coalesce(nullif(ranked.content, ''), ranked.title), query.q,
+                'StartSel="' || :start || '", StopSel="' || :end || '", MaxWords={SNIPPET_WORDS}, MinWords=10'
+            ) AS snippet
+            FROM ranked, query
+            ORDER BY ranked.rank DESC, ranked.id DESC
+        """).columns(created_at=DateTime), dict(params, query=' '.join(words), start=_HIGHLIGHT_START, end=_HIGHLIGHT_END)).all()
+        return [_result(row, row.snippet, float(row.rank)) for row in rows]
+
+    conditions = []
+    for word in words:
+        pattern = f'%{word}%'
+        conditions.append(or_(
+            Sermon.title.ilike(pattern),
+            Sermon.scripture_passage.ilike(pattern),
+            Sermon.theme.ilike(pattern),
+            Sermon.content.ilike(pattern)
+        ))
+    sermons = Sermon.query.filter(Sermon.user_id == user_id, *conditions) \
+        .order_by(Sermon.created_at.desc(), Sermon.id.desc()) \
+        .limit(limit).offset(offset).all()
+    return [_result(sermon, _like_snippet(sermon, words), None) for sermon in sermons]
@@ -0,0 +1,211 @@
+"""
+Sermon text statistics
+
+Word, sentence and syllable counts, Flesch reading ease, estimated preaching
+time and per-book scripture citations are computed once when a sermon's
+content or passage is saved and stored on the sermon (the book counts in
+SermonBookCount): by a before_flush hook for ORM saves and by
+replace_stats() for autosave, which writes with a single UPDATE. Series and
+user totals are then plain SQL aggregates over those columns; manuscripts are
+never re-read to show them.
+
+Counts rather than averages are stored so rollups are exact: a series'
+readability is computed from its summed words, sentences and syllables.
+"""
+import math
+import re
+from collections import Counter
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from models import Sermon, SermonBookCount
+from modules.extensions import db
+from modules.scripture import book_name, parse_references
+
+# Typical delivery pace for a preached manuscript
+PREACHING_WORDS_PER_MINUTE = 130
+
+TOP_BOOKS = 3
+REBUILD_BATCH_SIZE = 200
+
+_WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+_SENTENCE_END_RE = re.compile(r'[.!?]+(?=\s|$)')
+_VOWEL_GROUP_RE = re.compile(r'[aeiouy]+')
+
+# Citations inside a manuscript, e.g. "Romans 8:28" or "1 John 4:7-8"
+_CITATION_RE = re.compile(r'\b(?:[1-3]\s?)?[A-Z][a-z]+\.?\s+\d{1,3}:\d{1,3}(?:\s*[-–]\s*\d{1,3}(?::\d{1,3})?)?')
+
+
+def _syllables(word):
+    word = word.lower()
+    count = len(_VOWEL_GROUP_RE.findall(word))
+    if word.endswith('e') and not word.endswith(('le', 'ee')) and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def flesch_reading_ease(words, sentences, syllables):
+    """Flesch reading ease for summed counts, or None for empty text"""
+    if not words:
+        return None
+    return round(206.835 - 1.015 * words / max(sentences, 1) - 84.6 * syllables / words, 1)
+
+
+def preaching_minutes(words):
+    """Estimated delivery time in whole minutes"""
+    return math.ceil(words / PREACHING_WORDS_PER_MINUTE) if words else 0
+
+
+def text_stats(content):
+    """
+    Statistics for a manuscript
+
+    Returns:
+        dict: 'word_count', 'sentence_count', 'syllable_count', 'readability'
+            and 'preaching_minutes'
+    """
+    words = _WORD_RE.findall(content or '')
+    word_count = len(words)
+    sentence_count = max(len(_SENTENCE_END_RE.findall(content or '')), 1) if words else 0
+    syllable_count = sum(_syllables(word) for word in words)
+    return {
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'syllable_count': syllable_count,
+        'readability': flesch_reading_ease(word_count, sentence_count, syllable_count),
+        'preaching_minutes': preaching_minutes(word_count),
+    }
+
+
+def book_references(passage, content):
+    """Counter of book ordinal -> citations in a sermon's passage and manuscript"""
+    counts = Counter()
+    for text in [passage or ''] + _CITATION_RE.findall(content or ''):
+        # A reference spanning chapters yields one range per chapter; count it once
+        counts.update({scripture_range.book for scripture_range in parse_references(text)})
+    return counts
+
+
+def apply_stats(sermon):
+    """Recompute and set a sermon's statistics and book counts"""
+    for column, value in text_stats(sermon.content).items():
+        setattr(sermon, column, value)
+    sermon.book_counts = [
+        SermonBookCount(book=book, reference_count=count)
+        for book, count in book_references(sermon.scripture_passage, sermon.content).items()
+    ]
+
+
+def replace_stats(sermon_id, passage, content):
+    """
+    Statistics for a save that bypasses the ORM, such as autosave's UPDATE
+
+    Rewrites the sermon's book counts in the current transaction.
+
+    Returns:
+        dict: Column values to include in the sermon's UPDATE, as text_stats
+    """
+    db.session.execute(delete(SermonBookCount).where(SermonBookCount.sermon_id == sermon_id))
+    counts = book_references(passage, content)
+    if counts:
+        db.session.execute(insert(SermonBookCount), [
+            {'sermon_id': sermon_id, 'book': book, 'reference_count': count}
+            for book, count in counts.items()
+        ])
+    return text_stats(content)
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_stats(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Sermon) or obj in session.deleted:
+            continue
+        if obj not in session.new:
+            attrs = inspect(obj).attrs
+            if not (attrs.content.history.has_changes() or attrs.scripture_passage.history.has_changes()):
+                continue
+        apply_stats(obj)
+
+
+def rebuild_stats():
+    """
+    Recompute statistics for every sermon
+
+    Returns:
+        int: Number of sermons updated
+    """
+    count = 0
+    ids = db.session.execute(select(Sermon.id).order_by(Sermon.id)).scalars().all()
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        for sermon in Sermon.query.filter(Sermon.id.in_(ids[start:start + REBUILD_BATCH_SIZE])):
+            apply_stats(sermon)
+            count += 1
+        db.session.commit()
+    return count
+
+
+def _summary(sermons, words, minutes, sentences, syllables, books):
+    words = int(words or 0)
+    return {
+        'sermons': sermons,
+        'word_count': words,
+        'preaching_minutes': int(minutes or 0),
+        'readability': flesch_reading_ease(words, int(sentences or 0), int(syllables or 0)),
+        'top_books': [book_name(book) for book, _ in books],
+    }
+
+
+def _rollup(*conditions):
+    sermons, words, minutes, sentences, syllables = db.session.execute(
+        select(
+            func.count(Sermon.id), func.sum(Sermon.word_count), func.sum(Sermon.preaching_minutes),
+            func.sum(Sermon.sentence_count), func.sum(Sermon.syllable_count)
+        ).where(*conditions)
+    ).one()
+    total = func.sum(SermonBookCount.reference_count)
+    books = db.session.execute(
+        select(SermonBookCount.book, total)
+        .join(Sermon, Sermon.id == SermonBookCount.sermon_id)
+        .where(*conditions)
+        .group_by(SermonBookCount.book)
+        .order_by(total.desc(), SermonBookCount.book)
+        .limit(TOP_BOOKS)
+    ).all()
+    return _summary(sermons, words, minutes, sentences, syllables, books)
+
+
+def series_stats(series_id):
+    """
+    Totals for one series
+
+    Returns:
+        dict: 'sermons', 'word_count', 'preaching_minutes', 'readability'
+            (None if there is no text) and 'top_books' (names, most cited first)
+    """
+    return _rollup(Sermon.series_id == series_id)
+
+
+def user_stats(user_id):
+    """Totals across all of a user's sermons, in the same form as series_stats"""
+    return _rollup(Sermon.user_id == user_id)
+
+
+def sermon_top_books(sermon, limit=TOP_BOOKS):
+    """Names of the books a sermon cites most"""
+    ranked = sorted(sermon.book_counts, key=lambda row: (-row.reference_count, row.book))
+    return [book_name(row.book) for row in ranked[:limit]]
+
+
+def series_totals(user_id):
+    """Totals for each of a user's series keyed by series id, without top books"""
+    rows = db.session.execute(
+        select(
+            Sermon.series_id, func.count(Sermon.id), func.sum(Sermon.word_count),
+            func.sum(Sermon.preaching_minutes), func.sum(Sermon.sentence_count),
+            func.sum(Sermon.syllable_count)
+        )
+        .where(Sermon.user_id == user_id, Sermon.series_id.isnot(None))
+        .group_by(Sermon.series_id)
+    ).all()
+    return {series_id: _summary(*totals, books=[]) for series_id, *totals in rows}
@@ -0,0 +1,12 @@
+from app import app
+from modules.counseling_analytics import rebuild_rollups
+
+def rebuild_counseling_rollups():
+    """Recompute the per-topic monthly and scripture-use rollups from every counseling session"""
+    with app.app_context():
+        print("Rebuilding counseling caseload rollups...")
+        count = rebuild_rollups()
+        print(f"Counted {count} counseling sessions successfully!")
+
+if __name__ == "__main__":
+    rebuild_counseling_rollups()
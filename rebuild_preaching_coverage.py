@@ -0,0 +1,12 @@
+from app import app
+from modules.preaching_coverage import rebuild_coverage
+
+def rebuild_preaching_coverage():
+    """Recompute every user's preaching coverage bitmap from their sermons"""
+    with app.app_context():
+        print("Rebuilding preaching coverage...")
+        count = rebuild_coverage()
+        print(f"Rebuilt coverage for {count} users successfully!")
+
+if __name__ == "__main__":
+    rebuild_preaching_coverage()
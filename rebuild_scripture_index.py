@@ -0,0 +1,12 @@
+from app import app
+from modules.scripture_index import rebuild_scripture_index
+
+def rebuild_index():
+    """Rebuild the normalized scripture reference index from existing records"""
+    with app.app_context():
+        print("Rebuilding scripture reference index...")
+        total = rebuild_scripture_index()
+        print(f"Indexed {total} scripture ranges successfully!")
+
+if __name__ == "__main__":
+    rebuild_index()
@@ -0,0 +1,12 @@
+from app import app
+from modules.sermon_content import rebuild_outline_points
+
+def rebuild_outlines():
+    """Validate stored sermon outlines and rebuild the queryable outline rows"""
+    with app.app_context():
+        print("Rebuilding sermon outline index...")
+        count = rebuild_outline_points()
+        print(f"Indexed outlines for {count} sermons successfully!")
+
+if __name__ == "__main__":
+    rebuild_outlines()
@@ -0,0 +1,12 @@
+from app import app
+from modules.sermon_duplicates import rebuild_signatures
+
+def rebuild_sermon_signatures():
+    """Recompute MinHash signatures and LSH buckets for every sermon"""
+    with app.app_context():
+        print("Rebuilding sermon near-duplicate index...")
+        count = rebuild_signatures()
+        print(f"Indexed {count} sermons successfully!")
+
+if __name__ == "__main__":
+    rebuild_sermon_signatures()
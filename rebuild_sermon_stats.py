@@ -0,0 +1,12 @@
+from app import app
+from modules.sermon_stats import rebuild_stats
+
+def rebuild_sermon_stats():
+    """Recompute word counts, readability, preaching time and cited books for every sermon"""
+    with app.app_context():
+        print("Rebuilding sermon statistics...")
+        count = rebuild_stats()
+        print(f"Updated {count} sermons successfully!")
+
+if __name__ == "__main__":
+    rebuild_sermon_stats()
@@ -0,0 +1,13 @@
+from app import app
+from modules.counseling_encryption import reencrypt_sessions, stale_session_count
+
+def reencrypt_counseling_notes():
+    """Encrypt counseling notes and descriptions with the current key, in committed batches"""
+    with app.app_context():
+        total = stale_session_count()
+        print(f"Re-encrypting {total} counseling sessions...")
+        count = reencrypt_sessions(on_progress=lambda done: print(f"  {done}/{total} sessions"))
+        print(f"Re-encrypted {count} counseling sessions successfully!")
+
+if __name__ == "__main__":
+    reencrypt_counseling_notes()
@@ -4,6 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 from app import app, db
 from models import User
+from modules.sermon_stats import user_stats
 
 
 @app.route('/')
@@ -106,9 +107,8 @@ def profile():
 @login_required
 def dashboard():
     """Dashboard for logged-in users"""
-    # Direct template rendering without passing model objects
-    # This avoids SQLAlchemy queries that might fail if schema changed
-    return render_template('dashboard.html')
+    # Sermon totals are aggregates of columns precomputed on save
+    return render_template('dashboard.html', sermon_stats=user_stats(current_user.id))
 
 
 @app.errorhandler(404)
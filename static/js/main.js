@@ -147,6 +147,27 @@ function setupDoctrineComparisonModule() {
     }
 }
 
+// Poll a background outline job until it finishes
+function pollOutlineJob(pollUrl, interval = 1000, attempts = 60) {
+    return new Promise((resolve, reject) => {
+        const check = remaining => {
+            fetch(pollUrl)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success || data.status === 'done') {
+                        resolve(data);
+                    } else if (remaining <= 0) {
+                        resolve({ success: false, message: 'Outline generation is taking longer than expected. Please try again.' });
+                    } else {
+                        setTimeout(() => check(remaining - 1), interval);
+                    }
+                })
+                .catch(reject);
+        };
+        check(attempts);
+    });
+}
+
 // Sermon Builder Module Setup
 function setupSermonBuilderModule() {
     const generateOutlineBtn = document.getElementById('generate-outline-btn');
@@ -173,6 +194,10 @@ function setupSermonBuilderModule() {
                 body: JSON.stringify({ scripture, theme })
             })
             .then(response => response.json())
+            .then(data => {
+                // Uncached outlines are generated in the background; poll until ready
+                return data.job_id ? pollOutlineJob(data.poll_url) : data;
+            })
             .then(data => {
                 // Reset button
                 generateOutlineBtn.innerHTML = 'Generate Outline';
@@ -265,6 +290,136 @@ function setupSermonBuilderModule() {
             });
         });
     }
+
+    // Incremental autosave while editing an existing sermon
+    const autosaveForm = document.querySelector('form[data-autosave-url]');
+    if (autosaveForm) {
+        setupSermonAutosave(autosaveForm);
+    }
+}
+
+// Sends only what changed since the last save, debounced while typing
+function setupSermonAutosave(form) {
+    const AUTOSAVE_DELAY = 1500;
+    const textFields = ['title', 'scripture_passage', 'theme', 'content'];
+    const jsonFields = ['outline', 'illustrations'];
+    const statusEl = document.getElementById('autosave-status');
+    let revision = parseInt(form.dataset.revision, 10) || 0;
+    let timer = null;
+    let saving = false;
+    let stopped = false;
+
+    function fieldValue(name) {
+        const field = form.elements[name];
+        return field ? field.value : null;
+    }
+
+    function currentValues() {
+        const values = {};
+        textFields.concat(jsonFields).forEach(name => { values[name] = fieldValue(name); });
+        return values;
+    }
+
+    function setStatus(text) {
+        if (statusEl) {
+            statusEl.textContent = text;
+        }
+    }
+
+    // Smallest single splice turning oldText into newText, in code points
+    function textSplice(path, oldText, newText) {
+        const a = Array.from(oldText || '');
+        const b = Array.from(newText || '');
+        let start = 0;
+        while (start < a.length && start < b.length && a[start] === b[start]) {
+            start++;
+        }
+        let endA = a.length;
+        let endB = b.length;
+        while (endA > start && endB > start && a[endA - 1] === b[endB - 1]) {
+            endA--;
+            endB--;
+        }
+        return { op: 'splice', path: path, offset: start, remove: endA - start, value: b.slice(start, endB).join('') };
+    }
+
+    function buildPatch(saved, values) {
+        const patch = [];
+        textFields.forEach(name => {
+            if (values[name] === null || values[name] === saved[name]) {
+                return;
+            }
+            if (name === 'content') {
+                patch.push(textSplice('/content', saved[name], values[name]));
+            } else {
+                patch.push({ op: 'replace', path: '/' + name, value: values[name] });
+            }
+        });
+        jsonFields.forEach(name => {
+            if (values[name] === null || values[name] === saved[name]) {
+                return;
+            }
+            try {
+                patch.push({ op: 'replace', path: '/' + name, value: values[name] ? JSON.parse(values[name]) : [] });
+            } catch (e) {
+                // Leave malformed JSON for the full form submit to report
+            }
+        });
+        return patch;
+    }
+
+    let saved = currentValues();
+
+    function save() {
+        if (saving || stopped) {
+            return;
+        }
+        const values = currentValues();
+        const patch = buildPatch(saved, values);
+        if (patch.length === 0) {
+            return;
+        }
+
+        saving = true;
+        setStatus('Saving...');
+        fetch(form.dataset.autosaveUrl, {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ base_revision: revision, patch: patch })
+        })
+        .then(response => response.json().then(data => ({ status: response.status, data })))
+        .then(({ status, data }) => {
+            saving = false;
+            if (data.success) {
+                revision = data.revision;
+                form.dataset.revision = revision;
+                saved = values;
+                setStatus('All changes saved');
+                // Catch up with anything typed while this save was in flight
+                schedule();
+            } else if (status === 409) {
+                stopped = true;
+                setStatus(data.message);
+            } else {
+                setStatus('Autosave failed: ' + data.message);
+            }
+        })
+        .catch(error => {
+            saving = false;
+            console.error('Error:', error);
+            setStatus('Autosave failed. Your changes will be saved when you submit.');
+        });
+    }
+
+    function schedule() {
+        clearTimeout(timer);
+        timer = setTimeout(save, AUTOSAVE_DELAY);
+    }
+
+    form.addEventListener('input', schedule);
+    form.addEventListener('change', schedule);
 }
 
 // Counseling Module Setup
@@ -0,0 +1,35 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from modules.extensions import db
+
+
+@pytest.fixture
+def app():
+    """Bare application with an in-memory database holding every model table"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['TESTING'] = True
+    app.secret_key = 'test'
+    db.init_app(app)
+
+    with app.app_context():
+        import models  # noqa: F401
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements executed while the test runs"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
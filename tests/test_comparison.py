@@ -0,0 +1,43 @@
+from models import Belief, Denomination
+from modules.comparison import build_comparison
+from modules.extensions import db
+
+TOPICS = ['Baptism', 'Eschatology', 'Salvation']
+
+
+def _denominations(count):
+    denominations = [Denomination(name=f'Denomination {index}') for index in range(count)]
+    db.session.add_all(denominations)
+    db.session.flush()
+    for denomination in denominations:
+        for topic in TOPICS:
+            db.session.add(Belief(topic=topic, summary=f'{denomination.name} on {topic}',
+                                  denomination_id=denomination.id))
+    db.session.commit()
+    # Loaded the way the views load them, not as expired instances
+    return Denomination.query.order_by(Denomination.id).all()
+
+
+def _queries_for(denominations, statements):
+    statements.clear()
+    results = build_comparison(denominations, TOPICS)
+    assert set(results) == set(TOPICS)
+    assert all(len(results[topic]) == len(denominations) for topic in TOPICS)
+    return len(statements)
+
+
+def test_comparison_query_count_is_constant(app, statements):
+    denominations = _denominations(10)
+
+    assert _queries_for(denominations[:2], statements) == _queries_for(denominations, statements)
+
+
+def test_missing_beliefs_use_placeholder(app):
+    denominations = _denominations(2)
+    db.session.add(Denomination(name='Without beliefs'))
+    db.session.commit()
+
+    results = build_comparison(Denomination.query.order_by(Denomination.id).all(), TOPICS)
+
+    assert results['Baptism']['Without beliefs']['summary'] == 'No information available'
+    assert results['Baptism'][denominations[0].name]['summary'] == 'Denomination 0 on Baptism'
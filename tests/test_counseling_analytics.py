@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from models import CounselingScriptureUse, CounselingSession, CounselingTopicMonth, User
+from modules.counseling_analytics import rebuild_rollups
+from modules.extensions import db
+
+
+def _rollups():
+    topics = {(row.month, row.topic): row.session_count for row in CounselingTopicMonth.query}
+    scriptures = {row.reference: row.use_count for row in CounselingScriptureUse.query}
+    return topics, scriptures
+
+
+def _session(**fields):
+    if not db.session.get(User, 1):
+        db.session.add(User(id=1, username='pastor', email='pastor@example.com', password_hash='x'))
+    session = CounselingSession(title='Session', user_id=1, created_at=datetime(2026, 3, 5), **fields)
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def test_edit_of_expired_instance_moves_counts(app):
+    session = _session(topic='Anxiety', scripture_references='Philippians 4:6-7')
+
+    # commit() expired the instance, so these assignments have no loaded value to compare with
+    session.topic = 'Grief'
+    session.scripture_references = 'Psalm 34:18'
+    db.session.commit()
+
+    topics, scriptures = _rollups()
+    assert set(topics.values()) == {1}
+    assert [topic for _, topic in topics] == ['Grief']
+    assert scriptures == {'Psalms 34:18': 1}
+
+    db.session.delete(session)
+    db.session.commit()
+    assert _rollups() == ({}, {})
+
+
+def test_edit_from_empty_topic(app):
+    session = _session(topic=None)
+
+    session.topic = 'Grief'
+    db.session.commit()
+    incremental = _rollups()
+
+    rebuild_rollups()
+    assert incremental == _rollups()
+    assert [topic for _, topic in incremental[0]] == ['Grief']
+
+
+def test_first_session_adds_to_row_inserted_concurrently(app):
+    db.session.add(User(id=1, username='pastor', email='pastor@example.com', password_hash='x'))
+    # Another request's first session for this topic and month committed first
+    db.session.add(CounselingTopicMonth(user_id=1, month=datetime(2026, 3, 1).date(), topic='Grief',
+                                        session_count=1))
+    db.session.commit()
+
+    _session(topic='Grief')
+
+    topics, _ = _rollups()
+    assert list(topics.values()) == [2]
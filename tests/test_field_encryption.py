@@ -0,0 +1,76 @@
+import pytest
+from cryptography.fernet import Fernet
+from sqlalchemy import text
+
+from models import CounselingSession, User
+from modules.counseling_encryption import reencrypt_sessions, stale_session_count
+from modules.extensions import db
+from modules.field_encryption import EncryptionKeyError, get_cipher
+
+
+def test_reencryption_keeps_updated_at(app):
+    app.config['COUNSELING_ENCRYPTION_KEYS'] = Fernet.generate_key().decode()
+    db.session.add(User(id=1, username='pastor', email='pastor@example.com', password_hash='x'))
+    db.session.commit()
+    # Written before encryption was enabled
+    db.session.execute(text(
+        "INSERT INTO counseling_session (title, notes, user_id, created_at, updated_at) "
+        "VALUES ('Legacy', 'plain notes', 1, '2020-01-01 00:00:00', '2020-01-01 00:00:00')"
+    ))
+    db.session.commit()
+
+    assert reencrypt_sessions() == 1
+
+    stored, updated_at = db.session.execute(text('SELECT notes, updated_at FROM counseling_session')).one()
+    assert stored.startswith('enc:')
+    assert str(updated_at).startswith('2020-01-01 00:00:00')
+    assert stale_session_count() == 0
+    assert CounselingSession.query.one().notes == 'plain notes'
+
+
+def test_keys_are_resolved_once_per_app(app, caplog, monkeypatch):
+    monkeypatch.delenv('COUNSELING_ENCRYPTION_KEYS', raising=False)
+    session = CounselingSession(title='Session', notes='first', user_id=1)
+    session.notes = 'second'
+    assert session.notes == 'second'
+
+    warnings = [record for record in caplog.records if 'COUNSELING_ENCRYPTION_KEYS' in record.getMessage()]
+    assert len(warnings) == 1
+    assert get_cipher() is get_cipher()
+
+
+def test_derived_key_is_refused_outside_development(app, monkeypatch):
+    monkeypatch.delenv('COUNSELING_ENCRYPTION_KEYS', raising=False)
+    app.testing = False
+
+    with pytest.raises(EncryptionKeyError):
+        get_cipher()
+
+
+def test_reencryption_skips_rows_changed_since_read(app, monkeypatch):
+    app.config['COUNSELING_ENCRYPTION_KEYS'] = Fernet.generate_key().decode()
+    db.session.add(User(id=1, username='pastor', email='pastor@example.com', password_hash='x'))
+    db.session.commit()
+    for title in ('First', 'Second'):
+        db.session.execute(text(
+            "INSERT INTO counseling_session (title, notes, user_id) VALUES (:title, 'plain notes', 1)"
+        ), {'title': title})
+    db.session.commit()
+
+    cipher = get_cipher()
+    decrypt = cipher.decrypt
+    edited = []
+
+    def decrypt_during_edit(value):
+        if not edited:
+            # The counselor saves the first session while it is being re-encrypted
+            edited.append(cipher.encrypt('edited notes'))
+            db.session.execute(text('UPDATE counseling_session SET notes = :notes WHERE id = 1'),
+                               {'notes': edited[0]})
+        return decrypt(value)
+
+    monkeypatch.setattr(cipher, 'decrypt', decrypt_during_edit)
+
+    assert reencrypt_sessions() == 1
+    assert db.session.execute(text('SELECT notes FROM counseling_session WHERE id = 1')).scalar() == edited[0]
+    assert stale_session_count() == 0
@@ -0,0 +1,42 @@
+import time
+from datetime import datetime, timedelta
+
+from models import BackgroundJob
+from modules import jobs
+from modules.extensions import db
+
+
+def _job(status, updated_at):
+    job = BackgroundJob(id=f'{status}{updated_at:%H%M%S}', kind='outline', status=status,
+                        dedupe_key='romans-8', updated_at=updated_at)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def _wait(job_id):
+    for _ in range(100):
+        db.session.expire_all()
+        job = db.session.get(BackgroundJob, job_id)
+        if job.status in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+def test_recent_job_is_reused(app):
+    job_id = _job('running', datetime.utcnow() - timedelta(minutes=1))
+
+    assert jobs.submit_job('outline', lambda job_id: None, dedupe_key='romans-8').id == job_id
+
+
+def test_stale_job_is_failed_and_replaced(app):
+    stale_id = _job('running', datetime.utcnow() - jobs.JOB_STALE_AFTER - timedelta(minutes=1))
+
+    job = jobs.submit_job('outline', lambda job_id: 'outline', dedupe_key='romans-8')
+
+    assert job.id != stale_id
+    assert _wait(job.id).status == 'done'
+    stale = db.session.get(BackgroundJob, stale_id)
+    assert stale.status == 'failed'
+    assert stale.error == 'Job stopped responding'
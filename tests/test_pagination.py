@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import Sermon, User
+from modules.extensions import db
+from modules.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 5, 1, 9, 30)
+    assert decode_cursor(encode_cursor(created_at, 7)) == (created_at, 7)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    assert decode_cursor('garbage') is None
+
+
+def test_pages_cover_rows_without_timestamps(app):
+    db.session.add(User(id=1, username='pastor', email='pastor@example.com', password_hash='x'))
+    for index in range(5):
+        db.session.add(Sermon(title=f'Sermon {index}', user_id=1,
+                              created_at=datetime(2026, 1, 1) + timedelta(days=index)))
+    db.session.commit()
+    # Rows saved before created_at was always set
+    db.session.execute(text('UPDATE sermon SET created_at = NULL WHERE id IN (2, 4)'))
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        sermons, cursor = keyset_page(Sermon.query, Sermon.created_at, Sermon.id, cursor=cursor, per_page=2)
+        seen.extend(sermon.id for sermon in sermons)
+        if not cursor:
+            break
+
+    assert seen == [5, 3, 1, 4, 2]
@@ -0,0 +1,34 @@
+from modules.scripture import ScriptureRange, book_ordinal, format_range, parse_references
+
+JUDE = book_ordinal('Jude')
+JOHN = book_ordinal('John')
+
+
+def test_single_chapter_book_number_is_a_verse():
+    assert parse_references('Jude 3') == [ScriptureRange(JUDE, 1, 3, 3)]
+    assert parse_references('Jude 3-5, 8') == [ScriptureRange(JUDE, 1, 3, 5), ScriptureRange(JUDE, 1, 8, 8)]
+    assert [format_range(r) for r in parse_references('Philemon 8-10')] == ['Philemon 1:8-10']
+
+
+def test_single_chapter_book_keeps_chapter_forms():
+    assert parse_references('Jude 1') == [ScriptureRange(JUDE, 1, 1, 25)]
+    assert parse_references('Jude 1:3') == [ScriptureRange(JUDE, 1, 3, 3)]
+
+
+def test_trailing_version_tag_is_ignored():
+    assert parse_references('John 3:16 (KJV)') == [ScriptureRange(JOHN, 3, 16, 16)]
+    assert [format_range(r) for r in parse_references('Romans 8:28 (ESV); John 3:16 (KJV, NIV)')] == [
+        'Romans 8:28', 'John 3:16'
+    ]
+
+
+def test_multi_chapter_book_number_is_a_chapter():
+    assert [format_range(r) for r in parse_references('Romans 8-9')] == ['Romans 8', 'Romans 9']
+
+
+def test_verse_zero_and_reversed_ranges_are_rejected():
+    assert parse_references('Acts 2:0') == []
+    assert parse_references('Acts 2:0-4') == []
+    assert parse_references('Jude 0') == []
+    assert parse_references('Acts 2:5-3') == []
+    assert parse_references('Acts 2:0, Acts 2:1') == [ScriptureRange(book_ordinal('Acts'), 2, 1, 1)]
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from modules.sermon_autosave import PatchError, apply_patch
+from modules.sermon_content import normalize_newlines
+
+
+def _sermon(content):
+    return SimpleNamespace(title='Grace', scripture_passage='Ephesians 2:8-9', theme=None, content=content)
+
+
+def test_splice_on_crlf_content_uses_textarea_offsets():
+    sermon = _sermon('Saved by grace.\r\nThrough faith.\r\nNot by works.')
+    # The editor sees LF text, so "Not" starts at offset 31, not 32
+    textarea = 'Saved by grace.\nThrough faith.\nNot by works.'
+    offset = textarea.index('Not')
+
+    changes = apply_patch(sermon, ([], []), [
+        {'op': 'splice', 'path': '/content', 'offset': offset, 'remove': 3, 'value': 'Never'}
+    ])
+
+    assert changes['content'] == 'Saved by grace.\nThrough faith.\nNever by works.'
+
+
+def test_splice_range_checked_against_normalized_text():
+    sermon = _sermon('a\r\nb')
+
+    with pytest.raises(PatchError):
+        apply_patch(sermon, ([], []), [{'op': 'splice', 'path': '/content', 'offset': 4, 'remove': 0, 'value': 'c'}])
+
+
+def test_replaced_content_is_stored_with_lf():
+    changes = apply_patch(_sermon(''), ([], []), [
+        {'op': 'replace', 'path': '/content', 'value': 'One\r\nTwo\rThree'}
+    ])
+
+    assert changes['content'] == 'One\nTwo\nThree'
+
+
+def test_normalize_newlines():
+    assert normalize_newlines('a\r\nb\rc\nd') == 'a\nb\nc\nd'
+    assert normalize_newlines(None) is None
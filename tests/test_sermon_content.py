@@ -0,0 +1,45 @@
+from models import Sermon, User
+from modules.extensions import db
+from modules.sermon_content import dump, get_structured_content, set_structured_content
+
+OUTLINE = [{'title': 'SECRET OUTLINE', 'points': ['Point']}]
+
+
+def _users():
+    db.session.add_all([
+        User(id=1, username='first', email='first@example.com', password_hash='x'),
+        User(id=2, username='second', email='second@example.com', password_hash='x'),
+    ])
+    db.session.commit()
+
+
+def test_reused_sermon_id_does_not_return_deleted_content(app):
+    _users()
+    sermon = Sermon(title='Private', user_id=1)
+    set_structured_content(sermon, OUTLINE, [])
+    db.session.add(sermon)
+    db.session.commit()
+    assert get_structured_content(sermon)[0] == OUTLINE
+
+    sermon_id = sermon.id
+    db.session.delete(sermon)
+    db.session.commit()
+
+    # SQLite hands the freed id to the next sermon, which starts at revision 1 again
+    other = Sermon(id=sermon_id, title='Other', user_id=2)
+    set_structured_content(other, [], [])
+    db.session.add(other)
+    db.session.commit()
+
+    assert get_structured_content(other) == ([], [])
+
+
+def test_same_revision_with_different_text_is_parsed_again(app):
+    _users()
+    sermon = Sermon(title='Grace', user_id=1, revision=1, outline=dump(OUTLINE))
+    db.session.add(sermon)
+    db.session.commit()
+    assert get_structured_content(sermon)[0] == OUTLINE
+
+    sermon.outline = None
+    assert get_structured_content(sermon)[0] == []
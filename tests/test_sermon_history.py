@@ -0,0 +1,35 @@
+from modules.sermon_history import MAX_MATCHER_SPAN, apply_delta, make_delta
+
+PARAGRAPHS = [f'Paragraph {index} on grace, faith and the works prepared for us.\n' for index in range(400)]
+
+
+def _round_trip(old, new):
+    previous, document = {'content': old}, {'content': new}
+    delta = make_delta(previous, document)
+    assert apply_delta(previous, delta) == document
+    return delta['content']['ops']
+
+
+def test_small_edits_store_small_ops():
+    old = ''.join(PARAGRAPHS)
+    new = old.replace('Paragraph 10 on grace', 'Paragraph 10 on mercy').replace('Paragraph 300', 'Section 300')
+
+    ops = _round_trip(old, new)
+
+    assert sum(len(replacement) for _, _, replacement in ops) < 20
+
+
+def test_large_rewritten_block_is_one_replacement():
+    rewritten = PARAGRAPHS[:100] + [line.upper() for line in PARAGRAPHS[100:300]] + PARAGRAPHS[300:]
+    old, new = ''.join(PARAGRAPHS), ''.join(rewritten)
+
+    ops = _round_trip(old, new)
+
+    assert len(ops) == 1
+    assert len(ops[0][2]) > MAX_MATCHER_SPAN
+
+
+def test_text_without_line_breaks_round_trips():
+    old = ' '.join(line.strip() for line in PARAGRAPHS)
+    _round_trip(old, old[:5000] + 'inserted ' + old[5000:])
+    _round_trip(old, old[::-1])
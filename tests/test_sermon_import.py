@@ -0,0 +1,49 @@
+from concurrent.futures import Future
+
+from sqlalchemy.exc import OperationalError
+
+from models import Sermon, SermonImport, User
+from modules import sermon_import
+from modules.extensions import db
+from modules.manuscript_parser import parse_manuscript
+
+
+def _parse_in_process(filename, data):
+    future = Future()
+    future.set_result(parse_manuscript(filename, data))
+    return None, future
+
+
+def test_failed_chunk_is_rolled_back_and_reported(app, tmp_path, monkeypatch):
+    user = User(username='pastor', email='pastor@example.org', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    for name in ('a', 'b', 'c'):
+        (tmp_path / f'{name}.txt').write_text(f'Sermon {name}\n\nBody of sermon {name}.')
+
+    save_chunk = sermon_import._save_chunk
+    calls = []
+
+    def locked_commit():
+        raise OperationalError('COMMIT', {}, Exception('database is locked'))
+
+    def flaky_save(user_id, chunk):
+        calls.append(chunk[0][0])
+        if len(calls) == 2:
+            with monkeypatch.context() as patch:
+                patch.setattr(db.session, 'commit', locked_commit)
+                save_chunk(user_id, chunk)
+        else:
+            save_chunk(user_id, chunk)
+
+    monkeypatch.setattr(sermon_import, '_submit', _parse_in_process)
+    monkeypatch.setattr(sermon_import, '_save_chunk', flaky_save)
+    monkeypatch.setattr(sermon_import, 'IMPORT_CHUNK_SIZE', 1)
+
+    summary = sermon_import.import_manuscripts(user.id, [str(tmp_path)])
+
+    assert summary['imported'] == 2
+    assert summary['failed'] == 1
+    assert summary['errors'] == [('b.txt', 'Could not save sermon (OperationalError)')]
+    assert Sermon.query.count() == 2
+    assert {row.filename for row in SermonImport.query} == {'a.txt', 'c.txt'}
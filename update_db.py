@@ -1,12 +1,44 @@
+from sqlalchemy import inspect, text
+
 from app import app, db
 import models
+from modules.sermon_search import create_search_index
+
+def add_missing_columns_and_indexes():
+    """Add columns and indexes that exist on the models but not yet in the database"""
+    inspector = inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(
+                    f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'
+                ))
+                print(f"Added column {table.name}.{column.name}")
+        db.session.commit()
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.engine)
+                print(f"Added index {index.name}")
 
 def update_database():
     """Update database schema to match current models"""
     with app.app_context():
         print("Starting database update...")
         db.create_all()
+        add_missing_columns_and_indexes()
+        with db.engine.begin() as connection:
+            if create_search_index(connection):
+                print("Created sermon full-text search index")
         print("Database schema updated successfully!")
 
 if __name__ == "__main__":
-    update_database()
\ No newline at end of file
+    update_database()